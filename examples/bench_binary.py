@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Benchmark BinaryImage
+
+    python examples/bench_binary.py
+
+For a 1024x1024 mask sequence of 100 frames prints the memory used by the
+sequence as float, uint8 and bit-packed frames, followed by the time taken
+per frame to pack and unpack the frames, and by each operation on the uint8
+frames with OpenCV and on the packed frames.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import BinaryImage
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.2f}ms" if t == t else f"{'-':>12s}"
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    n = 100
+    base = cv.GaussianBlur(rng.random((1024, 1024)), (0, 0), 4)
+    x = np.stack([(np.roll(base, i, axis=1) > 0.5) for i in range(n)])
+    x = x.astype(np.uint8)
+    y = x[::-1].copy()
+    a, b = BinaryImage(x), BinaryImage(y)
+
+    print(f"memory: float {x.size * 4 / 2**20:.1f}MB, "
+          f"uint8 {x.nbytes / 2**20:.1f}MB, packed {a.nbytes / 2**20:.1f}MB")
+    print(f"{'':>12s} {'uint8':>12s} {'packed':>12s}")
+    print(f"{'pack':>12s}", fmt(np.nan),
+          fmt(timeit(lambda: BinaryImage(x)) / n))
+    print(f"{'unpack':>12s}", fmt(np.nan), fmt(timeit(lambda: a.uint8()) / n))
+
+    k3 = np.ones((3, 3), dtype=np.uint8)
+    k9 = np.ones((9, 9), dtype=np.uint8)
+    tests = [
+        ('and', lambda: [cv.bitwise_and(p, q) for p, q in zip(x, y)],
+         lambda: a & b),
+        ('xor', lambda: [cv.bitwise_xor(p, q) for p, q in zip(x, y)],
+         lambda: a ^ b),
+        ('not', lambda: [1 - p for p in x], lambda: ~a),
+        ('area', lambda: [cv.countNonZero(p) for p in x], lambda: a.area),
+        ('dilate 3', lambda: [cv.dilate(p, k3) for p in x],
+         lambda: a.dilate(3)),
+        ('erode 9', lambda: [cv.erode(p, k9) for p in x],
+         lambda: a.erode(9)),
+    ]
+    for name, f8, fp in tests:
+        print(f"{name:>12s}", fmt(timeit(f8) / n), fmt(timeit(fp) / n))
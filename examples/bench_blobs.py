@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.blobs
+
+    python examples/bench_blobs.py
+
+For 2048x2048 binary images with increasing numbers of blobs prints the
+time taken by cv.findContours alone, by Image.blobs which finds the
+contours, by computing every feature of every blob, and by selecting the
+blobs of at least 100 pixels that do not touch the border and then
+computing every feature of those.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def features(blobs):
+    for name in ['area', 'uc', 'umin', 'perimeter', 'circularity', 'a',
+                 'children']:
+        getattr(blobs, name)
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    print(f"{'blobs':>8s} {'findContours':>12s} {'blobs':>12s} "
+          f"{'features':>12s} {'filtered':>12s}")
+    for sigma in [16, 8, 4, 2, 1.5]:
+        x = cv.GaussianBlur(rng.random((2048, 2048)), (0, 0), sigma)
+        x = (x > np.quantile(x, 0.55)).astype(np.uint8) * 255
+        im = Image(x)
+        n = len(im.blobs())
+        t_contours = timeit(lambda: cv.findContours(x, cv.RETR_TREE,
+                                                    cv.CHAIN_APPROX_NONE))
+        t_blobs = timeit(lambda: im.blobs())
+        t_all = timeit(lambda: features(im.blobs()))
+        t_filter = timeit(lambda: features(im.blobs(area=(100, None),
+                                                    touch=False)))
+        print(f"{n:8d}", *[f"{t * 1e3:10.1f}ms"
+                           for t in (t_contours, t_blobs, t_all, t_filter)])
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Benchmark the Image.convolve strategies
+
+    python examples/bench_convolve.py
+
+For a range of kernel sizes, for a general and a separable kernel, prints the
+time taken by the original implementation (one scipy.signal.convolve2d call
+per plane) and by each strategy of Image.convolve, and the strategy that
+Image.convolvestrategy chooses.
+"""
+
+import time
+import numpy as np
+from scipy import signal
+from machinevisiontoolbox import Image
+
+
+def convolve_convolve2d(im, K):
+    # the original Image.convolve implementation, for a greyscale image
+    return Image(signal.convolve2d(im.image, K, mode='same', boundary='wrap'))
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    strategies = ['direct', 'separable', 'fft']
+
+    for dtype in [np.float32, np.float64]:
+        im = Image(rng.random((1024, 1024)).astype(dtype))
+        print(f"image {im}")
+        print(f"{'kernel':>12s} {'convolve2d':>12s}",
+              *[f"{s:>12s}" for s in strategies], f"{'chosen':>12s}")
+
+        for k in [3, 5, 7, 11, 15, 21, 31, 51, 101]:
+            for name, K in [('general', rng.random((k, k))),
+                            ('separable', Image.kgauss((k - 1) / 6,
+                                                       (k - 1) // 2))]:
+                K = K.astype(dtype)
+                if k <= 15:
+                    t_old = timeit(lambda: convolve_convolve2d(im, K),
+                                   repeat=1)
+                else:
+                    t_old = np.nan
+                t = []
+                for s in strategies:
+                    if s == 'separable' and name == 'general':
+                        t.append(np.nan)
+                    else:
+                        t.append(timeit(lambda: im.convolve(K, strategy=s)))
+                print(f"{k:3d} {name:>8s}", fmt(t_old), *[fmt(x) for x in t],
+                      f"{im.convolvestrategy(K):>12s}")
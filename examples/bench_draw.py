@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Benchmark Blob.drawBlobs and Blob.labelImage
+
+    python examples/bench_draw.py
+
+For 2048x2048 binary images with increasing numbers of blobs prints the
+time taken to find the blobs, to fill each blob by its own cv.drawContours
+call as the original implementation did, when it is practical, and by
+Blob.labelImage, which redraws and labels the image, and Blob.drawBlobs,
+filled and outlined with bounding boxes and centroids, without text.  The
+blob features are computed before timing, the label image is computed
+before timing drawBlobs.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def draw_loop(blobs, shape):
+    # the original implementation, one call per contour
+    drawing = np.zeros(shape + (3,), dtype=np.uint8)
+    hierarchy = np.expand_dims(blobs._hierarchy, axis=0)
+    for i in range(len(blobs)):
+        cv.drawContours(drawing, blobs._allcontours, i,
+                        (i % 256, 128, 128), thickness=cv.FILLED,
+                        lineType=cv.LINE_8, hierarchy=hierarchy)
+    return drawing
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    print(f"{'blobs':>8s} {'blobs':>12s} {'loop':>12s} {'labelImage':>12s} "
+          f"{'filled':>12s} {'outlined':>12s}")
+    for sigma in [16, 8, 4, 2]:
+        x = cv.GaussianBlur(rng.random((2048, 2048)), (0, 0), sigma)
+        x = (x > np.quantile(x, 0.55)).astype(np.uint8) * 255
+        im = Image(x)
+        t_blobs = timeit(lambda: im.blobs())
+        blobs = im.blobs()
+        blobs.uc, blobs.umin  # compute the features
+        if len(blobs) <= 3000:
+            t_loop = timeit(lambda: draw_loop(blobs, x.shape), repeat=1)
+        else:
+            t_loop = np.nan
+        t_label = timeit(lambda: (blobs._shared.clear(),
+                                  blobs.labelImage(im)))
+        t_fill = timeit(lambda: blobs.drawBlobs(im, textthickness=0))
+        t_outline = timeit(lambda: blobs.drawBlobs(
+            im, textthickness=0, contourthickness=1, box=(255, 255, 255),
+            centroid=(0, 255, 0)))
+        print(f"{len(blobs):8d}", *[fmt(t) for t in
+                                    (t_blobs, t_loop, t_label, t_fill,
+                                     t_outline)])
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.granulometry and the multi-scale Image.tophat
+
+    python examples/bench_granulometry.py
+
+For binary and greyscale images, and disk and square structuring elements,
+prints the time taken to compute the openings at radii 1 to 20 by calling
+Image.open for each radius, and by Image.granulometry and Image.tophat.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def open_each(im, radii, se):
+    # one opening per radius
+    for r in radii:
+        if se == 'disk':
+            S = Image.kcircle(r)
+        else:
+            S = np.ones((2 * r + 1, 2 * r + 1))
+        im.open(S)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    radii = np.arange(1, 21)
+    x = cv.GaussianBlur(rng.random((1024, 1024)), (0, 0), 8)
+    x = cv.normalize(x, None, 0, 255, cv.NORM_MINMAX, cv.CV_8U)
+
+    print(f"radii {radii[0]} to {radii[-1]}")
+    print(f"{'image':>16s} {'open':>12s} {'granulometry':>12s} "
+          f"{'tophat':>12s}")
+    for name, im in [('binary', Image((x > 128).astype(np.uint8))),
+                     ('grey', Image(x))]:
+        for se in ['disk', 'square']:
+            t_open = timeit(lambda: open_each(im, radii, se), repeat=1)
+            t_gran = timeit(lambda: im.granulometry(radii, se))
+            t_top = timeit(lambda: im.tophat(radii, se))
+            print(f"{name:>8s} {se:>7s}", *[f"{t * 1e3:10.1f}ms"
+                                            for t in (t_open, t_gran, t_top)])
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.label
+
+    python examples/bench_label.py
+
+For 2048x2048 binary images of increasing label density prints the time
+taken to label the image and then compute the area, bounding box and
+centroid of every region by rescanning the image, and by Image.label with
+statistics for each labelling algorithm.  The density is the fraction of
+foreground pixels in random noise smoothed over a few pixels, the number of
+regions is largest near one half.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def rescan(im):
+    # label, then one pass over the image per statistic
+    n, labels = im.label()
+    L = labels.image.ravel()
+    v, u = np.divmod(np.arange(L.size), labels.image.shape[1])
+    area = np.bincount(L, minlength=n[0])
+    uc = np.bincount(L, u, minlength=n[0]) / area
+    vc = np.bincount(L, v, minlength=n[0]) / area
+    umin = np.full(n[0], L.size)
+    np.minimum.at(umin, L, u)
+    umax = np.zeros(n[0], int)
+    np.maximum.at(umax, L, u)
+    vmin = np.full(n[0], L.size)
+    np.minimum.at(vmin, L, v)
+    vmax = np.zeros(n[0], int)
+    np.maximum.at(vmax, L, v)
+    return area, umin, umax, vmin, vmax, uc, vc
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    algorithms = ['wu', 'grana', 'spaghetti']
+    x = cv.GaussianBlur(rng.random((2048, 2048)), (0, 0), 2)
+    print(f"{'density':>8s} {'regions':>8s} {'label':>12s} {'rescan':>12s}",
+          *[f"{alg:>12s}" for alg in algorithms])
+    for density in [0.01, 0.1, 0.3, 0.5, 0.7, 0.9]:
+        im = Image((x > np.quantile(x, 1 - density)).astype(np.uint8))
+        n, labels = im.label()
+        t_label = timeit(lambda: im.label())
+        t_rescan = timeit(lambda: rescan(im), repeat=1)
+        t_alg = [timeit(lambda: im.label(stats=True, algorithm=alg))
+                 for alg in algorithms]
+        print(f"{density:8.2f} {n[0]:8d}",
+              *[f"{t * 1e3:10.1f}ms" for t in [t_label, t_rescan] + t_alg])
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.allmoments
+
+    python examples/bench_moments.py
+
+For greyscale images of increasing size prints the time taken to compute
+the raw, central and normalized moments up to order 3 by the original
+implementation of mpq, upq and npq (a meshgrid and full image products per
+moment, each central moment recomputes the centroid), by cv.moments and by
+Image.allmoments which also computes the Hu invariants.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def mpq(x, p, q):
+    # the original Image.mpq, for one frame
+    u, v = np.meshgrid(np.arange(x.shape[1]), np.arange(x.shape[0]))
+    return np.sum(x * (u ** p) * (v ** q))
+
+
+def upq(x, p, q):
+    # the original Image.upq, for one frame
+    u, v = np.meshgrid(np.arange(x.shape[1]), np.arange(x.shape[0]))
+    m00 = mpq(x, 0, 0)
+    uc = mpq(x, 1, 0) / m00
+    vc = mpq(x, 0, 1) / m00
+    return np.sum(x * ((u - uc) ** p) * ((v - vc) ** q))
+
+
+def npq(x, p, q):
+    # the original Image.npq, for one frame
+    return upq(x, p, q) / mpq(x, 0, 0) ** ((p + q) / 2 + 1)
+
+
+def original(x):
+    pq = [(p, q) for p in range(4) for q in range(4 - p)]
+    m = [mpq(x, p, q) for p, q in pq]
+    mu = [upq(x, p, q) for p, q in pq if p + q >= 2]
+    nu = [npq(x, p, q) for p, q in pq if p + q >= 2]
+    return m, mu, nu
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    print(f"{'image':>10s} {'original':>12s} {'cv.moments':>12s} "
+          f"{'allmoments':>12s}")
+    for n in [256, 512, 1024, 2048]:
+        x = (rng.random((n, n)) * 255).astype(np.uint8)
+        im = Image(x)
+        if n <= 1024:
+            t_old = timeit(lambda: original(x), repeat=1)
+        else:
+            t_old = np.nan
+        t_cv = timeit(lambda: cv.moments(x))
+        t_all = timeit(lambda: im.allmoments())
+        print(f"{n:10d}", *[fmt(t) for t in (t_old, t_cv, t_all)])
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.erode and Image.close with large structuring elements
+
+    python examples/bench_morph.py
+
+For disks and squares of increasing size prints the time taken by OpenCV with
+the whole structuring element, the original implementation, and by
+Image.erode which decomposes the element into lines.  The last column is a
+closing, the fill-in operation of a typical pipeline.  For a binary image and
+large disks Image.erode thresholds the distance transform, whose time is
+shown last.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    for dtype in [np.uint8, np.float64]:
+        x = (rng.random((1024, 1024)) * 255).astype(dtype)
+        im = Image(x)
+        print(f"image {im}")
+        print(f"{'se':>12s} {'cv.erode':>12s} {'erode':>12s} "
+              f"{'cv close':>12s} {'close':>12s}")
+        for name, se in [('disk 7x7', Image.kcircle(3)),
+                         ('disk 15x15', Image.kcircle(7)),
+                         ('disk 51x51', Image.kcircle(25)),
+                         ('square 51', np.ones((51, 51))),
+                         ('line 801', np.ones((1, 801)))]:
+            se8 = se.astype(np.uint8)
+            t_cv = timeit(lambda: cv.erode(x, se8,
+                                           borderType=cv.BORDER_REPLICATE))
+            t_new = timeit(lambda: im.erode(se))
+            t_cvc = timeit(lambda: cv.erode(
+                cv.dilate(x, se8, borderType=cv.BORDER_REPLICATE), se8,
+                borderType=cv.BORDER_REPLICATE))
+            t_close = timeit(lambda: im.close(se))
+            print(f"{name:>12s}", *[f"{t * 1e3:10.1f}ms"
+                                    for t in (t_cv, t_new, t_cvc, t_close)])
+
+    # binary images and large disks use the distance transform
+    x = (cv.GaussianBlur(rng.random((1024, 1024)), (0, 0), 20) > 0.5)
+    x = x.astype(np.uint8)
+    im = Image(x)
+    print(f"binary image {im}")
+    print(f"{'se':>12s} {'cv.erode':>12s} {'erode':>12s} "
+          f"{'distance':>12s}")
+    for r in [25, 50, 100, 200]:
+        se = Image.kcircle(r)
+        se8 = se.astype(np.uint8)
+        t_cv = timeit(lambda: cv.erode(x, se8,
+                                       borderType=cv.BORDER_REPLICATE),
+                      repeat=1)
+        t_new = timeit(lambda: im.erode(se))
+        t_dt = timeit(lambda: im.distance_transform())
+        print(f"{'disk r=' + str(r):>12s}", *[f"{t * 1e3:10.1f}ms"
+                                              for t in (t_cv, t_new, t_dt)])
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.rank against scipy.ndimage.rank_filter
+
+    python examples/bench_rank.py
+
+For a uint8 image and square structuring elements of increasing size prints
+the time taken by ndimage.rank_filter, the original implementation, and by
+Image.rank for the median, computed by cv.medianBlur, and for the lower
+quartile, computed by threshold decomposition.
+"""
+
+import time
+import numpy as np
+import scipy.ndimage as nd
+from machinevisiontoolbox import Image
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    x = (rng.random((512, 512)) * 255).astype(np.uint8)
+    im = Image(x)
+
+    print(f"image {im}")
+    print(f"{'se':>6s} {'rank':>6s} {'rank_filter':>12s} {'rank':>12s}")
+    for k in [3, 5, 9, 15, 25]:
+        se = np.ones((k, k))
+        for r in [k * k // 2, k * k // 4]:
+            t_old = timeit(lambda: nd.rank_filter(x, r, footprint=se,
+                                                  mode='nearest'), repeat=1)
+            t_new = timeit(lambda: im.rank(se, r))
+            print(f"{k:4d}x{k:<1d} {r:6d} {t_old * 1e3:10.1f}ms "
+                  f"{t_new * 1e3:10.1f}ms")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.reconstruct and the operations built on it
+
+    python examples/bench_reconstruct.py
+
+For binary and greyscale images of increasing size prints the time taken to
+fill holes, clear the border and compute the h-maxima by iterating a 3x3
+geodesic dilation or erosion until convergence, when it is practical, and
+by Image.fill_holes, Image.clear_border and Image.hmax.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def iterate(marker, mask, method):
+    # reconstruction by repeated geodesic dilation or erosion
+    se = np.ones((3, 3))
+    f = marker
+    while True:
+        if method == 'dilation':
+            g = np.minimum(Image(f).dilate(se).image, mask)
+        else:
+            g = np.maximum(Image(f).erode(se).image, mask)
+        if np.all(g == f):
+            return f
+        f = g
+
+
+def border(x, value):
+    f = np.full(x.shape, value, dtype=x.dtype)
+    f[0, :], f[-1, :], f[:, 0], f[:, -1] = x[0, :], x[-1, :], x[:, 0], x[:, -1]
+    return f
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    print(f"{'image':>14s} {'iterate':>12s} {'fill_holes':>12s} "
+          f"{'iterate':>12s} {'clear_border':>12s} {'iterate':>12s} "
+          f"{'hmax':>12s}")
+    for n in [256, 512, 1024, 2048]:
+        x = cv.GaussianBlur(rng.random((n, n)), (0, 0), n / 100)
+        x = cv.normalize(x, None, 0, 255, cv.NORM_MINMAX, cv.CV_8U)
+        for name, x in [('binary', (x > 128).astype(np.uint8)),
+                        ('grey', x)]:
+            im = Image(x)
+            if n <= 512:
+                t_fill = timeit(lambda: iterate(border(x, x.max()), x,
+                                                'erosion'), repeat=1)
+                t_clear = timeit(lambda: x - iterate(border(x, 0), x,
+                                                     'dilation'), repeat=1)
+                t_hmax = timeit(lambda: iterate(
+                    np.maximum(x, 10) - 10, x, 'dilation'), repeat=1)
+            else:
+                t_fill = t_clear = t_hmax = np.nan
+            print(f"{name:>8s} {n:5d}", fmt(t_fill),
+                  fmt(timeit(lambda: im.fill_holes())), fmt(t_clear),
+                  fmt(timeit(lambda: im.clear_border())), fmt(t_hmax),
+                  fmt(timeit(lambda: im.hmax(10))))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Benchmark Blob.to_records and RecordWriter
+
+    python examples/bench_records.py
+
+For 2048x2048 binary images with increasing numbers of blobs prints the
+time taken to build a table of blob properties by iterating over the blobs
+and reading each property, when it is practical, and by Blob.to_records,
+followed by the time per frame to write the table to .npy, .npz and .csv
+files.  The blob properties are computed before timing.
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image, RecordWriter
+
+fields = ['area', 'uc', 'vc', 'umin', 'umax', 'vmin', 'vmax', 'touch',
+          'perimeter', 'circularity', 'a', 'b', 'orientation']
+
+
+def iterate(blobs):
+    return [tuple(getattr(b, name) for name in fields) for b in blobs]
+
+
+def write(blobs, filename, nframes=10):
+    with RecordWriter(filename, fields=fields) as writer:
+        for i in range(nframes):
+            writer.write(blobs)
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    print(f"{'blobs':>8s} {'iterate':>12s} {'to_records':>12s} "
+          f"{'npy':>12s} {'npz':>12s} {'csv':>12s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sigma in [16, 8, 4, 2]:
+            x = cv.GaussianBlur(rng.random((2048, 2048)), (0, 0), sigma)
+            x = (x > np.quantile(x, 0.55)).astype(np.uint8) * 255
+            blobs = Image(x).blobs()
+            blobs.to_records(fields)  # compute the properties
+            if len(blobs) <= 3000:
+                t_iterate = timeit(lambda: iterate(blobs), repeat=1)
+            else:
+                t_iterate = np.nan
+            t = [timeit(lambda: write(blobs, os.path.join(tmp, 'b.' + ext)))
+                 / 10 for ext in ['npy', 'npz', 'csv']]
+            print(f"{len(blobs):8d}", fmt(t_iterate),
+                  fmt(timeit(lambda: blobs.to_records(fields))),
+                  *[fmt(ti) for ti in t])
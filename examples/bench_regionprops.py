@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.regionprops
+
+    python examples/bench_regionprops.py
+
+For 1024x1024 label images with increasing numbers of regions prints the
+time taken to compute the area, centroid, second moments and mean
+intensity of every region by masking the image once per region, when it is
+practical, and by Image.regionprops for all regions at once.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def masking(x, L, n):
+    # one pass over the image per region
+    u, v = np.meshgrid(np.arange(x.shape[1]), np.arange(x.shape[0]))
+    out = []
+    for k in range(n):
+        region = L == k
+        uk, vk, xk = u[region], v[region], x[region]
+        uc, vc = uk.mean(), vk.mean()
+        out.append((len(uk), uc, vc, np.sum((uk - uc) ** 2),
+                    np.sum((uk - uc) * (vk - vc)), np.sum((vk - vc) ** 2),
+                    xk.mean()))
+    return out
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    x = (rng.random((1024, 1024)) * 255).astype(np.uint8)
+    print(f"{'regions':>8s} {'masking':>12s} {'regionprops':>12s}")
+    for sigma in [32, 16, 8, 4, 2]:
+        b = cv.GaussianBlur(rng.random((1024, 1024)), (0, 0), sigma) > 0.5
+        n, labels = Image(b.astype(np.uint8)).label()
+        L = labels.image
+        if n[0] <= 2000:
+            t_mask = timeit(lambda: masking(x, L, n[0]), repeat=1)
+        else:
+            t_mask = np.nan
+        t_props = timeit(lambda: Image(x).regionprops(L))
+        print(f"{n[0]:8d}", fmt(t_mask), fmt(t_props))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Benchmark RunLengthImage
+
+    python examples/bench_runlength.py
+
+For a 4096x4096 image of thin lines and small blobs prints the number of
+runs and the memory used, then the time taken to label the image, compute the moments of every
+component, and dilate and erode it, on the uint8 image with OpenCV and on
+the runs.  The time to encode the image is listed separately.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import RunLengthImage
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.2f}ms" if t == t else f"{'-':>12s}"
+
+
+def cvmoments(x):
+    # moments of every component from the label image
+    n, labels, stats, _ = cv.connectedComponentsWithStats(x)
+    out = []
+    for i in range(1, n):
+        u, v, w, h = stats[i, :4]
+        out.append(cv.moments((labels[v:v+h, u:u+w] == i).astype(np.uint8),
+                              True))
+    return out
+
+
+def rlmoments(r):
+    n, labels = r.label()
+    return r.allmoments(labels=labels)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    N = 4096
+    x = np.zeros((N, N), dtype=np.uint8)
+    for i in range(100):
+        p = rng.integers(0, N, size=4)
+        cv.line(x, (int(p[0]), int(p[1])), (int(p[2]), int(p[3])), 1, 2)
+    for i in range(500):
+        p = rng.integers(0, N, size=2)
+        cv.circle(x, (int(p[0]), int(p[1])), int(rng.integers(2, 8)), 1, -1)
+    r = RunLengthImage(x)
+
+    print(f"{N}x{N} image, {r.area} set pixels, {len(r)} runs")
+    print(f"memory: uint8 {x.nbytes / 2**20:.1f}MB, "
+          f"runs {sum(a.nbytes for a in r.runs) / 2**20:.1f}MB")
+    print(f"{'':>12s} {'uint8':>12s} {'runs':>12s}")
+    print(f"{'encode':>12s}", fmt(np.nan),
+          fmt(timeit(lambda: RunLengthImage(x))))
+
+    k3 = np.ones((3, 3), dtype=np.uint8)
+    k9 = np.ones((9, 9), dtype=np.uint8)
+    tests = [
+        ('label', lambda: cv.connectedComponents(x), lambda: r.label()),
+        ('area', lambda: cv.countNonZero(x), lambda: r.area),
+        ('moments', lambda: cvmoments(x), lambda: rlmoments(r)),
+        ('dilate 3', lambda: cv.dilate(x, k3), lambda: r.dilate(3)),
+        ('erode 9', lambda: cv.erode(x, k9), lambda: r.erode(9)),
+    ]
+    for name, f8, fr in tests:
+        print(f"{name:>12s}", fmt(timeit(f8)), fmt(timeit(fr)))
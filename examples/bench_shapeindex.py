@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Benchmark ShapeIndex
+
+    python examples/bench_shapeindex.py
+
+For increasing numbers of blobs and a library of reference shapes prints
+the time taken to find the nearest reference shape to every blob by
+cv.matchShapes of each pair, when it is practical, and by ShapeIndex.query
+with the Hu moments alone and with 8 Fourier descriptors.  The reference
+shapes are the blobs of a different random image.  The contours and moments
+are computed before timing, the index is built before timing.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image, ShapeIndex
+
+
+def blobs(rng, sigma):
+    x = cv.GaussianBlur(rng.random((2048, 2048)), (0, 0), sigma)
+    x = (x > np.quantile(x, 0.55)).astype(np.uint8) * 255
+    b = Image(x).blobs()
+    return b[np.flatnonzero(b.area > 20)]
+
+
+def pairwise(blobs, reference):
+    # nearest reference shape to each blob, one pair at a time
+    best = []
+    for c in blobs._contours:
+        d = [cv.matchShapes(c, r, cv.CONTOURS_MATCH_I1, 0)
+             for r in reference._contours]
+        best.append(np.argmin(d))
+    return best
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    reference = blobs(rng, 16)
+    hu = ShapeIndex(reference)
+    fourier = ShapeIndex(reference, fourier=8)
+    print(f"{len(reference)} reference shapes")
+    print(f"{'blobs':>8s} {'matchShapes':>12s} {'hu':>12s} {'fourier':>12s}")
+    for sigma in [16, 8, 4, 2]:
+        b = blobs(rng, sigma)
+        b.humoments  # compute the moments
+        if len(b) <= 500:
+            t_pair = timeit(lambda: pairwise(b, reference), repeat=1)
+        else:
+            t_pair = np.nan
+        print(f"{len(b):8d}", fmt(t_pair),
+              fmt(timeit(lambda: hu.query(b))),
+              fmt(timeit(lambda: fourier.query(b))))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.smooth against the original per-plane convolve2d approach
+
+    python examples/bench_smooth.py
+
+For each value of sigma prints the time taken by the original implementation
+(2D kernel, float64, one scipy.signal.convolve2d call per plane), by the
+separable FIR path and by the recursive IIR path.  Image.smooth switches from
+FIR to IIR when sigma reaches ``ImageProcessingKernel._IIR_SIGMA``.
+"""
+
+import time
+import numpy as np
+from scipy import signal
+from machinevisiontoolbox import Image
+import machinevisiontoolbox.ImageProcessingKernel as ipk
+
+
+def smooth_convolve2d(im, sigma):
+    # the original Image.smooth implementation
+    K = Image.kgauss(sigma)
+    img = im.float('float32')
+    ims = []
+    for frame in img:
+        x = frame.image.astype(np.float64)
+        ims.append(np.dstack([signal.convolve2d(x[:, :, i], K, mode='same',
+                                                boundary='fill')
+                              for i in range(x.shape[2])]))
+    return Image(ims).int()
+
+
+def smooth_iir(im, sigma):
+    # force the recursive path whatever the value of sigma
+    threshold = ipk._IIR_SIGMA
+    ipk._IIR_SIGMA = 0
+    try:
+        return im.smooth(sigma)
+    finally:
+        ipk._IIR_SIGMA = threshold
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    im = Image((rng.random((512, 512, 3)) * 255).astype(np.uint8))
+
+    print(f"image {im}")
+    print(f"{'sigma':>6s} {'convolve2d':>12s} {'separable':>12s} "
+          f"{'iir':>12s}")
+    for sigma in [1, 2, 3, 5, 8, 12, 20, 30]:
+        hw = int(np.ceil(3 * sigma))
+        # passing hw explicitly forces the separable FIR path
+        t_fir = timeit(lambda: im.smooth(sigma, hw=hw))
+        t_iir = timeit(lambda: smooth_iir(im, sigma))
+        if sigma <= 12:
+            t_old = timeit(lambda: smooth_convolve2d(im, sigma), repeat=1)
+        else:
+            t_old = np.nan
+        print(f"{sigma:6.1f}", *[f"{t * 1e3:10.1f}ms" if t == t else
+                                 f"{'-':>12s}" for t in (t_old, t_fir, t_iir)])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.thin, Image.endpoint and Image.triplepoint
+
+    python examples/bench_thin.py
+
+For masks of increasing size prints the time taken by the original
+implementation of thinning (two morph calls and a multiply per hit-or-miss,
+eight per iteration), when it is practical, and by the lookup table engine,
+followed by the end and triple point detection of the skeleton.  The
+``lines`` mask is a thickened edge map, the ``blobs`` mask has discs of
+radius up to an eighth of its size, the cost of thinning is proportional to
+the length of the boundary times the thickness of the shapes.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image
+
+
+def thin_hitormiss(im):
+    # the original Image.thin implementation, for one frame
+    def hitormiss(x, se):
+        s1 = np.float32(se == 1)
+        s2 = np.float32(se == 0)
+        return Image(x).morph(s1, 'min').image * \
+            Image(1 - x).morph(s2, 'min').image
+
+    sa = np.array([[0, 0, 0], [np.nan, 1, np.nan], [1, 1, 1]])
+    sb = np.array([[np.nan, 0, 0], [1, 1, 0], [np.nan, 1, np.nan]])
+    x = im.image
+    while True:
+        o = x
+        for i in range(4):
+            x = np.logical_xor(x, hitormiss(x, sa)).astype(np.uint8)
+            x = np.logical_xor(x, hitormiss(x, sb)).astype(np.uint8)
+            sa = np.rot90(sa)
+            sb = np.rot90(sb)
+        if np.all(o == x):
+            return Image(x)
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+def lines(rng, n):
+    x = cv.GaussianBlur(rng.random((n, n)), (0, 0), n / 64)
+    x = (x * 255 / x.max()).astype(np.uint8)
+    edges = cv.Canny(x, 20, 40)
+    return cv.dilate(edges, np.ones((3, 3), np.uint8)) // 255
+
+
+def blobs(rng, n):
+    x = np.zeros((n, n), dtype=np.uint8)
+    for i in range(n // 32):
+        cv.circle(x, tuple(int(c) for c in rng.integers(0, n, 2)),
+                  int(rng.integers(2, n // 8)), 1, -1)
+    return x
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    print(f"{'mask':>12s} {'original':>12s} {'thin':>12s} "
+          f"{'endpoint':>12s} {'triplepoint':>12s}")
+    for name, make in [('lines', lines), ('blobs', blobs)]:
+        for n in [256, 512, 1024, 2048]:
+            im = Image(make(rng, n))
+            if n <= 512:
+                t_old = timeit(lambda: thin_hitormiss(im), repeat=1)
+            else:
+                t_old = np.nan
+            t_thin = timeit(lambda: im.thin())
+            skeleton = im.thin()
+            t_end = timeit(lambda: skeleton.endpoint())
+            t_triple = timeit(lambda: skeleton.triplepoint())
+            print(f"{name:>6s} {n:5d}", *[fmt(t) for t in
+                                          (t_old, t_thin, t_end, t_triple)])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Benchmark BlobTracker
+
+    python examples/bench_tracker.py
+
+For frames with increasing numbers of discs, each moving a few pixels in a
+random direction between frames, prints the time per frame taken to
+associate the blobs by a nearest centroid loop over the tracks, when it is
+practical, and by BlobTracker.update.  The blob features are computed
+before timing, and the fraction of blobs given the track of the same disc
+in the previous frame is printed for each.
+"""
+
+import time
+import numpy as np
+import cv2 as cv
+from machinevisiontoolbox import Image, BlobTracker
+
+
+def nearest(tracks, blobs, radius):
+    # associate each blob with the nearest unused track within radius
+    ids = np.full((len(blobs.uc),), -1)
+    used = np.zeros((len(tracks),), dtype=bool)
+    for i, (u, v) in enumerate(zip(blobs.uc, blobs.vc)):
+        d = np.hypot(tracks[:, 0] - u, tracks[:, 1] - v)
+        d[used] = np.inf
+        j = np.argmin(d)
+        if d[j] <= radius:
+            ids[i] = j
+            used[j] = True
+    return ids
+
+
+def frames(rng, n, nframes, size=2048):
+    # discs at fixed spacing moving by up to 2 pixels per frame
+    side = int(np.ceil(np.sqrt(n)))
+    g = (np.arange(side) + 0.5) * size / side
+    P = np.stack(np.meshgrid(g, g), axis=-1).reshape((-1, 2))[:n]
+    out = []
+    for i in range(nframes):
+        x = np.zeros((size, size), dtype=np.uint8)
+        for u, v in P.astype(int):
+            cv.circle(x, (u, v), 3, 255, -1)
+        blobs = Image(x).blobs()
+        blobs.uc, blobs.area  # compute the features before timing
+        out.append(blobs)
+        P = P + rng.uniform(-2, 2, P.shape)
+    return out
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+def fmt(t):
+    return f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+
+
+def run_nearest(seq):
+    ids = [np.arange(len(seq[0]))]
+    tracks = np.column_stack((seq[0].uc, seq[0].vc))
+    nextid = len(seq[0])
+    for blobs in seq[1:]:
+        j = nearest(tracks, blobs, 6)
+        new = j < 0
+        j = ids[-1][j]
+        j[new] = np.arange(nextid, nextid + np.sum(new))
+        nextid += np.sum(new)
+        ids.append(j)
+        tracks = np.column_stack((blobs.uc, blobs.vc))
+    return ids
+
+
+def run_tracker(seq):
+    tracker = BlobTracker(radius=6, area=0.5)
+    return [tracker.update(blobs) for blobs in seq]
+
+
+def correct(seq, ids):
+    # blobs are the same disc in consecutive frames if their centroids are
+    # the nearest, the fraction of those given the same track
+    ok = total = 0
+    for i in range(1, len(seq)):
+        a = np.column_stack((seq[i - 1].uc, seq[i - 1].vc))
+        b = np.column_stack((seq[i].uc, seq[i].vc))
+        for k in range(len(b)):
+            j = np.argmin(np.hypot(*(a - b[k]).T))
+            ok += ids[i][k] == ids[i - 1][j]
+            total += 1
+    return ok / total
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    nframes = 10
+    print(f"{'blobs':>8s} {'nearest':>12s} {'tracker':>12s} "
+          f"{'correct':>8s} {'correct':>8s}")
+    for n in [500, 1000, 2000, 4000, 8000]:
+        seq = frames(rng, n, nframes)
+        if n <= 2000:
+            t_nearest = timeit(lambda: run_nearest(seq), repeat=1) / nframes
+            c_nearest = correct(seq, run_nearest(seq))
+        else:
+            t_nearest = c_nearest = np.nan
+        t_tracker = timeit(lambda: run_tracker(seq)) / nframes
+        c_tracker = correct(seq, run_tracker(seq))
+        print(f"{n:8d}", fmt(t_nearest), fmt(t_tracker),
+              f"{c_nearest:8.3f} {c_tracker:8.3f}")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Benchmark Image.window against scipy.ndimage.generic_filter
+
+    python examples/bench_window.py
+
+For each reduction prints the time taken by the original implementation,
+which calls the Python function once per pixel via generic_filter, and by
+Image.window, which uses a built-in reduction or calls the function on blocks
+of windows with ``axis=-1``.
+"""
+
+import time
+import numpy as np
+import scipy.ndimage as nd
+from machinevisiontoolbox import Image
+
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    x = (rng.random((512, 512)) * 255).astype(np.uint8)
+    im = Image(x)
+    se = np.ones((5, 5))
+
+    print(f"image {im}, 5x5 window")
+    print(f"{'reduction':>12s} {'generic':>12s} {'window':>12s}")
+    for name, func in [('min', np.min), ('max', np.max), ('mean', np.mean),
+                       ('std', np.std), ('median', np.median),
+                       ('range', np.ptp), ('entropy', 'entropy'),
+                       ('sum', np.sum), ('var', np.var)]:
+        if callable(func):
+            t_old = timeit(lambda: nd.generic_filter(x, func, footprint=se,
+                                                     mode='nearest'),
+                           repeat=1)
+        else:
+            t_old = np.nan
+        t_new = timeit(lambda: im.window(se, func))
+        print(f"{name:>12s}",
+              *[f"{t * 1e3:10.1f}ms" if t == t else f"{'-':>12s}"
+                for t in (t_old, t_new)])
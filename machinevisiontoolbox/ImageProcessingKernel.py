@@ -1,12 +1,699 @@
 #!/usr/bin/env python
 
+import functools
+import weakref
 import numpy as np
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import spatialmath.base.argcheck as argcheck
 import cv2 as cv
 import scipy as sp
 
 from scipy import signal
 
+# above this standard deviation Image.smooth uses a recursive Gaussian whose
+# cost is independent of sigma, rather than a separable FIR kernel
+_IIR_SIGMA = 20
+
+# calibrated cost model for Image.convolve, times are in ns per padded pixel:
+#   tap     cv.filter2D, per kernel element, spatial domain
+#   dft     cv.filter2D, per log2 of kernel area, when OpenCV switches to its
+#           own DFT which it does for kernels of ``dfttaps`` elements or more
+#   sep     cv.sepFilter2D, per element of the two 1D kernels
+#   fft     scipy.signal.fftconvolve, per log2 of the transform size
+_CONV_COST = {
+    np.dtype(np.float32): dict(tap=0.07, dft=1.5, dfttaps=130, sep=0.22,
+                               fft=1.1),
+    np.dtype(np.float64): dict(tap=0.3, dft=1.5, dfttaps=50, sep=0.34,
+                               fft=2.3),
+}
+
+
+def _gauss1d(sigma, hw, dtype=np.float32):
+    """
+    One-dimensional Gaussian kernel
+
+    :param sigma: standard deviation of Gaussian kernel
+    :type sigma: float
+    :param hw: half-width of the kernel
+    :type hw: integer
+    :return: kernel with unit sum
+    :rtype: numpy array (2*hw+1,)
+
+    The outer product of this kernel with itself is ``kgauss(sigma, hw)``.
+    """
+    x = np.arange(-hw, hw + 1)
+    g = np.exp(-np.power(x, 2) / 2.0 / sigma ** 2)
+    return (g / np.sum(g)).astype(dtype)
+
+
+def _gauss_iir(x, sigma):
+    """
+    Recursive Gaussian filter
+
+    :param x: image
+    :type x: numpy array (H,W) or (H,W,P) of float
+    :param sigma: standard deviation of the Gaussian
+    :type sigma: float
+    :return: smoothed image
+    :rtype: numpy array, same shape and type as ``x``
+
+    Young-van Vliet third-order recursive approximation to a Gaussian, applied
+    as a causal and an anti-causal pass along each image axis.  The number of
+    operations per pixel does not depend on ``sigma``.  The filter state is
+    initialised to the steady state for the first sample of each pass so there
+    is no transient at the image edges.
+
+    :references:
+
+        - Recursive implementation of the Gaussian filter, I.T. Young and
+          L.J. van Vliet, Signal Processing, 44(2):139-151, 1995.
+    """
+    if sigma >= 2.5:
+        q = 0.98711 * sigma - 0.96330
+    else:
+        q = 3.97156 - 4.14554 * np.sqrt(1 - 0.26891 * sigma)
+
+    b0 = 1.57825 + 2.44413 * q + 1.4281 * q ** 2 + 0.422205 * q ** 3
+    b1 = 2.44413 * q + 2.85619 * q ** 2 + 1.26661 * q ** 3
+    b2 = -(1.4281 * q ** 2 + 1.26661 * q ** 3)
+    b3 = 0.422205 * q ** 3
+    B = 1 - (b1 + b2 + b3) / b0
+
+    b = np.array([B], dtype=x.dtype)
+    a = np.array([1, -b1 / b0, -b2 / b0, -b3 / b0], dtype=x.dtype)
+    zi = signal.lfilter_zi(b, a).astype(x.dtype)
+
+    for axis in (0, 1):
+        shape = [1] * x.ndim
+        shape[axis] = 3
+        zi_axis = zi.reshape(shape)
+        for direction in ('causal', 'anticausal'):
+            # the anti-causal pass is a causal pass over the reversed signal
+            x0 = np.take(x, [0], axis=axis)
+            x, zf = signal.lfilter(b, a, x, axis=axis, zi=zi_axis * x0)
+            x = np.flip(x, axis=axis)
+    return np.ascontiguousarray(x)
+
+
+# number of kernels held by the cache behind the k* factory methods
+_KERNEL_CACHE_SIZE = 128
+
+# 1D factors of separable kernels created by the factory, keyed on the id()
+# of the kernel and validated by a weak reference to it
+_kernel_separable = {}
+
+
+def _register_factors(K, u, v):
+    key = id(K)
+
+    def forget(ref):
+        entry = _kernel_separable.get(key)
+        if entry is not None and entry[0] is ref:
+            del _kernel_separable[key]
+
+    _kernel_separable[key] = (weakref.ref(K, forget), (u, v))
+
+
+@functools.lru_cache(maxsize=_KERNEL_CACHE_SIZE)
+def _kernel(kind, args, hw, dtype):
+    """
+    Cached kernel factory
+
+    :param kind: kernel type, one of 'gauss', 'dgauss', 'log', 'dog', 'circle'
+    :type kind: string
+    :param args: kernel parameters, standard deviations or radii
+    :type args: tuple of float
+    :param hw: half-width of the kernel
+    :type hw: integer
+    :param dtype: type of the kernel elements
+    :type dtype: string
+    :return: kernel
+    :rtype: numpy array (2*hw+1,2*hw+1)
+
+    The kernel is read only, since the same array is returned to every caller
+    that asks for the same kernel.  The least recently used kernels are
+    discarded once the cache holds ``_KERNEL_CACHE_SIZE`` kernels.  The 1D
+    factors of separable kernels are registered so that ``_kernel_factors``
+    can return them without a decomposition.
+    """
+    dtype = np.dtype(dtype)
+    wi = np.arange(-hw, hw + 1)
+    factors = None
+
+    if kind == 'gauss':
+        sigma, = args
+        g = _gauss1d(sigma, hw, dtype=np.float64)
+        factors = (g, g)
+        K = np.outer(g, g)
+
+    elif kind == 'dgauss':
+        sigma, = args
+        g = np.exp(-np.power(wi, 2) / 2.0 / sigma ** 2)
+        factors = (g, -wi / sigma ** 2 / (2.0 * np.pi) * g)
+        K = np.outer(*factors)
+
+    elif kind == 'log':
+        sigma, = args
+        x, y = np.meshgrid(wi, wi)
+        K = 1.0 / (np.pi * sigma ** 4.0) * \
+            ((np.power(x, 2) + np.power(y, 2)) / (2.0 * sigma ** 2) - 1) * \
+            np.exp(-(np.power(x, 2) + np.power(y, 2)) / (2.0 * sigma ** 2))
+
+    elif kind == 'dog':
+        sigma1, sigma2 = args
+        K = _kernel('gauss', (sigma2,), hw, dtype.str) - \
+            _kernel('gauss', (sigma1,), hw, dtype.str)
+
+    elif kind == 'circle':
+        x, y = np.meshgrid(wi, wi)
+        d2 = np.power(x, 2) + np.power(y, 2)
+        if len(args) == 1:
+            K = d2 <= args[0] ** 2
+        else:
+            rmin, rmax = args
+            K = (d2 <= rmax ** 2) & (d2 > rmin ** 2)
+
+    else:
+        raise ValueError(kind, 'unknown kernel type')
+
+    K = K.astype(dtype)
+    K.setflags(write=False)
+    if factors is not None:
+        u, v = [f.astype(dtype) for f in factors]
+        u.setflags(write=False)
+        v.setflags(write=False)
+        _register_factors(K, u, v)
+    return K
+
+
+@functools.lru_cache(maxsize=64)
+def _kernel_factors_cached(data, shape, dtype):
+    dtype = np.dtype(dtype)
+    K = np.frombuffer(data, dtype=dtype).reshape(shape).astype(np.float64)
+    # tolerance reflects the precision to which the kernel is stored
+    if np.issubdtype(dtype, np.inexact):
+        eps = np.finfo(dtype).eps
+    else:
+        eps = np.finfo(np.float64).eps
+    U, S, Vt = np.linalg.svd(K)
+    if S[0] == 0 or S[1] > max(shape) * eps * S[0]:
+        return None
+    u = U[:, 0] * np.sqrt(S[0])
+    v = Vt[0, :] * np.sqrt(S[0])
+    u.setflags(write=False)
+    v.setflags(write=False)
+    return u, v
+
+
+def _kernel_factors(K):
+    """
+    Factorize a separable kernel
+
+    :param K: kernel
+    :type K: numpy array (N,M)
+    :return: column and row factors, or None
+    :rtype: tuple of numpy arrays (N,) and (M,)
+
+    If ``K`` has rank one, to within floating point precision, return vectors
+    ``u`` and ``v`` such that ``np.outer(u, v)`` equals ``K``, otherwise return
+    None.  The rank is determined from the singular values of ``K`` and the
+    result is cached, so repeated convolutions with the same kernel do not
+    repeat the decomposition.  Kernels from the cached factory already know
+    their factors.
+    """
+    entry = _kernel_separable.get(id(K))
+    if entry is not None and entry[0]() is K:
+        return entry[1]
+    if K.ndim != 2 or min(K.shape) < 2:
+        return None
+    K = np.ascontiguousarray(K)
+    return _kernel_factors_cached(K.tobytes(), K.shape, K.dtype.str)
+
+
+def _convolve_cost(shape, dtype, K, optmode):
+    """
+    Estimated cost of each convolution strategy
+
+    :param shape: image shape
+    :type shape: tuple
+    :param dtype: type in which the convolution is computed
+    :type dtype: float32 or float64
+    :param K: kernel
+    :type K: numpy array (N,M) or (N,M,P)
+    :param optmode: convolution mode 'full', 'same' or 'valid'
+    :type optmode: string
+    :return: estimated time in ns for each strategy
+    :rtype: dict
+
+    The cost is that of a valid convolution of the padded image, for every
+    output plane.  Strategy 'separable' is only present if every plane of the
+    kernel is separable.
+    """
+    kh, kw = K.shape[:2]
+    pad = {'full': 2, 'same': 1, 'valid': 0}[optmode]
+    H = shape[0] + pad * (kh - 1)
+    W = shape[1] + pad * (kw - 1)
+    N = H * W
+
+    planes = 1
+    if len(shape) == 3:
+        planes *= shape[2]
+    if K.ndim == 3:
+        planes *= K.shape[2]
+
+    c = _CONV_COST[np.dtype(dtype)]
+
+    taps = kh * kw
+    cost = {}
+    if taps < c['dfttaps']:
+        cost['direct'] = c['tap'] * taps * N * planes
+    else:
+        cost['direct'] = c['dft'] * np.log2(4 * taps) * N * planes
+    if K.ndim == 2:
+        separable = _kernel_factors(K) is not None
+    else:
+        separable = all(_kernel_factors(K[:, :, i]) is not None
+                        for i in range(K.shape[2]))
+    if separable:
+        cost['separable'] = c['sep'] * (kh + kw) * N * planes
+    Nf = (H + kh) * (W + kw)
+    cost['fft'] = c['fft'] * np.log2(Nf) * Nf * planes
+    return cost
+
+
+def _gradient(x, sigma, direction):
+    """
+    Derivative of Gaussian image gradient
+
+    :param x: greyscale image
+    :type x: numpy array (H,W)
+    :param sigma: standard deviation of the Gaussian
+    :type sigma: float
+    :param direction: direction of the derivative, 'x' or 'y'
+    :type direction: string
+    :return: gradient
+    :rtype: numpy array (H,W) of float32
+
+    The gradient is computed by a separable filter built from the cached 1D
+    factors of ``kdgauss(sigma)``, a Gaussian and its derivative.  It is
+    signed, and equal to convolution with ``kdgauss(sigma)``, or its
+    transpose for the vertical gradient.  Pixels beyond the border are
+    reflected.
+    """
+    g, dg = _kernel_factors(
+        ImageProcessingKernelMixin.kdgauss(sigma, dtype=np.float32))
+    # correlation with the reversed derivative kernel is convolution
+    dg = np.ascontiguousarray(dg[::-1])
+    x = x.astype(np.float32, copy=False)
+    if direction == 'x':
+        return cv.sepFilter2D(x, -1, dg, g, borderType=cv.BORDER_REFLECT)
+    else:
+        return cv.sepFilter2D(x, -1, g, dg, borderType=cv.BORDER_REFLECT)
+
+
+def _map_frames(func, *frames):
+    """
+    Apply a function to every frame of a sequence
+
+    :param func: function applied to corresponding frames of each argument
+    :type func: callable
+    :param frames: frames
+    :type frames: lists of numpy arrays
+    :return: results of the function
+    :rtype: list
+
+    OpenCV releases the GIL, so if there is more than one frame they are
+    processed concurrently by a thread pool.
+    """
+    if len(frames[0]) > 1:
+        with ThreadPoolExecutor() as executor:
+            return list(executor.map(func, *frames))
+    else:
+        return [func(*f) for f in zip(*frames)]
+
+
+def _canny(Ix, Iy, th0, th1):
+    """
+    Canny edge detection from gradient images
+
+    :param Ix: horizontal gradient
+    :type Ix: numpy array (H,W) of float32
+    :param Iy: vertical gradient
+    :type Iy: numpy array (H,W) of float32
+    :param th0: lower threshold, in units of the gradient
+    :type th0: float
+    :param th1: upper threshold, in units of the gradient
+    :type th1: float
+    :return: edge image
+    :rtype: numpy array (H,W) of uint8
+
+    ``cv.Canny`` requires int16 gradients, so the gradients are scaled to use
+    the int16 range, keeping their sign, and the thresholds are scaled by the
+    same factor.  OpenCV caps the L2 thresholds at 32767, so the scale is
+    chosen to keep both the upper threshold and the largest gradient
+    magnitude, at most ``sqrt(2)`` times the largest component, within the
+    int16 range.
+    """
+    gmax = max(max(-m[0], m[1]) for m in map(cv.minMaxLoc, (Ix, Iy)))
+    top = max(np.sqrt(2) * gmax, th1)
+    scale = 32767.0 / top if top > 0 else 1.0
+    # OpenCV rounds and saturates when converting to int16
+    dx = cv.multiply(Ix, scale, dtype=cv.CV_16S)
+    dy = cv.multiply(Iy, scale, dtype=cv.CV_16S)
+    return cv.Canny(dx, dy, th0 * scale, th1 * scale, L2gradient=True)
+
+
+# maximum size in bytes of the block of gathered windows that Image.window
+# passes to a reduction in one call
+_WINDOW_CHUNK = 1 << 24
+
+
+def _window_blocks(xp, se):
+    """
+    Gathered windows of a padded image, a block of rows at a time
+
+    :param xp: padded image
+    :type xp: numpy array (H+N-1,W+M-1)
+    :param se: structuring element
+    :type se: numpy array (N,M)
+    :return: generator of row range and window block
+    :rtype: generator of (int, int, numpy array (R,W,K))
+
+    The windows are taken from a zero-copy sliding window view of ``xp``, and
+    the ``K`` elements selected by the non-zero elements of ``se`` are copied
+    out, in row-major order, for ``R`` output rows at a time.  ``R`` is
+    chosen so that each block occupies at most ``_WINDOW_CHUNK`` bytes.
+    """
+    kh, kw = se.shape
+    H = xp.shape[0] - kh + 1
+    W = xp.shape[1] - kw + 1
+    ri, ci = np.nonzero(se)
+    rows = max(1, _WINDOW_CHUNK // max(1, W * len(ri) * xp.itemsize))
+    view = np.lib.stride_tricks.sliding_window_view(xp, (kh, kw))
+    for r0 in range(0, H, rows):
+        r1 = min(H, r0 + rows)
+        # only the selected elements of each window are copied
+        yield r0, r1, view[r0:r1][:, :, ri, ci]
+
+
+def _window_entropy(x, axis=-1):
+    # Shannon entropy, in bits, of the values along the last axis.  Within
+    # each sorted window the k'th element of a run of equal values adds
+    # f(k) = k log k - (k-1) log(k-1), so the runs sum to sum(c log c)
+    x = np.sort(x, axis=axis)
+    n = x.shape[-1]
+    j = np.arange(n)
+    start = np.ones(x.shape, dtype=bool)
+    start[..., 1:] = x[..., 1:] != x[..., :-1]
+    k = j - np.maximum.accumulate(np.where(start, j, 0), axis=-1) + 1
+    klogk = j * np.log2(np.maximum(j, 1))
+    f = np.append(klogk, n * np.log2(n))[1:] - klogk
+    return np.log2(n) - f[k - 1].sum(axis=-1) / n
+
+
+def _window_sum(xp, se):
+    # sum of the elements of each window, as float64
+    kh, kw = se.shape
+    y = cv.filter2D(xp.astype(np.float64), -1, se.astype(np.float64),
+                    anchor=(0, 0))
+    return y[:xp.shape[0] - kh + 1, :xp.shape[1] - kw + 1]
+
+
+def _window_valid(y, se):
+    # part of an ndimage filter result, computed on the padded image, that
+    # corresponds to complete windows
+    kh, kw = se.shape
+    return y[kh // 2:y.shape[0] - (kh - 1 - kh // 2),
+             kw // 2:y.shape[1] - (kw - 1 - kw // 2)]
+
+
+def _window_extremum(xp, se, op):
+    # minimum or maximum of each window
+    kh, kw = se.shape
+    if xp.dtype in (np.uint8, np.uint16, np.int16, np.float32, np.float64):
+        op = {'min': cv.erode, 'max': cv.dilate}[op]
+        y = op(xp, se.astype(np.uint8), anchor=(0, 0))
+        return y[:xp.shape[0] - kh + 1, :xp.shape[1] - kw + 1]
+    op = {'min': sp.ndimage.minimum_filter,
+          'max': sp.ndimage.maximum_filter}[op]
+    return _window_valid(op(xp, footprint=se), se)
+
+
+def _window_median(xp, se):
+    # median of each window, the ndimage rank filter is exact only for an odd
+    # number of elements, otherwise the middle pair must be averaged
+    if np.count_nonzero(se) % 2 == 1:
+        return _window_valid(sp.ndimage.median_filter(xp, footprint=se), se)
+    return _window_reduce(xp, se, np.median)
+
+
+def _window_mean(xp, se):
+    return _window_sum(xp, se) / np.count_nonzero(se)
+
+
+def _window_std(xp, se):
+    n = np.count_nonzero(se)
+    mean = _window_sum(xp, se) / n
+    var = _window_sum(xp.astype(np.float64) ** 2, se) / n - mean ** 2
+    return np.sqrt(np.maximum(var, 0))
+
+
+def _window_range(xp, se):
+    return _window_extremum(xp, se, 'max') - _window_extremum(xp, se, 'min')
+
+
+def _window_axis(xp, se, func, **kwargs):
+    """
+    Test if a function reduces windows along an axis
+
+    :param xp: padded image
+    :type xp: numpy array (H+N-1,W+M-1)
+    :param se: structuring element
+    :type se: numpy array (N,M)
+    :param func: function
+    :type func: callable
+    :return: True if ``func(block, axis=-1)`` reduces a block of windows
+    :rtype: bool
+
+    ``func`` is called once on the first two windows of the image, so that
+    the choice between a call per block and a call per pixel is made before
+    the real calls, and errors from those calls are not mistaken for a
+    function that takes no ``axis`` argument.
+    """
+    kh, kw = se.shape
+    _, _, block = next(_window_blocks(xp[:kh, :kw + 1], se))
+    try:
+        r = func(block, axis=-1, **kwargs)
+    except (TypeError, ValueError):
+        return False
+    return np.shape(r) == block.shape[:2]
+
+
+def _window_reduce(xp, se, func, **kwargs):
+    # reduction along the last axis applied to gathered windows
+    kh, kw = se.shape
+    y = np.empty((xp.shape[0] - kh + 1, xp.shape[1] - kw + 1))
+    for r0, r1, block in _window_blocks(xp, se):
+        r = func(block, axis=-1, **kwargs)
+        if np.shape(r) != block.shape[:2]:
+            raise ValueError(func, 'func does not reduce along axis')
+        y[r0:r1] = r
+    return y
+
+
+# built-in window reductions, each computes the reduction for every window of
+# a padded image using OpenCV, ndimage or a vectorized NumPy path.  Percentile
+# uses NumPy, which interpolates, rather than the ndimage rank filter
+_WINDOW_REDUCTIONS = {
+    'min': lambda xp, se: _window_extremum(xp, se, 'min'),
+    'max': lambda xp, se: _window_extremum(xp, se, 'max'),
+    'mean': _window_mean,
+    'std': _window_std,
+    'median': _window_median,
+    'percentile': lambda xp, se, q: _window_reduce(xp, se, np.percentile,
+                                                   q=q),
+    'range': _window_range,
+    'entropy': lambda xp, se: _window_reduce(xp, se, _window_entropy),
+}
+
+# NumPy functions that are recognized as built-in reductions
+_WINDOW_NUMPY = {
+    np.min: 'min',
+    np.amin: 'min',
+    np.max: 'max',
+    np.amax: 'max',
+    np.mean: 'mean',
+    np.std: 'std',
+    np.median: 'median',
+    np.percentile: 'percentile',
+    np.ptp: 'range',
+}
+
+
+class ImageGradients:
+    """
+    Image gradient field
+
+    :param image: image
+    :type image: Image instance
+    :param sigma: standard deviation of the derivative of Gaussian kernel
+    :type sigma: float
+
+    - ``ImageGradients(im, sigma)`` holds the smoothed gradients of the
+      greyscale version of image ``im``, usually created by
+      ``im.gradients(sigma)``.  The components are:
+
+        - ``Ix``  horizontal gradient, dI/dx
+        - ``Iy``  vertical gradient, dI/dy
+        - ``magnitude``  gradient magnitude, sqrt(Ix^2 + Iy^2)
+        - ``orientation``  gradient direction atan2(Iy, Ix) in radians
+
+    Each component is computed the first time it is requested and then
+    cached, so an edge detector, a corner detector and a descriptor that use
+    the same gradient field compute it only once.
+
+    .. note::
+
+        - All components are float32.
+        - Each component can be freed independently with ``free()``, it will
+          be recomputed if it is requested again.
+        - The frames of an image sequence are processed in parallel.
+    """
+
+    _components = ('Ix', 'Iy', 'magnitude', 'orientation')
+
+    def __init__(self, image, sigma=1):
+        self._image = image.mono()
+        self._sigma = sigma
+        self._cache = {}
+
+    def __repr__(self):
+        cached = ', '.join(self.cached) if self.cached else 'none'
+        return f"ImageGradients(sigma={self._sigma}, cached: {cached})"
+
+    @property
+    def image(self):
+        """
+        Greyscale image from which the gradients are computed
+
+        :return: image
+        :rtype: Image instance
+        """
+        return self._image
+
+    @property
+    def sigma(self):
+        """
+        Standard deviation of the derivative of Gaussian kernel
+
+        :return: standard deviation
+        :rtype: float
+        """
+        return self._sigma
+
+    @property
+    def Ix(self):
+        """
+        Horizontal gradient
+
+        :return: horizontal gradient, dI/dx
+        :rtype: Image instance
+        """
+        return self._image.__class__(self._get('Ix'))
+
+    @property
+    def Iy(self):
+        """
+        Vertical gradient
+
+        :return: vertical gradient, dI/dy
+        :rtype: Image instance
+        """
+        return self._image.__class__(self._get('Iy'))
+
+    @property
+    def magnitude(self):
+        """
+        Gradient magnitude
+
+        :return: gradient magnitude
+        :rtype: Image instance
+        """
+        return self._image.__class__(self._get('magnitude'))
+
+    @property
+    def orientation(self):
+        """
+        Gradient orientation
+
+        :return: gradient direction in radians, in the interval [-pi, pi]
+        :rtype: Image instance
+        """
+        return self._image.__class__(self._get('orientation'))
+
+    @property
+    def cached(self):
+        """
+        Components that have been computed
+
+        :return: names of the cached components
+        :rtype: tuple of strings
+        """
+        return tuple(c for c in self._components if c in self._cache)
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the cached components
+
+        :return: number of bytes
+        :rtype: int
+        """
+        return sum(x.nbytes for c in self._cache.values() for x in c)
+
+    def free(self, *components):
+        """
+        Free cached components
+
+        :param components: names of components
+        :type components: strings
+        :return: the gradient field
+        :rtype: ImageGradients instance
+
+        - ``G.free('Ix', 'Iy')`` releases the memory held by the named
+          components.
+        - ``G.free()`` releases all components.
+        """
+        if len(components) == 0:
+            components = self._components
+        for c in components:
+            if c not in self._components:
+                raise ValueError(c, 'unknown gradient component')
+            self._cache.pop(c, None)
+        return self
+
+    def _get(self, component):
+        # list of frames of the component, computed on first use
+        if component not in self._cache:
+            frames = [im.image for im in self._image]
+            sigma = self._sigma
+            if component == 'Ix':
+                out = _map_frames(lambda x: _gradient(x, sigma, 'x'), frames)
+            elif component == 'Iy':
+                out = _map_frames(lambda x: _gradient(x, sigma, 'y'), frames)
+            elif component == 'magnitude':
+                out = _map_frames(cv.magnitude, self._get('Ix'),
+                                  self._get('Iy'))
+            elif component == 'orientation':
+                out = _map_frames(np.arctan2, self._get('Iy'),
+                                  self._get('Ix'))
+            else:
+                raise ValueError(component, 'unknown gradient component')
+            self._cache[component] = out
+        return self._cache[component]
+
 
 class ImageProcessingKernelMixin:
     """
@@ -14,7 +701,7 @@ class ImageProcessingKernelMixin:
     """
 
     @staticmethod
-    def kgauss(sigma, hw=None):
+    def kgauss(sigma, hw=None, dtype=np.float64):
         """
         Gaussian kernel
 
@@ -22,6 +709,8 @@ class ImageProcessingKernelMixin:
         :type sigma: float
         :param hw: width of the kernel
         :type hw: integer
+        :param dtype: type of the kernel elements
+        :type dtype: numpy dtype
         :return k: kernel
         :rtype: numpy array (N,H)
 
@@ -39,20 +728,18 @@ class ImageProcessingKernelMixin:
         .. note::
 
             - The volume under the Gaussian kernel is one.
+            - The kernel is separable, ``convolve`` uses its 1D factors.
+            - Kernels are cached and the returned array is read only, use
+              ``copy()`` to obtain a writable kernel.
         """
 
         # make sure sigma, w are valid input
         if hw is None:
             hw = np.ceil(3 * sigma)
 
-        wi = np.arange(-hw, hw + 1)
-        x, y = np.meshgrid(wi, wi)
-
-        m = 1.0 / (2.0 * np.pi * sigma ** 2) * \
-            np.exp(-(np.power(x, 2) + np.power(y, 2)) / 2.0 / sigma ** 2)
         # area under the curve should be 1, but the discrete case is only
-        # an approximation
-        return m / np.sum(m)
+        # an approximation, so the kernel is normalized
+        return _kernel('gauss', (float(sigma),), int(hw), np.dtype(dtype).str)
 
     @staticmethod
     def klaplace():
@@ -112,7 +799,7 @@ class ImageProcessingKernelMixin:
                          [1, 0, -1]]) / 8.0
 
     @staticmethod
-    def kdog(sigma1, sigma2=None, hw=None):
+    def kdog(sigma1, sigma2=None, hw=None, dtype=np.float64):
         """
         Difference of Gaussians kernel
 
@@ -122,6 +809,8 @@ class ImageProcessingKernelMixin:
         :type sigma2: float
         :param hw: half-width of Gaussian kernel
         :type hw: integer
+        :param dtype: type of the kernel elements
+        :type dtype: numpy dtype
         :return k: kernel
         :rtype: numpy array
 
@@ -145,6 +834,8 @@ class ImageProcessingKernelMixin:
 
             - This kernel is similar to the Laplacian of Gaussian and is often
               used as an efficient approximation.
+            - Kernels are cached and the returned array is read only, use
+              ``copy()`` to obtain a writable kernel.
         """
 
         # sigma1 > sigma2
@@ -160,13 +851,12 @@ class ImageProcessingKernelMixin:
         if hw is None:
             hw = np.ceil(3.0 * sigma1)
 
-        m1 = self.kgauss(sigma1, hw)  # thin kernel
-        m2 = self.kgauss(sigma2, hw)  # wide kernel
-
-        return m2 - m1
+        # difference of wide and thin kernels
+        return _kernel('dog', (float(sigma1), float(sigma2)), int(hw),
+                       np.dtype(dtype).str)
 
     @staticmethod
-    def klog(sigma, hw=None):
+    def klog(sigma, hw=None, dtype=np.float64):
         """
         Laplacian of Gaussian kernel
 
@@ -174,6 +864,8 @@ class ImageProcessingKernelMixin:
         :type sigma1: float
         :param hw: half-width of kernel
         :type hw: integer
+        :param dtype: type of the kernel elements
+        :type dtype: numpy dtype
         :return k: kernel
         :rtype: numpy array (2 * 3 * sigma + 1, 2 * 3 * sigma + 1)
 
@@ -188,19 +880,19 @@ class ImageProcessingKernelMixin:
 
         .. runblock:: pycon
 
+        .. note::
+
+            - Kernels are cached and the returned array is read only, use
+              ``copy()`` to obtain a writable kernel.
         """
 
         if hw is None:
             hw = np.ceil(3.0 * sigma)
-        wi = np.arange(-hw, hw + 1)
-        x, y = np.meshgrid(wi, wi)
 
-        return 1.0 / (np.pi * sigma ** 4.0) * \
-            ((np.power(x, 2) + np.power(y, 2)) / (2.0 * sigma ** 2) - 1) * \
-            np.exp(-(np.power(x, 2) + np.power(y, 2)) / (2.0 * sigma ** 2))
+        return _kernel('log', (float(sigma),), int(hw), np.dtype(dtype).str)
 
     @staticmethod
-    def kdgauss(sigma, hw=None):
+    def kdgauss(sigma, hw=None, dtype=np.float64):
         """
         Derivative of Gaussian kernel
 
@@ -208,6 +900,8 @@ class ImageProcessingKernelMixin:
         :type sigma1: float
         :param hw: half-width of kernel
         :type hw: integer
+        :param dtype: type of the kernel elements
+        :type dtype: numpy dtype
         :return k: kernel
         :rtype: numpy array (2 * 3 * sigma + 1, 2 * 3 * sigma + 1)
 
@@ -228,18 +922,18 @@ class ImageProcessingKernelMixin:
             - This kernel is the horizontal derivative of the Gaussian, dG/dx.
             - The vertical derivative, dG/dy, is k'.
             - This kernel is an effective edge detector.
+            - The kernel is separable, ``convolve`` uses its 1D factors.
+            - Kernels are cached and the returned array is read only, use
+              ``copy()`` to obtain a writable kernel.
         """
         if hw is None:
             hw = np.ceil(3.0 * sigma)
 
-        wi = np.arange(-hw, hw + 1)
-        x, y = np.meshgrid(wi, wi)
-
-        return -x / sigma ** 2 / (2.0 * np.pi) * \
-            np.exp(-np.power(x, 2) + np.power(y, 2) / 2.0 / sigma ** 2)
+        return _kernel('dgauss', (float(sigma),), int(hw),
+                       np.dtype(dtype).str)
 
     @staticmethod
-    def kcircle(r, hw=None):
+    def kcircle(r, hw=None, dtype=np.float64):
         """
         Circular structuring element
 
@@ -247,6 +941,8 @@ class ImageProcessingKernelMixin:
         :type r: float, 2-tuple or 2-element vector of floats
         :param hw: half-width of kernel
         :type hw: integer
+        :param dtype: type of the kernel elements
+        :type dtype: numpy dtype
         :return k: kernel
         :rtype: numpy array (2 * 3 * sigma + 1, 2 * 3 * sigma + 1)
 
@@ -265,32 +961,23 @@ class ImageProcessingKernelMixin:
 
             - If ``r`` is a 2-element vector the result is an annulus of ones,
               and the two numbers are interpretted as inner and outer radii.
+            - Kernels are cached and the returned array is read only, use
+              ``copy()`` to obtain a writable kernel.
         """
 
         # check valid input:
         if not argcheck.isscalar(r):  # r.shape[1] > 1:
             r = argcheck.getvector(r)
             rmax = r.max()
-            rmin = r.min()
+            args = (float(r.min()), float(rmax))
         else:
             rmax = r
+            args = (float(r),)
 
-        if hw is not None:
-            w = hw * 2 + 1
-        elif hw is None:
-            w = 2 * rmax + 1
-
-        s = np.zeros((np.int(w), np.int(w)))
-        c = np.floor(w / 2.0)
+        if hw is None:
+            hw = np.floor(rmax)
 
-        if not argcheck.isscalar(r):
-            s = self.kcircle(rmax, w) - self.kcircle(rmin, w)
-        else:
-            x = np.arange(w) - c
-            X, Y = np.meshgrid(x, x)
-            ll = np.where(np.round((X ** 2 + Y ** 2 - r ** 2) <= 0))
-            s[ll] = 1
-        return s
+        return _kernel('circle', args, int(hw), np.dtype(dtype).str)
 
     def smooth(self, sigma, hw=None, optmode='same', optboundary='fill'):
         """
@@ -310,85 +997,92 @@ class ImageProcessingKernelMixin:
 
         - ``IM.smooth(sigma, hw)`` as above with kernel half-width ``hw``.
 
-        - ``IM.smooth(sigma, opt)`` as above with options passed to np.convolve
+        - ``IM.smooth(sigma, optmode, optboundary)`` as above with the
+          convolution mode and boundary handling specified
 
         :options:
 
-            - 'full'    returns the full 2-D convolution (default)
-            - 'same'    returns OUT the same size as IM
+            - 'full'    returns the full 2-D convolution
+            - 'same'    returns OUT the same size as IM (default)
             - 'valid'   returns  the valid pixels only, those where the kernel
               does not exceed the bounds of the image.
 
+        :boundary options:
+
+            - 'fill'    pixels beyond the border are zero (default)
+            - 'wrap'    the image is periodic
+            - 'reflect' the image is reflected at the border
+
         Example:
 
         .. runblock:: pycon
 
         .. note::
 
-            - By default (option 'full') the returned image is larger than the
-              passed image.
-            - Smooths all planes of the input image.
-            - The Gaussian kernel has a unit volume.
-            - If input image is integer it is converted to float, convolved,
-              then converted back to integer.
+            - With option 'full' the returned image is larger than the passed
+              image.
+            - Smooths all planes of the input image in a single pass.
+            - The Gaussian kernel has a unit volume and is applied as two
+              one-dimensional kernels, a cost of O(hw) per pixel.
+            - If ``hw`` is not given and ``sigma`` is large a recursive
+              (Young-van Vliet) approximation to the Gaussian is used instead,
+              whose cost per pixel does not depend on ``sigma``.
+            - If input image is integer it is converted to float32, convolved,
+              then converted back to the same integer type.
         """
 
         if not argcheck.isscalar(sigma):
             raise ValueError(sigma, 'sigma must be a scalar')
 
+        # padding, in multiples of the kernel half-width, for each mode
         modeopt = {
-            'full': 'full',
-            'valid': 'valid',
-            'same': 'same'
+            'full': 2,
+            'valid': 0,
+            'same': 1
         }
         if optmode not in modeopt:
             raise ValueError(optmode, 'opt is not a valid option')
 
         boundaryopt = {
-            'fill': 'fill',
-            'wrap': 'wrap',
-            'reflect': 'symm'
+            'fill': cv.BORDER_CONSTANT,
+            'wrap': cv.BORDER_WRAP,
+            'reflect': cv.BORDER_REFLECT
         }
         if optboundary not in boundaryopt:
             raise ValueError(optboundary, 'opt is not a valid option')
 
-        is_int = False
-        if np.issubdtype(self.dtype, np.integer):
-            is_int = True
+        if self.isint:
             img = self.float()
         else:
             img = self
 
-        # make the smoothing kernel
-        K = self.kgauss(sigma, hw)
-
-        if img.iscolor:
-            # could replace this with a nested list comprehension
-
-            ims = []
-            for im in img:
-                o = np.dstack([signal.convolve2d(np.squeeze(im.image[:, :, i]),
-                                                 K,
-                                                 mode=modeopt[optmode],
-                                                 boundary=boundaryopt[
-                                                     optboundary])
-                              for i in range(im.numchannels)])
-                ims.append(o)
-
-        elif not img.iscolor:
-            ims = []
-            for im in img:
-                ims.append(signal.convolve2d(im.image,
-                                             K,
-                                             mode=modeopt[optmode],
-                                             boundary=boundaryopt[
-                                                 optboundary]))
-
+        if hw is None:
+            hw = int(np.ceil(3 * sigma))
+            iir = sigma >= _IIR_SIGMA
         else:
-            raise ValueError(self.iscolor, 'bad value for iscolor')
+            hw = int(hw)
+            iir = False
+
+        # the 2D Gaussian kernel is the outer product of two 1D kernels
+        K = _kernel_factors(self.kgauss(sigma, hw, dtype=img.dtype))[0]
+        pad = modeopt[optmode] * hw
+
+        ims = []
+        for im in img:
+            # explicit padding supports every boundary option, sepFilter2D
+            # does not support BORDER_WRAP, and all planes are padded at once
+            x = im.image
+            if pad > 0:
+                x = cv.copyMakeBorder(x, pad, pad, pad, pad,
+                                      boundaryopt[optboundary], value=0)
+            if iir:
+                y = _gauss_iir(x, sigma)
+            else:
+                y = cv.sepFilter2D(x, -1, K, K, borderType=cv.BORDER_REFLECT)
+            ims.append(y[hw:y.shape[0] - hw, hw:y.shape[1] - hw, ...])
 
-        if is_int:
-            return self.__class__(ims).int()
+        if self.isint:
+            return self.__class__(ims).int(self.dtype)
         else:
             return self.__class__(ims)
 
@@ -658,9 +1352,10 @@ class ImageProcessingKernelMixin:
         :param se: structuring element
         :type se: numpy array
         :param func: function to operate
-        :type funct: reference to a callable function
+        :type funct: reference to a callable function, or string
         :param opt: border option
         :type opt: string
+        :param kwargs: additional arguments passed to ``func``
         :return out: Image after function has operated on every pixel by func
         :rtype out: Image instance
 
@@ -669,21 +1364,29 @@ class ImageProcessingKernelMixin:
           corresponding pixel in image. The neighbourhood is defined by the
           size of the structuring element ``se`` which should have odd side
           lengths. The elements in the neighbourhood corresponding to non-zero
-          elements in ``se`` are packed into a vector (in column order from top
+          elements in ``se`` are packed into a vector (in row order from top
           left) and passed to the specified callable function ``func``. The
           return value of ``func`` becomes the corresponding pixel value.
 
         - ``IM.window(se, func, opt)`` as above but performance of edge pixels
           can be controlled.
 
+        - ``IM.window(se, 'percentile', q=90)`` as above but ``func`` is the
+          name of a built-in reduction, see below.
+
         :options:
 
-            - 'replicate'     the border value is replicated (default)
-            - 'none'          pixels beyond the border are not included in the
-              window
-            - 'trim'          output is not computed for pixels where the
-              structuring element crosses the image border, hence output image
-              has reduced dimensions TODO
+            - 'border'        the border value is replicated (default)
+            - 'none'          pixels beyond the border are zero
+            - 'wrap'          the image is periodic
+
+        :built-in reductions:
+
+            - 'min', 'max', 'range'  minimum, maximum and their difference
+            - 'mean', 'std'          mean and standard deviation
+            - 'median'               median
+            - 'percentile'           percentile ``q``, given as a keyword
+            - 'entropy'              Shannon entropy of the values, in bits
 
         Example:
 
@@ -692,31 +1395,71 @@ class ImageProcessingKernelMixin:
         .. note::
 
             - The structuring element should have an odd side length.
-            - Is slow since the function ``func`` must be invoked once for
-              every output pixel.
-            - The input can be logical, uint8, uint16, float or double, the
-              output is always double
+            - The built-in reductions are computed by OpenCV, SciPy ndimage
+              or vectorized NumPy code.  The NumPy functions ``np.min``,
+              ``np.max``, ``np.ptp``, ``np.mean``, ``np.std``,
+              ``np.median`` and ``np.percentile`` are recognized and
+              replaced by the equivalent built-in reduction, unless
+              ``kwargs`` holds arguments other than ``q`` for
+              ``np.percentile``.
+            - Other functions that accept an ``axis`` argument, such as
+              ``np.sum`` or ``np.var``, are called on blocks of windows with
+              ``axis=-1``, many windows per call.  The windows are a
+              zero-copy view of the image and a block of rows is gathered at
+              a time, so memory use is bounded.
+            - Any other callable is invoked once for every output pixel, which
+              is slow.  Which of the two is used is decided by one trial
+              call with ``axis=-1`` on the first two windows, errors raised
+              by later calls are not caught.
+            - The planes of a color image are processed independently.
+            - The result has the same type as the input image.
         """
-        # replace window's mex function with scipy's ndimage.generic_filter
-
         # border options:
         edgeopt = {
-            'border': 'nearest',
+            'border': 'edge',
             'none': 'constant',
             'wrap': 'wrap'
         }
         if opt not in edgeopt:
             raise ValueError(opt, 'opt is not a valid edge option')
 
-        if not callable(func):
-            raise TypeError(func, 'func not callable')
+        if not isinstance(func, str):
+            if not callable(func):
+                raise TypeError(func, 'func not callable')
+            # the built-in reductions take no arguments except q
+            name = _WINDOW_NUMPY.get(func)
+            if name is not None and set(kwargs) <= \
+                    ({'q'} if name == 'percentile' else set()):
+                func = name
+        if isinstance(func, str) and func not in _WINDOW_REDUCTIONS:
+            raise ValueError(func, 'unknown reduction')
+
+        # any non-zero element of se is in the window, as for generic_filter
+        se = np.asarray(se) != 0
+        kh, kw = se.shape
+        pad = [(kh // 2, kh - 1 - kh // 2), (kw // 2, kw - 1 - kw // 2)]
+
+        def reduce(x):
+            # apply the reduction to one plane
+            xp = np.pad(x, pad, mode=edgeopt[opt])
+            if isinstance(func, str):
+                return _WINDOW_REDUCTIONS[func](xp, se, **kwargs)
+            if _window_axis(xp, se, func, **kwargs):
+                return _window_reduce(xp, se, func, **kwargs)
+            # func does not reduce along an axis, call it per pixel
+            mode = {'border': 'nearest', 'none': 'constant',
+                    'wrap': 'wrap'}[opt]
+            return sp.ndimage.generic_filter(x, func, footprint=se,
+                                             mode=mode, extra_keywords=kwargs)
 
         out = []
         for im in self:
-            out.append(sp.ndimage.generic_filter(im.image,
-                                                 func,
-                                                 footprint=se,
-                                                 mode=edgeopt[opt]))
+            x = im.image
+            if x.ndim == 2:
+                y = reduce(x)
+            else:
+                y = np.dstack([reduce(x[:, :, i]) for i in range(x.shape[2])])
+            out.append(y.astype(x.dtype, copy=False))
         return self.__class__(out)
 
     def similarity(self, T, metric=None):
@@ -788,7 +1531,69 @@ class ImageProcessingKernelMixin:
 
         return self.__class__(out)
 
-    def convolve(self, K, optmode='same', optboundary='wrap'):
+    def convolvestrategy(self, K, optmode='same'):
+        """
+        Convolution strategy
+
+        :param K: kernel
+        :type K: numpy array
+        :param optmode: option for convolution
+        :type optmode: string
+        :return: strategy
+        :rtype: string
+
+        - ``IM.convolvestrategy(K)`` is the name of the strategy that
+          ``IM.convolve(K)`` will use, one of:
+
+            - 'direct'    spatial domain convolution with the 2D kernel
+            - 'separable' two passes with 1D kernels, only if ``K`` has rank
+              one
+            - 'fft'       multiplication in the frequency domain
+
+        - ``IM.convolvestrategy(K, optmode)`` as above but for the specified
+          convolution mode.
+
+        Example:
+
+        .. runblock:: pycon
+
+        .. note::
+
+            - The strategy with the lowest estimated cost is chosen.  The
+              cost model depends on the image size, the kernel size, whether
+              the kernel is separable and the numeric type, and was
+              calibrated against the OpenCV and SciPy implementations.
+            - A kernel is separable if its second singular value is
+              negligible compared to the first.  The 1D factors are cached.
+        """
+        K = self._convolvekernel(K)
+        if optmode not in ('full', 'valid', 'same'):
+            raise ValueError(optmode, 'opt is not a valid option')
+        dtype = self._convolvetype(K)[1]
+        cost = _convolve_cost(self.shape, dtype, K, optmode)
+        return min(cost, key=cost.get)
+
+    def _convolvekernel(self, K):
+        # kernel as a 2D or 3D numpy array
+        if isinstance(K, self.__class__):
+            K = K.image
+        K = np.asarray(K)
+        if K.ndim not in (2, 3):
+            raise ValueError(K, 'kernel must be a 2D or 3D array')
+        if K.ndim == 3 and self.iscolor:
+            raise ValueError(
+                self, 'image and kernel cannot both have muliple planes')
+        return K
+
+    def _convolvetype(self, K):
+        # type of the result, and floating point type used to compute it
+        outtype = np.result_type(self.dtype, K.dtype)
+        if outtype == np.float32:
+            return outtype, np.float32
+        else:
+            return outtype, np.float64
+
+    def convolve(self, K, optmode='same', optboundary='wrap', strategy=None):
         """
         Image convolution
 
@@ -798,6 +1603,8 @@ class ImageProcessingKernelMixin:
         :type optmode: string
         :param optboundary: option for boundary handling
         :type optboundary: string
+        :param strategy: convolution strategy
+        :type strategy: string
         :return C: Image convolved image
         :rtype C: Image instance
 
@@ -809,12 +1616,23 @@ class ImageProcessingKernelMixin:
         - ``IM.convolve(K, optboundary)`` as above but specifies the boundary
           handling options
 
+        - ``IM.convolve(K, strategy=s)`` as above but the convolution is
+          computed using the strategy ``s`` which is one of 'direct',
+          'separable' or 'fft', rather than that chosen by
+          ``IM.convolvestrategy(K)``.
+
         :options:
 
             - 'same'    output image is same size as input image (default)
             - 'full'    output image is larger than the input image
             - 'valid'   output image is smaller than the input image, and
-              contains only valid pixels TODO
+              contains only valid pixels
+
+        :boundary options:
+
+            - 'fill'    pixels beyond the border are zero
+            - 'wrap'    the image is periodic (default)
+            - 'reflect' the image is reflected at the border
 
         Example:
 
@@ -828,10 +1646,14 @@ class ImageProcessingKernelMixin:
             - If the kernel has multiple planes, the image is convolved with
               each plane of the kernel, resulting in an output image with the
               same number of planes.
+            - All planes are convolved in a single call where the strategy
+              allows it.
             - This function is a convenience wrapper for the MATLAB function
               CONV2.
-            - Works for double, uint8 or uint16 images.  Image and kernel must
-              be of the same type and the result is of the same type.
+            - The result has the type given by the NumPy promotion rules for
+              the image and kernel types, for example a uint8 image and a
+              float kernel give a float64 result.  An integer result is
+              rounded and saturated.
             - This function replaces iconv().
 
         :references:
@@ -840,59 +1662,120 @@ class ImageProcessingKernelMixin:
               Springer 2011.
         """
 
-        # TODO check images are of the same type
+        K = self._convolvekernel(K)
 
-        # TODO check opt is valid string based on conv2 options
-        modeopt = {
-            'full': 'full',
-            'valid': 'valid',
-            'same': 'same'
-        }
-        if optmode not in modeopt:
+        if optmode not in ('full', 'valid', 'same'):
             raise ValueError(optmode, 'opt is not a valid option')
 
         boundaryopt = {
-            'fill': 'fill',
+            'fill': 'constant',
             'wrap': 'wrap',
-            'reflect': 'symm'
+            'reflect': 'symmetric'
         }
         if optboundary not in boundaryopt:
             raise ValueError(optboundary, 'opt is not a valid option')
 
+        if strategy is None:
+            strategy = self.convolvestrategy(K, optmode)
+        elif strategy not in ('direct', 'separable', 'fft'):
+            raise ValueError(strategy, 'strategy is not a valid option')
+
+        outtype, dtype = self._convolvetype(K)
+        kh, kw = K.shape[:2]
+        if K.ndim == 2:
+            planes = [K]
+        else:
+            planes = [K[:, :, i] for i in range(K.shape[2])]
+
+        if strategy == 'separable':
+            factors = [_kernel_factors(k) for k in planes]
+            if any(f is None for f in factors):
+                raise ValueError(K, 'kernel is not separable')
+            # correlation with the reversed factors is convolution
+            factors = [(np.ascontiguousarray(u[::-1], dtype=dtype),
+                        np.ascontiguousarray(v[::-1], dtype=dtype))
+                       for u, v in factors]
+        elif strategy == 'direct':
+            planes = [np.ascontiguousarray(k[::-1, ::-1], dtype=dtype)
+                      for k in planes]
+        else:
+            Kf = K.astype(dtype)
+
+        # every mode is a valid convolution of the padded image
+        if optmode == 'full':
+            pad = [(kh - 1, kh - 1), (kw - 1, kw - 1)]
+        elif optmode == 'same':
+            pad = [(kh - 1 - (kh - 1) // 2, (kh - 1) // 2),
+                   (kw - 1 - (kw - 1) // 2, (kw - 1) // 2)]
+        else:
+            pad = [(0, 0), (0, 0)]
+
         out = []
         for im in self:
-            if im.iscolor and K.ndim == 2:
-                # image has multiple planes:
-                C = np.dstack([signal.convolve2d(im.image[:, :, i],
-                                                 K,
-                                                 mode=modeopt[optmode],
-                                                 boundary=boundaryopt[
-                                                     optboundary])
-                               for i in range(im.nchannels)])
-
-            elif not im.iscolor and K.ndim == 2:
-                # simple case, convolve image with kernel, both are 2D
-                C = signal.convolve2d(im.image,
-                                      K,
-                                      mode=modeopt[optmode],
-                                      boundary=boundaryopt[optboundary])
-
-            elif not im.iscolor and K.ndim == 3:
-                # kernel has multiple planes:
-                C = np.dstack([signal.convolve2d(im.image,
-                                                 K.image[:, :, i],
-                                                 mode=modeopt[optmode],
-                                                 boundary=boundaryopt[
-                                                     optboundary])
-                               for i in range(K.shape[2])])
+            x = im.image.astype(dtype, copy=False)
+            x = np.pad(x, pad + [(0, 0)] * (x.ndim - 2),
+                       mode=boundaryopt[optboundary])
+            oh = x.shape[0] - kh + 1
+            ow = x.shape[1] - kw + 1
+            if oh < 1 or ow < 1:
+                raise ValueError(K, 'kernel is larger than the image')
+
+            if strategy == 'fft':
+                # planes of image or kernel are broadcast along the third axis
+                if K.ndim == 3:
+                    x = x[:, :, np.newaxis]
+                elif x.ndim == 3:
+                    Kf = Kf.reshape((kh, kw, 1))
+                C = signal.fftconvolve(x, Kf, mode='valid', axes=(0, 1))
             else:
-                raise ValueError(
-                    im, 'image and kernel cannot both have muliple planes')
-            out.append(C)
+                C = []
+                for i, k in enumerate(planes):
+                    # anchor at the kernel origin, only the top-left part of
+                    # the result, which does not depend on the border, is kept
+                    if strategy == 'direct':
+                        y = cv.filter2D(x, -1, k, anchor=(0, 0))
+                    else:
+                        u, v = factors[i]
+                        y = cv.sepFilter2D(x, -1, v, u, anchor=(0, 0))
+                    C.append(y[:oh, :ow, ...])
+                C = C[0] if K.ndim == 2 else np.dstack(C)
+
+            if np.issubdtype(outtype, np.integer):
+                info = np.iinfo(outtype)
+                C = np.clip(np.rint(C), info.min, info.max)
+            out.append(C.astype(outtype, copy=False))
 
         return self.__class__(out)
 
-    def canny(self, sigma=1, th0=None, th1=None):
+    def gradients(self, sigma=1):
+        """
+        Image gradients
+
+        :param sigma: standard deviation of the derivative of Gaussian kernel
+        :type sigma: float
+        :return: gradient field
+        :rtype: ImageGradients instance
+
+        - ``IM.gradients(sigma)`` is an object holding the smoothed gradients
+          ``Ix`` and ``Iy`` of the image, their ``magnitude`` and
+          ``orientation``.  Each is computed when it is first requested.
+
+        Example:
+
+        .. runblock:: pycon
+
+        .. note::
+
+            - A color image is automatically converted to greyscale first.
+            - The gradients are equal to convolution with ``kdgauss(sigma)``
+              and its transpose, but are computed with separable float32
+              filters.
+            - The result can be passed to ``canny`` and reused by other
+              operations on the same image.
+        """
+        return ImageGradients(self, sigma)
+
+    def canny(self, sigma=1, th0=None, th1=None, gradient=False):
         """
         Canny edge detection
 
@@ -902,6 +1785,8 @@ class ImageProcessingKernelMixin:
         :type th0: float
         :param th1: upper threshold
         :type th1: float
+        :param gradient: also return gradient magnitude and orientation
+        :type gradient: bool
         :return E: Image with edge image
         :rtype E: Image instance
 
@@ -914,6 +1799,17 @@ class ImageProcessingKernelMixin:
           the Gaussian smoothing, ``sigma``, lower and upper thresholds
           ``th0``, ``th1`` can be specified
 
+        - ``IM.canny(G, th0, th1)`` as above but uses the gradient field ``G``
+          returned by ``IM.gradients(sigma)``.
+
+        - ``IM.canny(gradient=True)`` as above but returns a named tuple with
+          elements:
+
+            - ``edges`` the edge image
+            - ``magnitude`` the gradient magnitude, float32
+            - ``orientation`` the gradient direction ``atan2(Iy, Ix)`` in
+              radians, float32
+
         Example:
 
         .. runblock:: pycon
@@ -925,6 +1821,13 @@ class ImageProcessingKernelMixin:
             - Larger values correspond to stronger edges.
             - If th1 is zero then no hysteresis filtering is performed.
             - A color image is automatically converted to greyscale first.
+            - The thresholds are in units of gradient magnitude, intensity per
+              pixel.  By default ``th0`` is 0.1 of the maximum pixel value,
+              1.0 for a float image, and ``th1 = 1.5 * th0``.
+            - The signed gradients are computed at float32 by separable
+              derivative of Gaussian filters and passed to ``cv.Canny`` as
+              int16, scaled to use its full range.
+            - The frames of an image sequence are processed in parallel.
 
         :references:
 
@@ -934,12 +1837,15 @@ class ImageProcessingKernelMixin:
 
         """
 
-        # convert to greyscale:
-        img = self.mono()
+        if isinstance(sigma, ImageGradients):
+            G = sigma
+        else:
+            G = self.gradients(sigma)
+        img = G.image
 
         # set defaults (eg thresholds, eg one as a function of the other)
         if th0 is None:
-            if np.issubdtype(th0, np.float):
+            if img.isfloat:
                 th0 = 0.1
             else:
                 # isint
@@ -947,21 +1853,15 @@ class ImageProcessingKernelMixin:
         if th1 is None:
             th1 = 1.5 * th0
 
-        # compute gradients Ix, Iy using guassian kernel
-        dg = self.kdgauss(sigma)
-
-        out = []
-        for im in img:
-            Ix = np.abs(im.convolve(dg, 'same').image)
-            Iy = np.abs(im.convolve(np.transpose(dg), 'same').image)
-
-            # Ix, Iy must be 16-bit input image
-            Ix = np.array(Ix, dtype=np.int16)
-            Iy = np.array(Iy, dtype=np.int16)
+        E = _map_frames(lambda Ix, Iy: _canny(Ix, Iy, th0, th1),
+                        G._get('Ix'), G._get('Iy'))
+        E = self.__class__(E)
 
-            out.append((cv.Canny(Ix, Iy, th0, th1, L2gradient=True)))
-
-        return self.__class__(out)
+        if gradient:
+            return namedtuple('canny', 'edges magnitude orientation')(
+                E, G.magnitude, G.orientation)
+        else:
+            return E
 
 
 # --------------------------------------------------------------------------#
@@ -1,9 +1,1211 @@
 #!/usr/bin/env python
 
+import functools
 import numpy as np
 import cv2 as cv
 import time
 import scipy as sp
+from collections import namedtuple
+
+
+# calibrated cost model for Image.rank, in ns per pixel, of the histogram
+# method per distinct grey level and of ndimage.rank_filter per element of the
+# structuring element
+_RANK_COST = dict(level=2.2, element=17)
+
+# region statistics returned by Image.label, one element per label
+_labelstats = namedtuple('labelstats', 'area umin umax vmin vmax uc vc')
+
+# connected component labelling algorithms for Image.label
+_CCL_ALGORITHM = {
+    'default': cv.CCL_DEFAULT,
+    'wu': cv.CCL_WU,
+    'sauf': cv.CCL_SAUF,
+    'grana': cv.CCL_GRANA,
+    'bbdt': cv.CCL_BBDT,
+    'bolelli': cv.CCL_BOLELLI,
+    'spaghetti': cv.CCL_SPAGHETTI,
+}
+
+
+def _levels(x):
+    """
+    Distinct values in an image
+
+    :param x: image
+    :type x: numpy array
+    :return: distinct values in ascending order
+    :rtype: numpy array
+    """
+    if x.dtype in (np.uint8, np.uint16):
+        return np.flatnonzero(np.bincount(x.ravel())).astype(x.dtype)
+    return np.unique(x)
+
+
+def _rank_histogram(xp, shape, r, levels):
+    """
+    Rank filter by threshold decomposition
+
+    :param xp: padded image
+    :type xp: numpy array (H+N-1,W+M-1)
+    :param shape: shape of the rectangular window
+    :type shape: 2-tuple (N,M)
+    :param r: rank, zero is the minimum
+    :type r: int
+    :param levels: distinct values in ``xp`` in ascending order
+    :type levels: numpy array (L,)
+    :return: rank filtered image
+    :rtype: numpy array (H,W)
+
+    For each level ``v`` the number of pixels in the window that are less
+    than or equal to ``v`` is a box filter of a binary image, whose cost does
+    not depend on the size of the window.  The value of rank ``r`` is the
+    smallest level for which this count exceeds ``r``, and the number of
+    levels for which it does not is accumulated, so the cost is proportional
+    to the number of distinct values in the image, not the window size.
+    """
+    kh, kw = shape
+    H = xp.shape[0] - kh + 1
+    W = xp.shape[1] - kw + 1
+    ddepth = cv.CV_16U if kh * kw < 65536 else cv.CV_32F
+    k = np.zeros((H, W), dtype=np.int32)
+    for v in levels[:-1]:
+        count = cv.boxFilter((xp <= v).view(np.uint8), ddepth, (kw, kh),
+                             anchor=(0, 0), normalize=False)
+        k += count[:H, :W] <= r
+    return levels[k]
+
+
+# line lengths beyond which the van Herk/Gil-Werman algorithm is faster than
+# OpenCV for a 1D erosion or dilation, for each image type.  OpenCV is
+# vectorized for integer and float32 images, but its cost grows with length
+_VHGW_LENGTH = {
+    np.dtype(np.uint8): 2000,
+    np.dtype(np.uint16): 2000,
+    np.dtype(np.int16): 2000,
+    np.dtype(np.float32): 400,
+    np.dtype(np.float64): 100,
+}
+
+# structuring elements with at least this many elements are decomposed into
+# lines, smaller ones are passed directly to OpenCV
+_DECOMPOSE_AREA = 100
+
+# two-valued images are eroded or dilated by disks of at least this radius by
+# thresholding the distance transform, whose cost does not depend on the
+# radius, for each image type
+_DISK_RADIUS = {
+    np.dtype(np.uint8): 100,
+    np.dtype(np.uint16): 50,
+    np.dtype(np.int16): 50,
+    np.dtype(np.float32): 28,
+    np.dtype(np.float64): 8,
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _decompose_cached(data, shape):
+    se = np.frombuffer(data, dtype=np.uint8).reshape(shape) != 0
+    ay, ax = shape[0] // 2, shape[1] // 2
+
+    # the row runs, as column offsets from the anchor
+    runs = {}
+    for r in range(shape[0]):
+        c = np.flatnonzero(se[r])
+        if len(c) == 0:
+            continue
+        if c[-1] - c[0] + 1 != len(c):
+            return None
+        runs[r] = (c[0] - ax, c[-1] - ax)
+    if len(runs) == 0:
+        return None
+
+    # one rectangle per distinct run, spanning the rows whose run contains it
+    intervals = sorted(set(runs.values()), key=lambda I: I[1] - I[0])
+    steps = []
+    rows = []
+    prev = (0, 0)
+    for I in intervals:
+        if not (I[0] <= prev[0] and prev[1] <= I[1]):
+            return None
+        R = [r for r, run in runs.items() if run[0] <= I[0] and I[1] <= run[1]]
+        if R[-1] - R[0] + 1 != len(R):
+            return None
+        steps.append((I[0] - prev[0], I[1] - prev[1]))
+        rows.append((R[0] - ay, R[-1] - ay))
+        prev = I
+
+    # the vertical extents shrink as the runs grow, each is the next one
+    # extended by a vertical line
+    rows.append((0, 0))
+    vsteps = []
+    for J, Jnext in zip(rows[:-1], rows[1:]):
+        dv = (J[0] - Jnext[0], J[1] - Jnext[1])
+        if not (dv[0] <= 0 <= dv[1]):
+            return None
+        vsteps.append(dv)
+    return tuple(zip(steps, vsteps))
+
+
+def _decompose(se):
+    """
+    Decompose a structuring element into lines
+
+    :param se: structuring element
+    :type se: numpy array (N,M) of uint8
+    :return: horizontal and vertical line steps, or None
+    :rtype: tuple of 2-tuples of intervals
+
+    If ``se`` is the union of rectangles ``R_k = I_k x J_k``, whose
+    horizontal extents ``I_k`` grow and vertical extents ``J_k`` shrink, and
+    which contain the anchor, return the steps ``(dh_k, dv_k)``.  ``dh_k`` is
+    the line that extends ``I_{k-1}`` to ``I_k``, and ``dv_k`` the line that
+    extends ``J_{k+1}`` to ``J_k``, as offset intervals relative to the
+    anchor.  Rectangles, lines, and convex symmetric elements such as
+    ``kcircle`` can be decomposed this way.  Otherwise return None.  The
+    result is cached.
+    """
+    se = np.ascontiguousarray(se, dtype=np.uint8)
+    return _decompose_cached(se.tobytes(), se.shape)
+
+
+@functools.lru_cache(maxsize=64)
+def _disk_cached(data, shape):
+    se = np.frombuffer(data, dtype=np.uint8).reshape(shape) != 0
+    h = shape[0] // 2
+    if shape[0] != shape[1] or shape[0] % 2 == 0 or not se[h, h]:
+        return None
+    v, u = np.mgrid[-h:h + 1, -h:h + 1]
+    r2 = u ** 2 + v ** 2
+    T = r2[se].max()
+    if T >= (h + 1) ** 2 or r2[~se].min(initial=T + 1) <= T:
+        return None
+    return int(T)
+
+
+def _disk(se):
+    """
+    Squared radius of a disk structuring element
+
+    :param se: structuring element
+    :type se: numpy array (N,N) of uint8
+    :return: squared radius, or None
+    :rtype: int
+
+    If the non-zero elements of ``se`` are exactly the offsets ``(u,v)``
+    from the centre with ``u**2 + v**2 <= T``, as for ``kcircle``, return the
+    integer ``T``.  Otherwise return None.  The result is cached.
+    """
+    se = np.ascontiguousarray(se, dtype=np.uint8)
+    return _disk_cached(se.tobytes(), se.shape)
+
+
+def _distance(x, metric='euclidean', indices=False):
+    """
+    Distance transform of one frame
+
+    :param x: image, non-zero pixels are the objects
+    :type x: numpy array (N,H)
+    :param metric: 'euclidean', 'cityblock' or 'chessboard'
+    :type metric: string
+    :param indices: also return the nearest background pixel
+    :type indices: bool
+    :return: distance and, if ``indices``, the column and row of the nearest
+             background pixel
+    :rtype: numpy array (N,H) of float32, or a 3-tuple
+
+    The distances are exact, computed in linear time by OpenCV which uses the
+    algorithm of Felzenszwalb and Huttenlocher for the Euclidean metric, or
+    by SciPy if the indices are required.  If there is no background pixel
+    the distance is infinite and the indices are -1.
+    """
+    b = (x != 0).view(np.uint8)
+    if b.all():
+        d = np.full(b.shape, np.inf, dtype=np.float32)
+        if indices:
+            u = np.full(b.shape, -1, dtype=np.int32)
+            return d, u, u.copy()
+        return d
+
+    if not indices:
+        cvmetric = {'euclidean': (cv.DIST_L2, cv.DIST_MASK_PRECISE),
+                    'cityblock': (cv.DIST_L1, 3),
+                    'chessboard': (cv.DIST_C, 3)}[metric]
+        return cv.distanceTransform(b, *cvmetric, dstType=cv.CV_32F)
+
+    if metric == 'euclidean':
+        d, idx = sp.ndimage.distance_transform_edt(b, return_indices=True)
+    else:
+        d, idx = sp.ndimage.distance_transform_cdt(
+            b, {'cityblock': 'taxicab'}.get(metric, metric),
+            return_indices=True)
+    return d.astype(np.float32), idx[1], idx[0]
+
+
+def _morph_disk(x, T, op):
+    """
+    Erosion or dilation of a two-valued image by a disk
+
+    :param x: image with at most two distinct values
+    :type x: numpy array (N,H)
+    :param T: squared radius of the disk
+    :type T: int
+    :param op: 'min' for erosion or 'max' for dilation
+    :type op: string
+    :return: eroded or dilated image
+    :rtype: numpy array (N,H)
+
+    A pixel is kept by the erosion if the nearest pixel with the lower value
+    is more than ``sqrt(T)`` away, and set by the dilation if the nearest
+    pixel with the higher value is within ``sqrt(T)``.  Squared distances are
+    integers so the threshold ``sqrt(T + 0.5)`` is robust to rounding.  The
+    result is identical to ``cv.erode`` or ``cv.dilate`` with a replicated
+    border.
+    """
+    lo, hi = x.min(), x.max()
+    fg = x == hi
+    t = np.sqrt(T + 0.5)
+    if op == 'min':
+        keep = _distance(fg) > t
+    else:
+        keep = _distance(~fg) < t
+    return np.where(keep, hi, lo).astype(x.dtype)
+
+
+def _twovalued(x):
+    # True if the image has at most two distinct values
+    lo, hi = x.min(), x.max()
+    return np.count_nonzero((x != lo) & (x != hi)) == 0
+
+
+def _vhgw(x, interval, axis, op):
+    """
+    Van Herk/Gil-Werman 1D erosion or dilation
+
+    :param x: image
+    :type x: numpy array
+    :param interval: first and last offset of the line, relative to the anchor
+    :type interval: 2-tuple of int
+    :param axis: axis along which the line lies
+    :type axis: int
+    :param op: np.minimum or np.maximum
+    :type op: ufunc
+    :return: eroded or dilated image
+    :rtype: numpy array, same shape and type as ``x``
+
+    The padded signal is divided into blocks of the line length ``L``, and the
+    running extremum from the start of each block and from the end of each
+    block are computed.  The extremum over any window of length ``L`` is that
+    of one suffix and one prefix value, so the cost is about three
+    comparisons per pixel whatever the length.  The border is replicated.
+    """
+    a, b = -interval[0], interval[1]
+    L = a + b + 1
+    x = np.moveaxis(x, axis, 0)
+    N = x.shape[0]
+    extra = (-(N + L - 1)) % L
+    pad = [(a, b + extra)] + [(0, 0)] * (x.ndim - 1)
+    blocks = np.pad(x, pad, mode='edge').reshape((-1, L) + x.shape[1:])
+    g = op.accumulate(blocks, axis=1).reshape((-1,) + x.shape[1:])
+    h = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1]
+    h = h.reshape((-1,) + x.shape[1:])
+    y = op(h[:N], g[L - 1:L - 1 + N])
+    return np.ascontiguousarray(np.moveaxis(y, 0, axis))
+
+
+def _line(x, interval, axis, op):
+    # 1D erosion or dilation with a replicated border
+    L = interval[1] - interval[0] + 1
+    if L == 1:
+        return x
+    if L >= _VHGW_LENGTH.get(x.dtype, 100):
+        return _vhgw(x, interval, axis, np.minimum if op == 'min'
+                     else np.maximum)
+    if axis == 1:
+        kernel = np.ones((1, L), dtype=np.uint8)
+        anchor = (-interval[0], 0)
+    else:
+        kernel = np.ones((L, 1), dtype=np.uint8)
+        anchor = (0, -interval[0])
+    cvop = cv.erode if op == 'min' else cv.dilate
+    return cvop(x, kernel, anchor=anchor, borderType=cv.BORDER_REPLICATE)
+
+
+def _morph(x, se, op, n, opt):
+    """
+    Erosion or dilation of one frame
+
+    :param x: image
+    :type x: numpy array
+    :param se: structuring element
+    :type se: numpy array (N,M) of uint8
+    :param op: 'min' for erosion or 'max' for dilation
+    :type op: string
+    :param n: number of times the operation is applied
+    :type n: int
+    :param opt: border option 'replicate' or 'none'
+    :type opt: string
+    :return: eroded or dilated image
+    :rtype: numpy array
+
+    If the structuring element is large and can be decomposed into lines the
+    erosion is computed as
+
+        U_1 = V_1(G_1),  U_k = V_k(min(U_{k-1}, G_k)),  G_k = H_k(G_{k-1})
+
+    where ``H_k`` and ``V_k`` are the horizontal and vertical line erosions of
+    the decomposition and ``G_0`` is the image.  Since erosion distributes
+    over the minimum, ``U_n`` is the minimum of the erosions by every
+    rectangle, and the total line length is only the width plus the height
+    of the structuring element.  For border option 'none' the image is padded
+    with the identity element of the operation.  The result is identical to
+    ``cv.erode`` or ``cv.dilate`` with the whole structuring element.
+
+    A two-valued image and a large disk are instead handled by thresholding
+    the distance transform, see ``_morph_disk``.
+    """
+    if n == 1 and x.ndim == 2 and se.ndim == 2 and \
+            se.shape[0] > 2 * _DISK_RADIUS.get(x.dtype, 8):
+        T = _disk(se)
+        if T is not None and T < 1e6 and _twovalued(x):
+            return _morph_disk(x, T, op)
+
+    steps = None
+    if np.count_nonzero(se) >= _DECOMPOSE_AREA and \
+            x.dtype in _VHGW_LENGTH:
+        steps = _decompose(se)
+
+    if steps is None:
+        cvop = cv.erode if op == 'min' else cv.dilate
+        border = {'replicate': cv.BORDER_REPLICATE,
+                  'none': cv.BORDER_ISOLATED}[opt]
+        return cvop(x, se, iterations=n, borderType=border)
+
+    minmax = np.minimum if op == 'min' else np.maximum
+    if opt == 'none':
+        if np.issubdtype(x.dtype, np.integer):
+            info = np.iinfo(x.dtype)
+            identity = info.max if op == 'min' else info.min
+        else:
+            identity = np.inf if op == 'min' else -np.inf
+        ph, pw = n * (se.shape[0] // 2 + 1), n * (se.shape[1] // 2 + 1)
+        pad = [(ph, ph), (pw, pw)] + [(0, 0)] * (x.ndim - 2)
+        x = np.pad(x, pad, mode='constant', constant_values=identity)
+
+    for i in range(n):
+        G = x
+        U = None
+        for dh, dv in steps:
+            G = _line(G, dh, 1, op)
+            U = G if U is None else minmax(U, G)
+            U = _line(U, dv, 0, op)
+        x = U
+
+    if opt == 'none':
+        x = x[ph:x.shape[0] - ph, pw:x.shape[1] - pw, ...]
+    return np.ascontiguousarray(x)
+
+
+# weight of each pixel of a 3x3 neighbourhood in its 9-bit code, row-major
+# with the top-left pixel the least significant bit
+_NHOOD_WEIGHTS = (1 << np.arange(9)).reshape((3, 3))
+_NHOOD_BITS = (np.arange(512)[:, np.newaxis] >> np.arange(9)) & 1
+
+# offsets of the neighbourhood pixels, in the same order as the code bits
+_NHOOD_OFFSETS = np.array([(v, u) for v in (-1, 0, 1) for u in (-1, 0, 1)])
+
+
+def _nhood_lut(*patterns):
+    """
+    Lookup table for 3x3 hit-or-miss patterns
+
+    :param patterns: hit-or-miss patterns, each a 2-tuple of structuring
+                     elements for the pixels that must be set and the pixels
+                     that must be clear
+    :type patterns: 2-tuples of numpy array (3,3)
+    :return: lookup table
+    :rtype: numpy array (512,) of bool
+
+    Element ``c`` of the table is True if the neighbourhood with code ``c``
+    matches any of the patterns.
+    """
+    lut = np.zeros((512,), dtype=bool)
+    for hit, miss in patterns:
+        hit = np.asarray(hit).ravel() > 0
+        miss = np.asarray(miss).ravel() > 0
+        lut |= np.all(_NHOOD_BITS[:, hit] == 1, axis=1) \
+            & np.all(_NHOOD_BITS[:, miss] == 0, axis=1)
+    return lut
+
+
+def _nhood_pattern(se):
+    # hit and miss elements of a pattern with values 1, 0 and nan (don't care)
+    se = np.asarray(se, dtype=np.float64)
+    return se == 1, se == 0
+
+
+def _nhood_codes(b):
+    """
+    Neighbourhood codes of a binary image
+
+    :param b: binary image
+    :type b: numpy array (N,H) of uint8 with values 0 or 1
+    :return: 9-bit code of the 3x3 neighbourhood of every pixel
+    :rtype: numpy array (N,H) of int16
+
+    The border is replicated, as for the other morphological operations.
+    """
+    return cv.filter2D(b, cv.CV_16S, _NHOOD_WEIGHTS.astype(np.float32),
+                       borderType=cv.BORDER_REPLICATE)
+
+
+def _nhood_apply(b, lut):
+    """
+    Apply a neighbourhood lookup table to a binary image
+
+    :param b: binary image
+    :type b: numpy array (N,H) of uint8 with values 0 or 1
+    :param lut: lookup table
+    :type lut: numpy array (512,) of bool
+    :return: table value for the neighbourhood of every pixel
+    :rtype: numpy array (N,H) of bool
+
+    The codes of the eight neighbours fit in a byte, so the table is split
+    into the halves for a clear and a set centre pixel, each applied with
+    ``cv.LUT``.
+    """
+    n = np.arange(256)
+    code = (n & 15) | ((n >> 4) << 5)
+    weights = _NHOOD_WEIGHTS.astype(np.float32)
+    weights[1, 1] = 0
+    weights[2, :] /= 2
+    weights[1, 2] /= 2
+    c = cv.filter2D(b, -1, weights, borderType=cv.BORDER_REPLICATE)
+    out = cv.LUT(c, lut[code | 16].astype(np.uint8)) & b
+    if np.any(lut[code]):
+        out |= cv.LUT(c, lut[code].astype(np.uint8)) & (1 - b)
+    return out.view(bool)
+
+
+def _thin(b, luts):
+    """
+    Thinning by a cyclic sequence of lookup tables
+
+    :param b: binary image
+    :type b: numpy array (N,H) of uint8 with values 0 or 1
+    :param luts: lookup tables of the pixels to remove at each step
+    :type luts: list of numpy array (512,) of bool
+    :return: thinned image
+    :rtype: numpy array (N,H) of uint8
+
+    Each step removes, in parallel, the set pixels whose neighbourhood
+    matches its table, and the sequence is repeated until a whole cycle
+    removes nothing.  The tables must only match set pixels with at least one
+    clear neighbour.
+
+    The neighbourhood codes are computed once, and when a pixel is removed
+    its weight is subtracted from the codes of its neighbours.  Only the
+    boundary pixels, those with a clear neighbour, are looked up at each
+    step, and a removed pixel adds its set neighbours to the boundary, so the
+    cost of a step is proportional to the length of the boundary rather than
+    the area of the image.
+    """
+    H, W = b.shape
+    # pad by two, the inner ring replicates the border and codes are only
+    # maintained for the image pixels, the outer ring is never read
+    Wp = W + 4
+    bp = np.pad(b, 2)
+    code = np.pad(_nhood_codes(b), 2)
+    inside = np.zeros(bp.shape, dtype=bool)
+    inside[2:-2, 2:-2] = True
+    bp, code, inside = bp.ravel(), code.ravel(), inside.ravel()
+    offsets = _NHOOD_OFFSETS[:, 0] * Wp + _NHOOD_OFFSETS[:, 1]
+    weights = _NHOOD_WEIGHTS.ravel().astype(np.int16)
+
+    boundary = np.flatnonzero(inside & (bp > 0) & (code != 511))
+    isboundary = np.zeros(bp.shape, dtype=bool)
+    isboundary[boundary] = True
+    slot = np.zeros(bp.shape, dtype=np.intp)
+
+    step = 0
+    quiet = 0
+    while quiet < len(luts):
+        remove = luts[step % len(luts)][code[boundary]]
+        idx = boundary[remove]
+        step += 1
+        if len(idx) == 0:
+            quiet += 1
+            continue
+        quiet = 0
+        boundary = boundary[~remove]
+        bp[idx] = 0
+        isboundary[idx] = False
+
+        # removed pixels and the border cells that replicate them
+        cells = idx
+        v, u = np.divmod(idx, Wp)
+        edge = (v == 2) | (v == H + 1) | (u == 2) | (u == W + 1)
+        if np.any(edge):
+            v, u, e = v[edge], u[edge], idx[edge]
+            cells = [idx]
+            for dv, du in _NHOOD_OFFSETS:
+                on = ((v == 2) if dv < 0 else (v == H + 1)) if dv else True
+                on = on & (((u == 2) if du < 0 else (u == W + 1))
+                           if du else True)
+                if (dv or du) and np.any(on):
+                    cells.append(e[on] + dv * Wp + du)
+            cells = np.concatenate(cells)
+        for offset, weight in zip(offsets, weights):
+            code[cells - offset] -= weight
+
+        # set neighbours of removed pixels join the boundary, a pixel that
+        # is the neighbour of several is kept once
+        n = (idx[:, np.newaxis] + offsets).ravel()
+        n = n[inside[n] & (bp[n] > 0) & ~isboundary[n]]
+        first = np.arange(len(n))
+        slot[n] = first
+        n = n[slot[n] == first]
+        isboundary[n] = True
+        boundary = np.concatenate((boundary, n))
+
+    return bp.reshape((H + 4, Wp))[2:-2, 2:-2].copy()
+
+
+def _openings(x, radii, ses=None):
+    """
+    Openings of one frame at increasing scales
+
+    :param x: image
+    :type x: numpy array
+    :param radii: radii in ascending order
+    :type radii: numpy array (N,)
+    :param ses: disk structuring element for each radius, or None for squares
+                of side ``2r+1``
+    :type ses: list of numpy array of uint8
+    :return: opening for each radius
+    :rtype: generator of numpy array
+
+    Squares are Minkowski sums of each other, so the erosion at each radius
+    is that at the previous radius eroded by a line in each direction, and
+    the dilation is by two lines.  A disk is not the sum of smaller digital
+    disks, but for a two-valued image the erosion by every disk is a
+    threshold of the one distance transform of the objects, as in
+    ``_morph_disk``, and only the dilations are computed for each radius.
+    Otherwise each disk opening is computed by ``_morph`` which decomposes
+    large disks into lines.  The result is identical to ``open`` with a
+    replicated border.
+    """
+    if ses is None:
+        E = x
+        h = 0
+        for r in radii:
+            if r > h:
+                E = _line(_line(E, (h - r, r - h), 1, 'min'),
+                          (h - r, r - h), 0, 'min')
+                h = r
+            yield _line(_line(E, (-r, r), 1, 'max'), (-r, r), 0, 'max')
+        return
+
+    T = [_disk(se) for se in ses]
+    if x.ndim == 2 and None not in T and _twovalued(x):
+        lo, hi = x.min(), x.max()
+        D = _distance(x == hi)
+        for t, se in zip(T, ses):
+            # dilate the 0/1 mask of the erosion, then map it to lo and hi
+            O = _morph((D > np.sqrt(t + 0.5)).view(np.uint8), se, 'max', 1,
+                       'replicate')
+            if x.dtype != np.uint8 or lo != 0 or hi != 1:
+                O = np.where(O, hi, lo).astype(x.dtype)
+            yield O
+    else:
+        for se in ses:
+            yield _morph(_morph(x, se, 'min', 1, 'replicate'), se, 'max', 1,
+                         'replicate')
+
+
+# greyscale reconstruction switches from sweeps over the whole image to a
+# queue of changed pixels when fewer than this fraction of the pixels change
+# in a round of sweeps
+_RECONSTRUCT_SPARSE = 1 / 16
+
+
+def _lowest(dtype):
+    # smallest value of a type
+    if np.issubdtype(dtype, np.integer):
+        return np.iinfo(dtype).min
+    return -np.inf
+
+
+def _complement(x):
+    # order reversing map of a type onto itself
+    if np.issubdtype(x.dtype, np.integer):
+        return np.invert(x)
+    return np.negative(x)
+
+
+def _reconstruct_binary(f, m, conn):
+    """
+    Reconstruction by dilation of a two-valued image
+
+    :param f: marker, no greater than ``m``
+    :type f: numpy array (N,H)
+    :param m: mask
+    :type m: numpy array (N,H)
+    :param conn: connectivity, 4 or 8
+    :type conn: int
+    :return: reconstruction, or None if ``m`` or ``f`` takes values other
+             than the minimum and maximum of ``m``
+    :rtype: numpy array (N,H)
+
+    The result is the maximum of the mask on the connected components of
+    its maximum that contain a maximum of the marker, and its minimum
+    elsewhere.  Connected components are labelled in linear time.
+    """
+    lo, hi = m.min(), m.max()
+    fg = m == hi
+    if np.count_nonzero(fg | (m == lo)) != m.size:
+        return None
+    seed = f == hi
+    if np.count_nonzero(seed | (f == lo)) != f.size:
+        return None
+    n, labels = cv.connectedComponents(fg.view(np.uint8), connectivity=conn,
+                                       ltype=cv.CV_32S)
+    hit = np.zeros((n,), dtype=bool)
+    hit[labels[seed]] = True
+    hit[0] = False
+    return np.where(hit[labels], hi, lo).astype(m.dtype)
+
+
+def _sweep(J, M, conn):
+    """
+    Propagate a reconstruction down the rows of an image
+
+    :param J: padded marker, updated in place
+    :type J: numpy array (N+2,H+2)
+    :param M: padded mask
+    :type M: numpy array (N+2,H+2)
+    :param conn: connectivity, 4 or 8
+    :type conn: int
+
+    Each row is dilated by its neighbours in the row above, which has
+    already been updated, and limited by the mask.  This is one direction of
+    the raster scans of Vincent's algorithm, vectorized along the rows, and
+    values propagate any distance down the image in a single sweep.
+    """
+    t = np.empty(J.shape[1] - 2, dtype=J.dtype)
+    for r in range(1, J.shape[0] - 1):
+        above, row = J[r - 1], J[r, 1:-1]
+        if conn == 8:
+            np.maximum(above[:-2], above[2:], out=t)
+            np.maximum(t, above[1:-1], out=t)
+        else:
+            t[:] = above[1:-1]
+        np.maximum(row, t, out=t)
+        np.minimum(t, M[r, 1:-1], out=row)
+
+
+def _reconstruct(f, m, conn):
+    """
+    Reconstruction by dilation of a greyscale image
+
+    :param f: marker, no greater than ``m``
+    :type f: numpy array (N,H)
+    :param m: mask
+    :type m: numpy array (N,H)
+    :param conn: connectivity, 4 or 8
+    :type conn: int
+    :return: reconstruction
+    :rtype: numpy array (N,H)
+
+    This is Vincent's hybrid algorithm.  Sweeps down, up, right and left
+    across the image propagate the marker along long paths, and are
+    repeated while many pixels change.  Then only the neighbours of changed
+    pixels can change, so they are kept in a queue.  Each pass dilates all
+    the queued pixels at once, and queues those that changed, until the
+    queue is empty.  The result is exact.
+    """
+    se = np.ones((3, 3), dtype=np.uint8) if conn == 8 else \
+        np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]], dtype=np.uint8)
+    offsets = _NHOOD_OFFSETS[se.ravel() > 0]
+
+    # pad with the lowest value, which never changes or propagates
+    lowest = _lowest(m.dtype)
+    J = np.pad(f, 1, constant_values=lowest)
+    M = np.pad(m, 1, constant_values=lowest)
+    W = J.shape[1]
+    offsets = offsets[:, 0] * W + offsets[:, 1]
+    if J.dtype in _VHGW_LENGTH:
+        def dilate(x):
+            return cv.dilate(x, se, borderType=cv.BORDER_REPLICATE)
+    else:
+        def dilate(x):
+            return sp.ndimage.grey_dilation(x, footprint=se, mode='nearest')
+
+    # sweeps over the whole image while many pixels change
+    while True:
+        J0 = J.copy()
+        _sweep(J, M, conn)
+        _sweep(J[::-1], M[::-1], conn)
+        JT, MT = J.T.copy(), M.T.copy()
+        _sweep(JT, MT, conn)
+        _sweep(JT[::-1], MT[::-1], conn)
+        J = np.ascontiguousarray(JT.T)
+        if np.count_nonzero(J != J0) < _RECONSTRUCT_SPARSE * J.size:
+            break
+
+    # then a queue of pixels whose neighbours might change
+    D = np.minimum(dilate(J), M)
+    changed = np.flatnonzero(D != J)
+    J = D
+    Jflat, Mflat = J.ravel(), M.ravel()
+    slot = np.zeros((J.size,), dtype=np.intp)
+    while len(changed) > 0:
+        q = (changed[:, np.newaxis] + offsets).ravel()
+        q = q[Mflat[q] > lowest]
+        first = np.arange(len(q))
+        slot[q] = first
+        q = q[slot[q] == first]
+        v = Jflat[q[:, np.newaxis] + offsets].max(axis=1)
+        v = np.minimum(v, Mflat[q])
+        up = v > Jflat[q]
+        changed = q[up]
+        Jflat[changed] = v[up]
+
+    return J[1:-1, 1:-1].copy()
+
+
+def _moment_shift(M, du, dv):
+    """
+    Move the origin of moments
+
+    :param M: moments about a point, ``M[n,p,q]`` is the sum of
+              ``x(u,v) (u-a)^p (v-b)^q`` for frame ``n``
+    :type M: numpy array (N,P,P)
+    :param du: ``a - a'`` for each frame
+    :type du: numpy array (N,)
+    :param dv: ``b - b'`` for each frame
+    :type dv: numpy array (N,)
+    :return: moments about the point ``(a', b')``
+    :rtype: numpy array (N,P,P)
+
+    By the binomial theorem ``(u-a')^p`` is the sum over ``i <= p`` of
+    ``C(p,i) (u-a)^i (a-a')^(p-i)``, so the moments about the new point are
+    ``Bu M Bv'`` where ``Bu`` and ``Bv`` are lower triangular.
+    """
+    k = np.arange(M.shape[1])
+    C = sp.special.comb(k[:, np.newaxis], k)
+    e = np.maximum(k[:, np.newaxis] - k, 0)
+    Bu = C * np.power(du[:, np.newaxis, np.newaxis], e)
+    Bv = C * np.power(dv[:, np.newaxis, np.newaxis], e)
+    return Bu @ M @ Bv.transpose((0, 2, 1))
+
+
+def _hu(nu):
+    """
+    Hu moment invariants
+
+    :param nu: normalized central moments, ``nu[n,p,q]``, of at least order 3
+    :type nu: numpy array (N,P,P)
+    :return: the seven Hu invariants of each frame
+    :rtype: numpy array (N,7)
+    """
+    n20, n02, n11 = nu[:, 2, 0], nu[:, 0, 2], nu[:, 1, 1]
+    n30, n03, n21, n12 = nu[:, 3, 0], nu[:, 0, 3], nu[:, 2, 1], nu[:, 1, 2]
+    a = n30 + n12
+    b = n21 + n03
+    c = n30 - 3 * n12
+    d = 3 * n21 - n03
+    return np.stack([
+        n20 + n02,
+        (n20 - n02) ** 2 + 4 * n11 ** 2,
+        c ** 2 + d ** 2,
+        a ** 2 + b ** 2,
+        c * a * (a ** 2 - 3 * b ** 2) + d * b * (3 * a ** 2 - b ** 2),
+        (n20 - n02) * (a ** 2 - b ** 2) + 4 * n11 * a * b,
+        d * a * (a ** 2 - 3 * b ** 2) - c * b * (3 * a ** 2 - b ** 2),
+    ], axis=1)
+
+
+def _moments(frames, order):
+    """
+    Raw, central and normalized moments of frames
+
+    :param frames: frames
+    :type frames: iterable of numpy array (H,W)
+    :param order: largest exponent
+    :type order: int
+    :return: raw, central and normalized moments, each ``(N,P,P)`` with
+             ``P = order + 1``, and the Hu invariants ``(N,7)`` or None if
+             ``order < 3``
+    :rtype: tuple
+
+    The moments are computed in one pass over each frame by projecting the
+    rows onto the powers of ``u`` and then the result onto the powers of
+    ``v``, two matrix products.  The powers are of coordinates relative to
+    the centre of the image, which keeps the terms small, then the origin
+    is moved to the image origin and the centroid analytically.
+    """
+    M = []
+    centre = []
+    k = np.arange(order + 1)[:, np.newaxis]
+    for x in frames:
+        H, W = x.shape
+        u0, v0 = (W - 1) / 2, (H - 1) / 2
+        U = (np.arange(W) - u0) ** k
+        V = (np.arange(H) - v0) ** k
+        M.append(V @ (x.astype(np.float64) @ U.T))  # M[q, p]
+        centre.append((u0, v0))
+    M = np.array(M).transpose((0, 2, 1))
+    centre = np.array(centre)
+
+    # moments about the image origin
+    m = _moment_shift(M, centre[:, 0], centre[:, 1])
+    m00 = M[:, 0, 0]
+    if order == 0:
+        mu = M
+    else:
+        # moments about the centroid
+        mu = _moment_shift(M, -M[:, 1, 0] / m00, -M[:, 0, 1] / m00)
+        mu[:, 1, 0] = 0
+        mu[:, 0, 1] = 0
+    k = np.arange(order + 1)
+    g = (k[:, np.newaxis] + k) / 2 + 1
+    nu = mu / m00[:, np.newaxis, np.newaxis] ** g
+    hu = _hu(nu) if order >= 3 else None
+    return m, mu, nu, hu
+
+
+def _ellipse(m00, mu20, mu11, mu02):
+    """
+    Equivalent ellipses
+
+    :param m00: areas
+    :type m00: numpy array (N,)
+    :param mu20: second order central moments
+    :type mu20: numpy array (N,)
+    :param mu11: second order central moments
+    :type mu11: numpy array (N,)
+    :param mu02: second order central moments
+    :type mu02: numpy array (N,)
+    :return: major and minor axis lengths and orientation of the major axis
+             with respect to the u-axis
+    :rtype: 3-tuple of numpy array (N,)
+
+    The axis lengths are twice the square roots of the eigenvalues of the
+    inertia matrix ``[mu20 mu11; mu11 mu02] / m00``, found in closed form for
+    all the ellipses at once.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        c = (mu20 + mu02) / 2
+        d = np.sqrt(((mu20 - mu02) / 2) ** 2 + mu11 ** 2)
+        a = 2 * np.sqrt((c + d) / m00)
+        b = 2 * np.sqrt(np.maximum(c - d, 0) / m00)
+    orientation = np.arctan2(2 * mu11, mu20 - mu02) / 2
+    return a, b, orientation
+
+
+def _regionprops(x, L, order):
+    """
+    Properties of every labelled region
+
+    :param x: image
+    :type x: numpy array (H,W)
+    :param L: label image, non-negative integers
+    :type L: numpy array (H,W)
+    :param order: largest exponent of the moments, at least 2
+    :type order: int
+    :return: properties, see ``regionprops``
+    :rtype: tuple
+
+    Each statistic is one ``np.bincount`` over the pixels weighted by the
+    pixel value or coordinate power, so the cost is proportional to the
+    number of pixels and independent of the number of regions.  The moments
+    are accumulated about the centre of the image and moved to the origin
+    and each centroid analytically.  The minimum and maximum are reductions
+    over the pixels sorted by label, a linear time radix sort if there are
+    fewer than 65536 labels.
+    """
+    H, W = L.shape
+    L = L.ravel()
+    N = int(L.max()) + 1 if L.size > 0 else 0
+
+    # moments of the regions about the centre of the image
+    u0, v0 = (W - 1) / 2, (H - 1) / 2
+    u = np.arange(W) - u0
+    v = (np.arange(H) - v0)[:, np.newaxis]
+    M = np.zeros((N, order + 1, order + 1))
+    area = np.bincount(L, minlength=N)
+    M[:, 0, 0] = area
+    for q in range(order + 1):
+        vq = v ** q
+        for p in range(order + 1 - q):
+            if p + q > 0:
+                M[:, p, q] = np.bincount(L, (u ** p * vq).ravel(),
+                                         minlength=N)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m = _moment_shift(M, np.full((N,), u0), np.full((N,), v0))
+        uc = M[:, 1, 0] / area
+        vc = M[:, 0, 1] / area
+        mu = _moment_shift(M, -uc, -vc)
+        mu[:, 1, 0] = 0
+        mu[:, 0, 1] = 0
+        # the shift mixes lower order moments into the slots with
+        # p+q > order but their own terms are not accumulated, zero them
+        k = np.arange(order + 1)
+        high = np.add.outer(k, k) > order
+        m[:, high] = 0
+        mu[:, high] = 0
+        # labels with no pixels have no centroid
+        mu[area == 0] = np.nan
+        uc += u0
+        vc += v0
+
+        a, b, orientation = _ellipse(area, mu[:, 2, 0], mu[:, 1, 1],
+                                     mu[:, 0, 2])
+
+        # intensity
+        x = x.ravel()
+        mean = np.bincount(L, x, minlength=N) / area
+        std = np.sqrt(np.maximum(
+            np.bincount(L, np.square(x, dtype=np.float64), minlength=N)
+            / area - mean ** 2, 0))
+
+    if N <= 65536:
+        index = np.argsort(L.astype(np.uint16), kind='stable')
+    else:
+        index = np.argsort(L, kind='stable')
+    xs = x[index]
+    present = area > 0
+    start = (np.cumsum(area) - area)[present]
+    xmin = np.full((N,), np.nan)
+    xmax = np.full((N,), np.nan)
+    if len(start) > 0:
+        xmin[present] = np.minimum.reduceat(xs, start)
+        xmax[present] = np.maximum.reduceat(xs, start)
+
+    return area, uc, vc, m, mu, a, b, orientation, mean, std, xmin, xmax
+
+
+# components emitted by LabelStream, one element per component
+_components = namedtuple('components',
+                         'area umin umax vmin vmax uc vc mu20 mu11 mu02')
+
+
+def _components_empty():
+    return _components(*[np.zeros((0,), dtype=np.int64)] * 5,
+                       *[np.zeros((0,), dtype=np.float64)] * 5)
+
+
+def _components_merge(c, comp, n):
+    """
+    Merge the accumulators of components
+
+    :param c: components
+    :type c: components named tuple
+    :param comp: index of the merged component for each component
+    :type comp: numpy array (N,)
+    :param n: number of merged components
+    :type n: int
+    :return: merged components
+    :rtype: components named tuple
+
+    Central moments are combined with the parallel axis theorem, so they are
+    accurate however many rows the stream has.
+    """
+    area = np.bincount(comp, c.area, minlength=n)
+    uc = np.bincount(comp, c.area * c.uc, minlength=n) / area
+    vc = np.bincount(comp, c.area * c.vc, minlength=n) / area
+    du = c.uc - uc[comp]
+    dv = c.vc - vc[comp]
+    mu20 = np.bincount(comp, c.mu20 + c.area * du * du, minlength=n)
+    mu11 = np.bincount(comp, c.mu11 + c.area * du * dv, minlength=n)
+    mu02 = np.bincount(comp, c.mu02 + c.area * dv * dv, minlength=n)
+    bbox = []
+    for x, op in [(c.umin, np.minimum), (c.umax, np.maximum),
+                  (c.vmin, np.minimum), (c.vmax, np.maximum)]:
+        y = np.zeros((n,), dtype=np.int64)
+        y[comp] = x
+        op.at(y, comp, x)
+        bbox.append(y)
+    return _components(area.astype(np.int64), *bbox, uc, vc, mu20, mu11,
+                       mu02)
+
+
+class LabelStream:
+    """
+    Streaming connected component labelling
+
+    :param conn: connectivity, 4 or 8
+    :type conn: int
+
+    - ``LabelStream()`` is a connected component labeller for an image that
+      arrives a block of rows at a time, for example from a line-scan camera,
+      or that is too large to hold in memory.
+
+    - ``LabelStream(conn)`` as above, with the connectivity specified. 4 or
+      8.
+
+    Rows are passed to ``push`` which returns the components that are
+    finished, those that do not touch the last row received and can not grow
+    any further.  ``close`` ends the image and returns the components that
+    remain.  Components are returned as a named tuple of arrays with
+    elements:
+
+        - ``area`` the number of pixels in the component
+        - ``umin``, ``vmin`` the top-left corner of the bounding box
+        - ``umax``, ``vmax`` one more than the bottom-right corner of the
+          bounding box
+        - ``uc``, ``vc`` the centroid
+        - ``mu20``, ``mu11``, ``mu02`` the second order central moments
+
+    Example::
+
+        >>> stream = LabelStream()
+        >>> for rows in camera:
+        >>>     c = stream.push(rows)
+        >>>     print(c.area)
+        >>> c = stream.close()
+
+    .. note::
+
+        - Foreground pixels are non-zero, as for ``Image.label``.
+        - Each block is labelled by OpenCV, the only state kept between
+          blocks is the component of each pixel of the last row and the
+          accumulators of those components, so memory use depends on the
+          image width and block height, not the image height.
+        - Components that meet in a later block are merged by finding the
+          connected components of the graph of the labels that touch
+          across the boundary.
+        - ``v`` is the row number from the first row pushed since the
+          stream was created or closed.
+    """
+
+    def __init__(self, conn=8):
+        if not (conn in [4, 8]):
+            raise ValueError(conn, 'connectivity must be 4 or 8')
+        self._conn = conn
+        self._reset()
+
+    def __repr__(self):
+        return f"LabelStream(conn={self._conn}, rows={self._row}, " \
+               f"open={len(self._active.area)})"
+
+    def _reset(self):
+        self._width = None
+        self._row = 0
+        self._last = None  # component of each pixel of the last row, or -1
+        self._active = _components_empty()
+
+    @property
+    def rows(self):
+        """
+        Number of rows received
+
+        :return: number of rows received since the stream was created or
+                 closed
+        :rtype: int
+        """
+        return self._row
+
+    def push(self, rows):
+        """
+        Label a block of rows
+
+        :param rows: block of rows, or a single row
+        :type rows: numpy array (H,W) or (W,)
+        :return: components that are finished
+        :rtype: components named tuple
+
+        - ``LS.push(rows)`` labels the next block of rows of the image and
+          returns the components that can not grow any further.  Every
+          block must have the same width.
+        """
+        x = np.asarray(rows)
+        if x.ndim == 1:
+            x = x[np.newaxis, :]
+        if x.ndim != 2:
+            raise ValueError(x.shape, 'rows must be a 2D array or a row')
+        if self._width is None:
+            self._width = x.shape[1]
+        elif x.shape[1] != self._width:
+            raise ValueError(x.shape, 'rows must have the same width')
+        if x.shape[0] == 0:
+            return _components_empty()
+
+        # label the block
+        fg = (x != 0).view(np.uint8)
+        n, L, s, c = cv.connectedComponentsWithStats(
+            fg, connectivity=self._conn, ltype=cv.CV_32S)
+        v, u = np.nonzero(fg)
+        label = L[v, u]
+        du = u - c[label, 0]
+        dv = v - c[label, 1]
+        new = _components(
+            s[1:, cv.CC_STAT_AREA].astype(np.int64),
+            s[1:, cv.CC_STAT_LEFT].astype(np.int64),
+            (s[1:, cv.CC_STAT_LEFT] + s[1:, cv.CC_STAT_WIDTH]).astype(
+                np.int64),
+            (s[1:, cv.CC_STAT_TOP] + self._row).astype(np.int64),
+            (s[1:, cv.CC_STAT_TOP] + s[1:, cv.CC_STAT_HEIGHT]
+             + self._row).astype(np.int64),
+            c[1:, 0], c[1:, 1] + self._row,
+            np.bincount(label, du * du, minlength=n)[1:],
+            np.bincount(label, du * dv, minlength=n)[1:],
+            np.bincount(label, dv * dv, minlength=n)[1:])
+        self._row += x.shape[0]
+
+        # open components are 0 to K-1, those of the block K to K+n-2
+        K = len(self._active.area)
+        both = _components(*[np.concatenate(f)
+                             for f in zip(self._active, new)])
+        N = K + n - 1
+        comp = np.arange(N)
+        if K > 0:
+            last = self._last
+            first = L[0]
+            W = self._width
+            i = []
+            j = []
+            for d in ([0] if self._conn == 4 else [-1, 0, 1]):
+                a = last[max(0, -d):W - max(0, d)]
+                b = first[max(0, d):W - max(0, -d)]
+                touch = (a >= 0) & (b > 0)
+                i.append(a[touch])
+                j.append(b[touch] + K - 1)
+            i = np.concatenate(i)
+            j = np.concatenate(j)
+            if len(i) > 0:
+                graph = sp.sparse.coo_matrix(
+                    (np.ones(len(i), dtype=np.int8), (i, j)), shape=(N, N))
+                N, comp = sp.sparse.csgraph.connected_components(
+                    graph, directed=False)
+        merged = _components_merge(both, comp, N)
+
+        # components that touch the last row stay open
+        block = np.full((n,), -1, dtype=np.int64)
+        block[1:] = comp[K:]
+        last = block[L[-1]]
+        alive = np.zeros((N,), dtype=bool)
+        alive[last[last >= 0]] = True
+        index = np.append(np.cumsum(alive) - 1, -1)
+        self._last = index[last]
+        self._active = _components(*[f[alive] for f in merged])
+        return _components(*[f[~alive] for f in merged])
+
+    def close(self):
+        """
+        End the image
+
+        :return: components that remain
+        :rtype: components named tuple
+
+        - ``LS.close()`` ends the image, returns the components that touch
+          the last row and resets the labeller for a new image.
+        """
+        active = self._active
+        self._reset()
+        return active
 
 
 class ImageProcessingMorphMixin:
@@ -62,6 +1264,12 @@ class ImageProcessingMorphMixin:
             - Cheaper to apply a smaller structuring element multiple times
               than one large one, the effective structuing element is the
               Minkowski sum of the structuring element with itself N times.
+            - A large structuring element that is a rectangle, a line or
+              convex and symmetric, such as ``kcircle``, is decomposed into
+              horizontal and vertical lines so the cost grows with its width
+              plus height rather than its area.  Very long lines use the van
+              Herk/Gil-Werman algorithm whose cost does not depend on
+              length.  The result is identical to ``cv.erode``.
 
         Example:
 
@@ -71,6 +1279,9 @@ class ImageProcessingMorphMixin:
 
             - Robotics, Vision & Control, Section 12.5, P. Corke,
               Springer 2011.
+            - A fast algorithm for local minimum and maximum filters on
+              rectangular and octagonal kernels, M. van Herk, Pattern
+              Recognition Letters, 13(7):517-521, 1992.
         """
 
         # check if valid input:
@@ -97,10 +1308,13 @@ class ImageProcessingMorphMixin:
             raise ValueError(opt, 'opt is not a valid option')
         out = []
         for im in self:
-            out.append(cv.erode(im.image, se,
-                                iterations=n,
-                                borderType=cvopt[opt],
-                                **kwargs))
+            if kwargs:
+                out.append(cv.erode(im.image, se,
+                                    iterations=n,
+                                    borderType=cvopt[opt],
+                                    **kwargs))
+            else:
+                out.append(_morph(im.image, se, 'min', n, opt))
 
         return self.__class__(out)
 
@@ -137,6 +1351,8 @@ class ImageProcessingMorphMixin:
             - Cheaper to apply a smaller structuring element multiple times
             than one large one, the effective structuing element is the
             Minkowski sum of the structuring element with itself N times.
+            - Large structuring elements are decomposed into lines, as for
+              ``erode``.  The result is identical to ``cv.dilate``.
 
         Example:
 
@@ -171,10 +1387,13 @@ class ImageProcessingMorphMixin:
         out = []
         # for im in [img.image in self]: # then can use cv.dilate(im)
         for im in self:
-            out.append(cv.dilate(im.image, se,
-                       iterations=n,
-                       borderType=cvopt[opt],
-                       **kwargs))
+            if kwargs:
+                out.append(cv.dilate(im.image, se,
+                                     iterations=n,
+                                     borderType=cvopt[opt],
+                                     **kwargs))
+            else:
+                out.append(_morph(im.image, se, 'max', n, opt))
 
         return self.__class__(out)
 
@@ -266,17 +1485,12 @@ class ImageProcessingMorphMixin:
         out = []
         for im in self:
             if oper == 'min':
-                imo = self.erode(se, n=n, opt=opt, **kwargs)
+                imo = im.erode(se, n=n, opt=opt, **kwargs).image
             elif oper == 'max':
-                imo = self.dilate(se, n=n, opt=opt, **kwargs)
+                imo = im.dilate(se, n=n, opt=opt, **kwargs).image
             elif oper == 'diff':
-                se = self.getse(se)
-                imo = cv.morphologyEx(im.image,
-                                      cv.MORPH_GRADIENT,
-                                      se,
-                                      iterations=n,
-                                      borderType=cvopt[opt],
-                                      **kwargs)
+                imo = cv.subtract(im.dilate(se, n=n, opt=opt, **kwargs).image,
+                                  im.erode(se, n=n, opt=opt, **kwargs).image)
             elif oper == 'plusmin':
                 # out = None  # TODO
                 raise ValueError(oper, 'plusmin not supported yet')
@@ -302,6 +1516,18 @@ class ImageProcessingMorphMixin:
           standard morphological operations, ``s1`` has three possible values:
           0, 1 and don't care (represented by nans).
 
+        - ``IM.hitormiss(s1, s2)`` as above but the pixels of the
+          neighbourhood that must be set are the non-zero elements of ``s1``
+          and those that must be clear are the non-zero elements of ``s2``.
+
+        .. note::
+
+            - For 3x3 structuring elements each pixel's neighbourhood is
+              encoded as a 9-bit number and the result is a lookup into a
+              512-element table, in a single pass over the image. Larger
+              structuring elements use two erosions.
+            - Non-zero pixels are set, and the border is replicated.
+
         Example:
 
         .. runblock:: pycon
@@ -311,18 +1537,27 @@ class ImageProcessingMorphMixin:
             - Robotics, Vision & Control, Section 12.5, P. Corke,
               Springer 2011.
         """
-        # check valid input
-        # TODO also check if binary image?
-
         if s2 is None:
-            s2 = np.float32(s1 == 0)
-            s1 = np.float32(s1 == 1)
-
+            s1, s2 = _nhood_pattern(s1)
+        s1 = np.asarray(s1)
+        s2 = np.asarray(s2)
+
+        if s1.shape != (3, 3) or s2.shape != (3, 3):
+            s1 = np.float32(s1)
+            s2 = np.float32(s2)
+            out = []
+            for im in self:
+                imv = self.__class__(1 - im.image)
+                imhm = im.morph(s1, 'min').image * \
+                    imv.morph(s2, 'min').image
+                out.append(imhm)
+            return self.__class__(out)
+
+        lut = _nhood_lut((s1, s2))
         out = []
         for im in self:
-            imv = self.__class__(1 - im.image)
-            imhm = im.morph(s1, 'min').image * imv.morph(s2, 'min').image
-            out.append(imhm)
+            b = (im.image > 0).astype(np.uint8)
+            out.append(_nhood_apply(b, lut).astype(im.dtype))
         return self.__class__(out)
 
     def endpoint(self):
@@ -353,12 +1588,12 @@ class ImageProcessingMorphMixin:
         se[:, :, 6] = np.array([[0, 0, 0], [1, 1, 0], [0, 0, 0]])
         se[:, :, 7] = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 0]])
 
+        lut = _nhood_lut(*[(se[:, :, i], se[:, :, i] == 0)
+                           for i in range(se.shape[2])])
         out = []
         for im in self:
-            o = np.zeros(im.shape)
-            for i in range(se.shape[2]):
-                o = np.logical_or(o, im.hitormiss(se[:, :, i]).image)
-            out.append(o)
+            b = (im.image > 0).astype(np.uint8)
+            out.append(_nhood_apply(b, lut))
 
         return self.__class__(out)
 
@@ -399,12 +1634,12 @@ class ImageProcessingMorphMixin:
         se[:, :, 14] = np.array([[0, 1, 0], [1, 1, 0], [0, 0, 1]])
         se[:, :, 15] = np.array([[1, 0, 1], [0, 1, 0], [0, 1, 0]])
 
+        lut = _nhood_lut(*[(se[:, :, i], se[:, :, i] == 0)
+                           for i in range(se.shape[2])])
         out = []
         for im in self:
-            o = np.zeros(im.shape)
-            for i in range(se.shape[2]):
-                o = np.logical_or(o, im.hitormiss(se[:, :, i]).image)
-            out.append(o)
+            b = (im.image > 0).astype(np.uint8)
+            out.append(_nhood_apply(b, lut))
 
         return self.__class__(out)
 
@@ -520,7 +1755,7 @@ class ImageProcessingMorphMixin:
         """
         Morphological skeletonization
 
-        :param delay: seconds between each iteration of display
+        :param delay: seconds to display each skeleton
         :type delay: float
         :return out: Image
         :rtype: Image instance (N,H,3) or (N,H)
@@ -529,9 +1764,16 @@ class ImageProcessingMorphMixin:
           IM. Any non-zero region is replaced by a network of single-pixel wide
           lines.
 
-        - ``IM.thin(delay)`` as above but graphically displays each iteration
-          of the skeletonization algorithm with a pause of ``delay`` seconds
-          between each iteration. TODO
+        - ``IM.thin(delay)`` as above but graphically displays the skeleton
+          of each frame with a pause of ``delay`` seconds.
+
+        .. note::
+
+            - Each iteration applies eight hit-or-miss steps, each a lookup
+              into a table of 3x3 neighbourhood codes.  The codes are updated
+              as pixels are removed and only pixels on the boundary of the
+              shapes are examined, so the cost is proportional to the length
+              of the boundary times the thickness of the shapes.
 
         Example:
 
@@ -543,9 +1785,6 @@ class ImageProcessingMorphMixin:
               Springer 2011.
         """
 
-        # create a binary image (True/False)
-        # im = im > 0
-
         # create structuring elements
         sa = np.array([[0, 0, 0],
                        [np.nan, 1, np.nan],
@@ -554,29 +1793,454 @@ class ImageProcessingMorphMixin:
                        [1, 1, 0],
                        [np.nan, 1, np.nan]])
 
+        # the sequence of eight hit-or-miss steps of one iteration
+        luts = []
+        for i in range(4):
+            luts.append(_nhood_lut(_nhood_pattern(np.rot90(sa, i))))
+            luts.append(_nhood_lut(_nhood_pattern(np.rot90(sb, i))))
+
         out = []
         for im in self:
-            o = im
-            while True:
-                for i in range(4):
-                    r = im.hitormiss(sa).image
-                    # might also use the bitwise operator ^
-                    im = self.__class__(np.logical_xor(im.image, r))
-                    r = im.hitormiss(sb).image
-                    im = self.__class__(np.logical_xor(im.image, r))
-                    sa = np.rot90(sa)
-                    sb = np.rot90(sb)
-                if delay > 0.0:
-                    im.disp()
-                    # TODO add in delay timer for idisp
-                    time.sleep(5)
-                if np.all(o.image == im.image):
-                    break
-                o = im
+            o = _thin((im.image > 0).astype(np.uint8), luts)
+            if delay > 0.0:
+                self.__class__(o).disp()
+                time.sleep(delay)
             out.append(o)
 
         return self.__class__(out)
 
+    def distance_transform(self, metric='euclidean', return_indices=False):
+        """
+        Distance transform
+
+        :param metric: distance metric, 'euclidean' [default], 'cityblock' or
+                       'chessboard'
+        :type metric: string
+        :param return_indices: also return the nearest background pixel
+        :type return_indices: bool
+        :return: distance image
+        :rtype: Image instance, or collections.namedtuple
+
+        - ``IM.distance_transform()`` is an image where each pixel is the
+          exact Euclidean distance from the corresponding pixel of the binary
+          image ``IM`` to the nearest zero pixel.  Zero pixels have a
+          distance of zero.
+
+        - ``IM.distance_transform(metric)`` as above but the distance is
+          computed with the specified metric.
+
+        - ``IM.distance_transform(return_indices=True)`` as above but returns
+          a named tuple with elements ``distance``, and ``u`` and ``v`` the
+          column and row of the nearest zero pixel.
+
+        If ``IM`` is a sequence, each frame is transformed.
+
+        :options:
+
+            - 'euclidean'    straight line distance
+            - 'cityblock'    sum of the horizontal and vertical distances
+            - 'chessboard'   maximum of the horizontal and vertical distances
+
+        .. note::
+
+            - The result is float32.  If a frame has no zero pixels the
+              distance is infinite and ``u`` and ``v`` are -1.
+            - The transform is computed in linear time, with the algorithm of
+              Felzenszwalb and Huttenlocher for the Euclidean metric, so its
+              cost does not depend on the size of the objects.
+            - Thresholding the distance transform of the image, or of its
+              complement, is the erosion, or dilation, by a disk of any
+              radius.  ``erode`` and ``dilate`` do this for two-valued images
+              and large ``kcircle`` structuring elements.
+
+        Example:
+
+        .. runblock:: pycon
+
+        :references:
+
+            - Distance transforms of sampled functions, P. Felzenszwalb and
+              D. Huttenlocher, Theory of Computing, 8(19):415-428, 2012.
+        """
+        if metric not in ('euclidean', 'cityblock', 'chessboard'):
+            raise ValueError(metric, 'metric is not a valid option')
+        if self.iscolor:
+            raise ValueError(self, 'image must be greyscale')
+
+        out = [_distance(im.image, metric, return_indices) for im in self]
+        if return_indices:
+            d, u, v = zip(*out)
+            return namedtuple('distance_transform', 'distance u v')(
+                self.__class__(list(d)), self.__class__(list(u)),
+                self.__class__(list(v)))
+        return self.__class__(out)
+
+    def reconstruct(self, marker, method='dilation', conn=8):
+        """
+        Morphological reconstruction
+
+        :param marker: marker image
+        :type marker: Image instance or numpy array (N,H)
+        :param method: 'dilation' [default] or 'erosion'
+        :type method: string
+        :param conn: connectivity, 4 or 8 [default]
+        :type conn: int
+        :return: reconstructed image
+        :rtype: Image instance
+
+        - ``IM.reconstruct(marker)`` is the reconstruction by dilation of the
+          image ``marker`` under the mask ``IM``.  The marker is repeatedly
+          dilated, and limited to be no greater than the mask, until it no
+          longer changes.  The result is the part of the mask connected to
+          the marker.
+
+        - ``IM.reconstruct(marker, 'erosion')`` as above but the
+          reconstruction by erosion, the marker is repeatedly eroded and
+          limited to be no less than the mask.
+
+        If ``IM`` is a sequence, ``marker`` must have the same number of
+        frames or a single frame.
+
+        .. note::
+
+            - The marker is first limited by the mask.
+            - A two-valued mask and marker are reconstructed by labelling
+              connected components, otherwise the neighbours of changed
+              pixels are updated until there are none.  Either way the
+              result is exact and the cost is proportional to the number of
+              pixels.
+
+        Example:
+
+        .. runblock:: pycon
+
+        :references:
+
+            - Morphological grayscale reconstruction in image analysis:
+              applications and efficient algorithms, L. Vincent, IEEE
+              Transactions on Image Processing, 2(2):176-201, 1993.
+        """
+        if method not in ('dilation', 'erosion'):
+            raise ValueError(method, 'method is not a valid option')
+        if conn not in (4, 8):
+            raise ValueError(conn, 'conn must be 4 or 8')
+        if self.iscolor:
+            raise ValueError(self, 'image must be greyscale')
+        if not isinstance(marker, self.__class__):
+            marker = self.__class__(marker)
+        if len(marker) not in (1, len(self)):
+            raise ValueError(marker, 'marker must have one frame or as many '
+                             'as the image')
+        markers = list(marker) * len(self) if len(marker) == 1 \
+            else list(marker)
+
+        out = []
+        for im, mk in zip(self, markers):
+            m = im.image
+            f = mk.image.astype(m.dtype)
+            if f.shape != m.shape:
+                raise ValueError(marker, 'marker and image must be the same '
+                                 'size')
+            if method == 'erosion':
+                f, m = _complement(f), _complement(m)
+            f = np.minimum(f, m)
+            J = _reconstruct_binary(f, m, conn)
+            if J is None:
+                J = _reconstruct(f, m, conn)
+            if method == 'erosion':
+                J = _complement(J)
+            out.append(J)
+        return self.__class__(out)
+
+    def fill_holes(self, conn=4):
+        """
+        Fill holes
+
+        :param conn: connectivity of the holes, 4 [default] or 8
+        :type conn: int
+        :return: image with holes filled
+        :rtype: Image instance
+
+        - ``IM.fill_holes()`` is the image with its holes filled.  For a
+          binary image a hole is a region of background pixels that does not
+          touch the border.  For a greyscale image a hole is a regional
+          minimum that does not touch the border, and it is raised to the
+          level of its lowest surrounding pixel.
+
+        .. note::
+
+            - Holes 4-connected by default, appropriate for 8-connected
+              objects.
+            - Computed by the reconstruction by erosion of the image from its
+              border.
+
+        :references:
+
+            - Morphological grayscale reconstruction in image analysis:
+              applications and efficient algorithms, L. Vincent, IEEE
+              Transactions on Image Processing, 2(2):176-201, 1993.
+        """
+        out = []
+        for im in self:
+            m = im.image
+            f = np.full(m.shape, m.max(), dtype=m.dtype)
+            f[0, :], f[-1, :], f[:, 0], f[:, -1] = \
+                m[0, :], m[-1, :], m[:, 0], m[:, -1]
+            out.append(im.reconstruct(f, 'erosion', conn).image)
+        return self.__class__(out)
+
+    def clear_border(self, conn=8):
+        """
+        Remove objects that touch the border
+
+        :param conn: connectivity of the objects, 4 or 8 [default]
+        :type conn: int
+        :return: image without the border objects
+        :rtype: Image instance
+
+        - ``IM.clear_border()`` is the image with the objects that touch the
+          border set to zero.  For a greyscale image, the reconstruction of
+          the image from its border is subtracted, and structures brighter
+          than their surroundings that touch the border are removed.
+
+        .. note:: Computed by the reconstruction by dilation of the image
+            from its border.
+
+        :references:
+
+            - Morphological grayscale reconstruction in image analysis:
+              applications and efficient algorithms, L. Vincent, IEEE
+              Transactions on Image Processing, 2(2):176-201, 1993.
+        """
+        out = []
+        for im in self:
+            m = im.image
+            f = np.full(m.shape, m.min(), dtype=m.dtype)
+            f[0, :], f[-1, :], f[:, 0], f[:, -1] = \
+                m[0, :], m[-1, :], m[:, 0], m[:, -1]
+            J = im.reconstruct(f, 'dilation', conn).image
+            out.append(m - J)
+        return self.__class__(out)
+
+    def hmax(self, h, conn=8):
+        """
+        H-maxima transform
+
+        :param h: height
+        :type h: scalar
+        :param conn: connectivity, 4 or 8 [default]
+        :type conn: int
+        :return: image with shallow maxima suppressed
+        :rtype: Image instance
+
+        - ``IM.hmax(h)`` is the image with all maxima whose height, relative
+          to the highest saddle that connects them to a higher region, is
+          less than ``h`` suppressed, and all other maxima lowered by ``h``.
+
+        .. note:: Computed as the reconstruction by dilation of ``IM - h``
+            under ``IM``.  For an integer image the subtraction saturates.
+
+        :references:
+
+            - Morphological Image Analysis, P. Soille, Springer, 2003.
+        """
+        if h < 0:
+            raise ValueError(h, 'h must be non-negative')
+        out = []
+        for im in self:
+            m = im.image
+            if np.issubdtype(m.dtype, np.integer):
+                f = (np.maximum(m, _lowest(m.dtype) + h) - h).astype(m.dtype)
+            else:
+                f = m - h
+            out.append(im.reconstruct(f, 'dilation', conn).image)
+        return self.__class__(out)
+
+    def regional_max(self, conn=8):
+        """
+        Regional maxima
+
+        :param conn: connectivity, 4 or 8 [default]
+        :type conn: int
+        :return: binary image of regional maxima
+        :rtype: Image instance
+
+        - ``IM.regional_max()`` is a binary image where pixels are set if they
+          belong to a regional maximum of ``IM``, a connected set of pixels
+          of equal value whose neighbours all have a lower value.  A
+          constant image is a single regional maximum.
+
+        .. note:: Each pixel value is replaced by its rank among the distinct
+            values of the frame, and the image is reconstructed from one rank
+            lower, which reaches the value of the pixel everywhere except on
+            the regional maxima.  This is exact for any image type.
+
+        :references:
+
+            - Morphological Image Analysis, P. Soille, Springer, 2003.
+        """
+        out = []
+        for im in self:
+            x = im.image
+            if x.dtype in (np.uint8, np.uint16):
+                levels = _levels(x)
+                lut = np.zeros((int(levels[-1]) + 1,), dtype=np.uint16)
+                lut[levels] = np.arange(1, len(levels) + 1)
+                rank = lut[x]
+            else:
+                levels, rank = np.unique(x, return_inverse=True)
+                rank = rank.reshape(x.shape) + 1
+                if len(levels) < np.iinfo(np.uint16).max:
+                    rank = rank.astype(np.uint16)
+                else:
+                    rank = rank.astype(np.float64)
+            J = self.__class__(rank).reconstruct(rank - 1, 'dilation', conn)
+            out.append(J.image < rank)
+        return self.__class__(out)
+
+    def _scales(self, radii, se):
+        # radii in ascending order and the structuring elements for them
+        radii = np.sort(np.atleast_1d(radii))
+        if np.any(radii < 0):
+            raise ValueError(radii, 'radii must be non-negative')
+        if se == 'disk':
+            return radii, [self.kcircle(r).astype(np.uint8) for r in radii]
+        elif se == 'square':
+            if np.any(radii != np.floor(radii)):
+                raise ValueError(radii, 'square radii must be integers')
+            return radii.astype(int), None
+        else:
+            raise ValueError(se, 'se must be disk or square')
+
+    def granulometry(self, radii, se='disk'):
+        """
+        Granulometry
+
+        :param radii: radii of the structuring elements
+        :type radii: array_like(N)
+        :param se: structuring element, 'disk' [default] or 'square'
+        :type se: string
+        :return: radii, volume and pattern spectrum
+        :rtype: collections.namedtuple
+
+        - ``IM.granulometry(radii)`` is the size distribution of the bright
+          structures in the image, as a named tuple with elements:
+
+            - ``radii`` the radii in ascending order
+            - ``volume`` the sum of the pixel values of the opening of the
+              image by a disk of each radius
+            - ``spectrum`` the pattern spectrum, the volume removed by each
+              opening relative to the previous one, or to the image for the
+              smallest radius
+
+          For a binary image the volume is the area of the objects, and the
+          spectrum is the area of the objects of each size.
+
+        - ``IM.granulometry(radii, 'square')`` as above but the structuring
+          elements are squares of side ``2r+1``.
+
+        If ``IM`` is a sequence ``volume`` and ``spectrum`` have one row per
+        frame.
+
+        .. note::
+
+            - The disks are ``kcircle(r)``.
+            - The erosion by each square is computed from that by the
+              previous square.  For a two-valued image the erosions by all
+              the disks are thresholds of one distance transform, only the
+              dilations are computed for each radius.  The disk openings of
+              a greyscale image are not incremental, each is computed
+              separately at the cost of calling ``open`` for each radius.
+
+        :references:
+
+            - Morphological Image Analysis, P. Soille, Springer, 2003.
+        """
+        radii, ses = self._scales(radii, se)
+        volume = []
+        spectrum = []
+        for im in self:
+            v = np.array([o.sum(dtype=np.float64)
+                          for o in _openings(im.image, radii, ses)])
+            volume.append(v)
+            total = im.image.sum(dtype=np.float64)
+            spectrum.append(np.concatenate(([total], v[:-1])) - v)
+        if len(self) == 1:
+            volume, spectrum = volume[0], spectrum[0]
+        else:
+            volume, spectrum = np.array(volume), np.array(spectrum)
+        return namedtuple('granulometry', 'radii volume spectrum')(
+            radii, volume, spectrum)
+
+    def tophat(self, radii, se='disk'):
+        """
+        White top-hat transform
+
+        :param radii: radius, or radii, of the structuring element
+        :type radii: scalar or array_like(N)
+        :param se: structuring element, 'disk' [default] or 'square'
+        :type se: string
+        :return: top-hat transform
+        :rtype: Image instance
+
+        - ``IM.tophat(r)`` is the image minus its opening by a disk of radius
+          ``r``, the bright structures smaller than the disk.
+
+        - ``IM.tophat(radii)`` as above for each radius in ascending order,
+          the result has a frame for each radius.  If ``IM`` is a sequence,
+          the frames for each radius of the first frame come first.
+
+        - ``IM.tophat(radii, 'square')`` as above but the structuring
+          elements are squares of side ``2r+1``.
+
+        .. note:: The openings are computed as for ``granulometry``.
+
+        :references:
+
+            - Morphological Image Analysis, P. Soille, Springer, 2003.
+        """
+        radii, ses = self._scales(radii, se)
+        out = []
+        for im in self:
+            out.extend(im.image - o for o in _openings(im.image, radii, ses))
+        return self.__class__(out)
+
+    def bothat(self, radii, se='disk'):
+        """
+        Black top-hat transform
+
+        :param radii: radius, or radii, of the structuring element
+        :type radii: scalar or array_like(N)
+        :param se: structuring element, 'disk' [default] or 'square'
+        :type se: string
+        :return: bottom-hat transform
+        :rtype: Image instance
+
+        - ``IM.bothat(r)`` is the closing of the image by a disk of radius
+          ``r`` minus the image, the dark structures smaller than the disk.
+
+        - ``IM.bothat(radii)`` as above for each radius in ascending order,
+          the result has a frame for each radius.  If ``IM`` is a sequence,
+          the frames for each radius of the first frame come first.
+
+        - ``IM.bothat(radii, 'square')`` as above but the structuring
+          elements are squares of side ``2r+1``.
+
+        .. note:: The closings are the complements of the openings of the
+            complement, computed as for ``granulometry``.
+
+        :references:
+
+            - Morphological Image Analysis, P. Soille, Springer, 2003.
+        """
+        radii, ses = self._scales(radii, se)
+        out = []
+        for im in self:
+            x = im.image
+            out.extend(_complement(o) - x
+                       for o in _openings(_complement(x), radii, ses))
+        return self.__class__(out)
+
     def rank(self, se, rank=-1, opt='replicate'):
         """
         Rank filter
@@ -602,11 +2266,7 @@ class ImageProcessingMorphMixin:
         :options:
 
             - 'replicate'     the border value is replicated (default)
-            - 'none'          pixels beyond the border are not included in
-              the window
-            - 'trim'          output is not computed for pixels where the
-              structuring element crosses the image border, hence output image
-              has reduced dimensions TODO
+            - 'wrap'          the image is periodic
 
         Example:
 
@@ -616,7 +2276,22 @@ class ImageProcessingMorphMixin:
 
             - The structuring element should have an odd side length.
             - The input can be logical, uint8, uint16, float or double, the
-              output is always double
+              output has the same type as the input.
+            - The median of a uint8 image with a square structuring element
+              and replicated border is computed by ``cv.medianBlur``, as is
+              that of a uint16 or float32 image if the element is at most 5x5.
+            - For a rectangular structuring element, the filter is computed
+              by threshold decomposition if the image has few distinct values
+              compared to the number of elements in ``se``.  The cost is
+              then proportional to the number of distinct values but
+              independent of the size of ``se``.
+            - Otherwise ``scipy.ndimage.rank_filter`` is used.  All methods
+              give identical results.
+
+        :references:
+
+            - Median filtering in constant time, S. Perreault and P. Hebert,
+              IEEE Trans. Image Processing, 16(9):2389-2394, 2007.
         """
         if not isinstance(rank, int):
             raise TypeError(rank, 'rank is not an int')
@@ -630,26 +2305,61 @@ class ImageProcessingMorphMixin:
         if opt not in borderopt:
             raise ValueError(opt, 'opt is not a valid option')
 
+        se = np.asarray(se)
+        n = np.count_nonzero(se)
+        r = rank if rank >= 0 else n + rank
+        if not 0 <= r < n:
+            raise ValueError(rank, 'rank is out of range')
+
+        kh, kw = se.shape
+        rectangle = n == se.size
+        median = rectangle and kh == kw and kh % 2 == 1 and kh > 1 \
+            and r == n // 2 and opt == 'replicate'
+        pad = [(kh // 2, kh - 1 - kh // 2), (kw // 2, kw - 1 - kw // 2)]
+
         out = []
         for im in self:
-            out.append(sp.ndimage.rank_filter(im.image,
+            x = im.image
+            if median and (x.dtype == np.uint8 or (kh <= 5 and x.dtype in
+                                                  (np.uint16, np.float32))):
+                out.append(cv.medianBlur(x, kh))
+                continue
+
+            if rectangle and x.ndim == 2:
+                levels = _levels(x)
+                if _RANK_COST['level'] * len(levels) < \
+                        _RANK_COST['element'] * n:
+                    xp = np.pad(x, pad, mode={'replicate': 'edge',
+                                              'wrap': 'wrap'}[opt])
+                    out.append(_rank_histogram(xp, se.shape, r, levels))
+                    continue
+
+            out.append(sp.ndimage.rank_filter(x,
                                               rank,
                                               footprint=se,
                                               mode=borderopt[opt]))
         return self.__class__(out)
 
-    def label(self, conn=8, outtype='int32'):
+    def label(self, conn=8, outtype='int32', stats=False,
+              algorithm='default'):
         """
         Label an image
 
         :param conn: connectivity, 4 or 8
         :type conn: integer
-        :param ltype: output image type
-        :type ltype: string
+        :param outtype: output image type
+        :type outtype: string
+        :param stats: also return the area, bounding box and centroid of each
+                      region
+        :type stats: bool
+        :param algorithm: labelling algorithm, see below
+        :type algorithm: string
         :return out_c: n_components
-        :rtype out_c: int
+        :rtype out_c: list of int
         :return labels: labelled image
         :rtype labels: Image instance
+        :return stats: region statistics
+        :rtype stats: list of collections.namedtuple
 
         - ``IM.label()`` is a label image that indicates connected components
           within the image. Each pixel is an integer label that indicates which
@@ -661,6 +2371,38 @@ class ImageProcessingMorphMixin:
         - ``IM.label(outtype)`` as above, with the output type specified as
           either int32 or uint16.
 
+        - ``IM.label(stats=True)`` as above but also returns, for each frame,
+          a named tuple of arrays indexed by label with elements:
+
+            - ``area`` the number of pixels in the region
+            - ``umin``, ``vmin`` the top-left corner of the bounding box
+            - ``umax``, ``vmax`` one more than the bottom-right corner of the
+              bounding box
+            - ``uc``, ``vc`` the centroid
+
+          The statistics are computed in the same pass over the image as the
+          labels.
+
+        - ``IM.label(algorithm=alg)`` as above using the OpenCV labelling
+          algorithm ``alg``:
+
+            ==============  ===================================================
+            ``alg``         algorithm
+            ==============  ===================================================
+            ``'default'``   ``'spaghetti'`` for 8-way connectivity, ``'sauf'``
+                            for 4-way connectivity
+            ``'wu'``        scan array union find [Wu]
+            ``'sauf'``      same as ``'wu'``
+            ``'grana'``     block based decision tree [Grana]
+            ``'bbdt'``      same as ``'grana'``
+            ``'bolelli'``   block based decision forest [Bolelli]
+            ``'spaghetti'`` same as ``'bolelli'``
+            ==============  ===================================================
+
+          The block based algorithms only support 8-way connectivity, for
+          4-way connectivity ``'sauf'`` is used.  All algorithms return the
+          same regions, but they may be numbered differently.
+
         Example:
 
         .. runblock:: pycon
@@ -677,6 +2419,21 @@ class ImageProcessingMorphMixin:
             - Connectivity is performed using 8 nearest neighbours by default.
             - 8-way connectivity introduces ambiguities, a chequerboard is
               two blobs.
+            - Label 0 is the background, the pixels with value 0, and its
+              statistics are included.
+
+        :references:
+
+            - Optimizing two-pass connected-component labeling algorithms,
+              K. Wu, E. Otoo, K. Suzuki, Pattern Analysis and Applications,
+              2009.
+            - Optimized block-based connected components labeling with
+              decision trees, C. Grana, D. Borghesani, R. Cucchiara, IEEE
+              Transactions on Image Processing, 2010.
+            - Spaghetti labeling: directed acyclic graphs for block-based
+              connected components labeling, F. Bolelli, S. Allegretti,
+              L. Baraldi, C. Grana, IEEE Transactions on Image Processing,
+              2019.
         """
         # NOTE cv.connectedComponents sees 0 background as one component
         # differs from ilabel.m, which sees the separated background as
@@ -714,32 +2471,192 @@ class ImageProcessingMorphMixin:
         # set ltype to default to cv.CV_32S
         if outtype == 'int32':
             ltype = cv.CV_32S
-            dtype = np.int32
         elif outtype == 'uint16':
             ltype = cv.CV_16U
-            dtype = np.uint16
         else:
-            raise TypeError(ltype, 'ltype must be either int32 or uint16')
+            raise TypeError(outtype, 'outtype must be either int32 or uint16')
+
+        try:
+            ccltype = _CCL_ALGORITHM[algorithm]
+        except KeyError:
+            raise ValueError(algorithm, 'unknown labelling algorithm')
 
         out_l = []
         out_c = []
+        out_s = []
         for im in img:
-            labels = np.zeros((im.shape[0], im.shape[1]), dtype=dtype)
-
-            # NOTE there is connectedComponentsWithAlgorithm, which grants
-            # 1 other connected component algorithm
-            # https://docs.opencv.org/4.5.0/d3/dc0/group__imgproc__shape.html
-            # #gaedef8c7340499ca391d459122e51bef5
-
-            n_components, labels = cv.connectedComponents(im.image,
-                                                          labels,
-                                                          connectivity=conn,
-                                                          ltype=ltype)
+            if stats:
+                n_components, labels, s, c = \
+                    cv.connectedComponentsWithStatsWithAlgorithm(
+                        im.image, conn, ltype, ccltype)
+                umin = s[:, cv.CC_STAT_LEFT]
+                vmin = s[:, cv.CC_STAT_TOP]
+                out_s.append(_labelstats(
+                    s[:, cv.CC_STAT_AREA], umin,
+                    umin + s[:, cv.CC_STAT_WIDTH], vmin,
+                    vmin + s[:, cv.CC_STAT_HEIGHT], c[:, 0], c[:, 1]))
+            else:
+                n_components, labels = cv.connectedComponentsWithAlgorithm(
+                    im.image, conn, ltype, ccltype)
             out_l.append(labels)
             out_c.append(n_components)
 
+        if stats:
+            return out_c, self.__class__(out_l), out_s
         return out_c, self.__class__(out_l)
 
+    def regionprops(self, labels, order=2):
+        """
+        Properties of labelled regions
+
+        :param labels: label image, as returned by ``label``
+        :type labels: Image instance, numpy array or list of numpy array
+        :param order: largest exponent of the moments, defaults to 2
+        :type order: int
+        :return: region properties
+        :rtype: collections.namedtuple
+
+        - ``IM.regionprops(labels)`` are the properties of every region of the
+          label image, and of the pixels of ``IM`` within it, as a named
+          tuple of arrays indexed by label with elements:
+
+            - ``area`` the number of pixels in the region
+            - ``uc``, ``vc`` the centroid
+            - ``m`` the raw moments of the region, ``m[i,p,q]`` is the sum of
+              ``u^p . v^q`` over region ``i``
+            - ``mu`` the central moments of the region
+            - ``a``, ``b`` the major and minor axis lengths of the equivalent
+              ellipse
+            - ``orientation`` the angle of the major axis with respect to the
+              horizontal axis, in radians
+            - ``mean``, ``std``, ``min``, ``max`` the mean, standard deviation,
+              minimum and maximum of the image over the region
+
+          The moment arrays are ``(N, order+1, order+1)`` where the labels are
+          in the range 0 to N-1, and only the elements with ``p+q <= order``
+          are computed, the rest are zero.  For labels with no pixels the
+          area and raw moments are zero, and all the other properties,
+          which depend on the centroid or the pixel values, are NaN.
+
+        - ``IM.regionprops(labels, order)`` as above with moments up to
+          ``order``.
+
+        If ``IM`` is a sequence ``labels`` must have one frame per frame of
+        ``IM`` and the result is a list with a named tuple per frame.
+
+        Example:
+
+        .. runblock:: pycon
+
+        .. note::
+
+            - Converts a color image to greyscale.
+            - The moments are those of the region, not weighted by the pixel
+              values of ``IM``.
+            - All the regions are computed together, each property is one
+              weighted ``np.bincount`` over the pixels, the cost is
+              proportional to the number of pixels and independent of the
+              number of regions.  No contours are traced.
+        """
+        if isinstance(labels, self.__class__):
+            labels = [L.image for L in labels]
+        elif isinstance(labels, np.ndarray):
+            labels = [labels]
+        if not isinstance(order, (int, np.integer)) or order < 0:
+            raise ValueError(order, 'order must be a non-negative int')
+        img = self.mono()
+        if len(labels) != len(img):
+            raise ValueError(labels, 'labels must have a frame for each '
+                             'frame of the image')
+
+        fields = namedtuple('regionprops',
+                            'area uc vc m mu a b orientation '
+                            'mean std min max')
+        out = []
+        for im, L in zip(img, labels):
+            L = np.asarray(L)
+            if L.shape != im.shape:
+                raise ValueError(L.shape, 'labels must be the same size as '
+                                 'the image')
+            if np.issubdtype(L.dtype, np.floating) or \
+                    (L.size > 0 and L.min() < 0):
+                raise ValueError(L.dtype, 'labels must be non-negative '
+                                 'integers')
+            p = _regionprops(im.image, L, max(order, 2))
+            p = fields(*p)
+            m = p.m[:, :order + 1, :order + 1]
+            mu = p.mu[:, :order + 1, :order + 1]
+            # for order < 2 the second order moments are computed for the
+            # ellipse but are not returned
+            k = np.arange(order + 1)
+            high = np.add.outer(k, k) > order
+            m[:, high] = 0
+            mu = np.where(high & (p.area > 0)[:, np.newaxis, np.newaxis],
+                          0, mu)
+            out.append(p._replace(m=m, mu=mu))
+        if len(out) == 1:
+            return out[0]
+        return out
+
+    def allmoments(self, order=3):
+        """
+        All image moments up to an order
+
+        :param order: largest exponent, defaults to 3
+        :type order: int
+        :return: raw, central, normalized central and Hu moments
+        :rtype: collections.namedtuple
+
+        - ``IM.allmoments()`` are all the moments of the image with exponents
+          up to 3, as a named tuple with elements:
+
+            - ``m`` the raw moments, ``m[p,q]`` is the sum of
+              ``im(u,v) . u^p . v^q``
+            - ``mu`` the central moments, ``mu[p,q]`` is the sum of
+              ``im(u,v) . (u - uc)^p . (v - vc)^q`` where ``(uc, vc)`` is the
+              centroid
+            - ``nu`` the normalized central moments, ``nu[p,q]`` is
+              ``mu[p,q] / m[0,0]^((p+q)/2 + 1)``
+            - ``hu`` the 7 Hu moment invariants, or None if ``order`` is less
+              than 3
+
+          each moment array is ``(order+1, order+1)``.
+
+        - ``IM.allmoments(order)`` as above with exponents up to ``order``.
+
+        If ``IM`` is a sequence each element has a leading dimension with one
+        row per frame.
+
+        Example:
+
+        .. runblock:: pycon
+
+        .. note::
+
+            - Converts a color image to greyscale.
+            - All the moments are computed in a single pass over the image, by
+              two matrix products that project the image onto the powers of
+              ``u`` and ``v``.  The central and normalized moments and Hu
+              invariants are derived from them analytically.
+            - ``mpq``, ``upq`` and ``npq`` return one element of ``m``,
+              ``mu`` and ``nu``, it is cheaper to compute all the moments
+              needed with one call to ``allmoments``.
+
+        :references:
+
+            - M-K. Hu, Visual pattern recognition by moment invariants. IRE
+              Trans. on Information Theory, IT-8:pp. 179-187, 1962.
+        """
+        if not isinstance(order, (int, np.integer)) or order < 0:
+            raise ValueError(order, 'order must be a non-negative int')
+
+        m, mu, nu, hu = _moments((im.image for im in self.mono()), order)
+        if len(self) == 1:
+            m, mu, nu = m[0], mu[0], nu[0]
+            if hu is not None:
+                hu = hu[0]
+        return namedtuple('moments', 'm mu nu hu')(m, mu, nu, hu)
+
     def mpq(self, p, q):
         """
         Image moments
@@ -749,7 +2666,7 @@ class ImageProcessingMorphMixin:
         :param q: q'th exponent
         :type q: integer
         :return: moment
-        :type: list of scalars (same as image type)
+        :type: list of scalars
 
         -``IM.mpq(p, q)`` is the pq'th moment of the image. That is, the sum of
         ``im(x,y) . x^p . y^q``
@@ -758,6 +2675,7 @@ class ImageProcessingMorphMixin:
 
         .. runblock:: pycon
 
+        .. note:: To compute several moments use ``allmoments``.
         """
 
         if not isinstance(p, int):
@@ -765,12 +2683,8 @@ class ImageProcessingMorphMixin:
         if not isinstance(q, int):
             raise TypeError(q, 'q must be an int')
 
-        out = []
-        for im in self:
-            x, y = self.imeshgrid(im.image)
-            out.append(np.sum(im.image * (x ** p) * (y ** q)))
-
-        return out
+        m, _, _, _ = _moments((im.image for im in self.mono()), max(p, q))
+        return list(m[:, p, q])
 
     def upq(self, p, q):
         """
@@ -781,7 +2695,7 @@ class ImageProcessingMorphMixin:
         :param q: q'th exponent
         :type q: integer
         :return: moment
-        :type: list of scalar (same as image type)
+        :type: list of scalar
 
         - ``IM.upq(p, q)`` is the pq'th central moment of the image. That is,
           the sum of ``im(x,y) . (x - x0)^p . (y - y0)^q`` where (x0, y0) is
@@ -794,6 +2708,7 @@ class ImageProcessingMorphMixin:
         .. notes::
 
             - The central moments are invariant to translation
+            - To compute several moments use ``allmoments``.
 
         """
 
@@ -802,15 +2717,8 @@ class ImageProcessingMorphMixin:
         if not isinstance(q, int):
             raise TypeError(q, 'q must be an int')
 
-        out = []
-        for im in self:
-            x, y = self.imeshgrid(im.image)
-            m00 = im.mpq(0, 0)
-            xc = im.mpq(1, 0) / m00
-            yc = im.mpq(0, 1) / m00
-            out.append(np.sum(im.image * ((x - xc) ** p) * ((y - yc) ** q)))
-
-        return out
+        _, mu, _, _ = _moments((im.image for im in self.mono()), max(p, q))
+        return list(mu[:, p, q])
 
     def npq(self, p, q):
         """
@@ -821,10 +2729,10 @@ class ImageProcessingMorphMixin:
         :param q: q'th exponent
         :type q: integer
         :return: moment
-        :type: list of scalar (same as image type)
+        :type: list of scalar
 
         - ``IM.npq(p, q)`` is the pq'th normalized central moment of the image.
-          That is, the sum of upq(im,p,q) / mpq(im,0,0)
+          That is, the sum of upq(im,p,q) / mpq(im,0,0) ** ((p+q)/2 + 1)
 
         Example:
 
@@ -834,6 +2742,7 @@ class ImageProcessingMorphMixin:
 
             - The normalized central moments are invariant to translation and
               scale.
+            - To compute several moments use ``allmoments``.
 
         """
         if not isinstance(p, int):
@@ -843,13 +2752,8 @@ class ImageProcessingMorphMixin:
         if (p+q) < 2:
             raise ValueError(p+q, 'normalized moments only valid for p+q >= 2')
 
-        g = (p + q) / 2 + 1
-
-        out = []
-        for im in self:
-            out.append(im.upq(p, q) / im.mpq(0, 0) ** g)
-
-        return out
+        _, _, nu, _ = _moments((im.image for im in self.mono()), max(p, q))
+        return list(nu[:, p, q])
 
     def moments(self, binary=False):
         """
@@ -1,6 +1,11 @@
 # classes
 from machinevisiontoolbox.Image import Image
-from machinevisiontoolbox.blobs import Blob
+from machinevisiontoolbox.BinaryImage import BinaryImage
+from machinevisiontoolbox.RunLengthImage import RunLengthImage
+from machinevisiontoolbox.blobs import Blob, BlobTracker, ShapeIndex
+from machinevisiontoolbox.ImageProcessingKernel import ImageGradients
+from machinevisiontoolbox.ImageProcessingMorph import LabelStream
+from machinevisiontoolbox.records import RecordWriter
 from machinevisiontoolbox.features2d import *
 from machinevisiontoolbox.Camera import *
 from machinevisiontoolbox.base import *
@@ -5,84 +5,233 @@
 @author: Peter Corke
 """
 
+from collections import namedtuple
 import numpy as np
 import cv2 as cv
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 from spatialmath import base
 from ansitable import ANSITable, Column
 from machinevisiontoolbox.IImage import IImage
 from machinevisiontoolbox.base import color_bgr, plot_box, plot_labelbox, plot_point
+from machinevisiontoolbox.ImageProcessingMorph import _ellipse, _hu
 
-# NOTE, might be better to use a matplotlib color cycler
-import random as rng
-rng.seed(13543)  # would this be called every time at Blobs init?
 import matplotlib.pyplot as plt
 
-class Blob:
+# moments in the columns of Blob._moments, in the order used by cv.moments
+_MOMENTS = ('m00', 'm10', 'm01', 'm20', 'm11', 'm02',
+            'm30', 'm21', 'm12', 'm03')
+
+
+def _contour_points(contours):
     """
-    A 2D feature blob class
+    Concatenate contours
+
+    :param contours: contours from ``cv.findContours``
+    :type contours: list of numpy array (n,1,2)
+    :return: points, index of the first point of each contour, index of the
+             next point around the contour of each point
+    :rtype: numpy array (P,2), numpy array (N,), numpy array (P,)
     """
-    # list of attributes
-    _area = []
-    _uc = []  # centroid (uc, vc)
-    _vc = []
-
-    _umin = []  # bounding box
-    _umax = []
-    _vmin = []
-    _vmax = []
-
-    _class = []  # TODO check what the class of pixel is?
-    _label = []  # TODO label assigned to this region (based on ilabel.m)
-    _parent = []  # -1 if no parent, else index points to i'th parent contour
-    _children = []  # list of children, -1 if no children
-    # _edgepoint = []  # TODO (x,y) of a point on the perimeter
-    # _edge = []  # list of edge points # replaced with _contours
-    _perimeter = []  # length of edge
-    _touch = []  # 0 if bbox doesn't touch the edge, 1 if it does
+    if len(contours) == 0:
+        return np.zeros((0, 2)), np.zeros((0,), dtype=int), \
+            np.zeros((0,), dtype=int)
+    P = np.concatenate(contours).reshape((-1, 2)).astype(np.float64)
+    n = np.array([len(c) for c in contours])
+    start = np.cumsum(n) - n
+    nxt = np.arange(1, len(P) + 1)
+    nxt[start + n - 1] = start
+    return P, start, nxt
+
+
+def _contour_moments(P, start, nxt, area=False):
+    """
+    Moments of contours
+
+    :param P: concatenated contour points
+    :type P: numpy array (P,2)
+    :param start: index of the first point of each contour
+    :type start: numpy array (N,)
+    :param nxt: index of the next point around the contour of each point
+    :type nxt: numpy array (P,)
+    :param area: compute only m00
+    :type area: bool
+    :return: moments of each contour, columns in the order of ``_MOMENTS``
+    :rtype: numpy array (N,10) or (N,1)
+
+    The moments of the polygons through the contour points by Green's
+    theorem, each is a sum of a polynomial in the coordinates of the ends of
+    each edge, summed for all the contours at once.  The same as
+    ``cv.moments`` of each contour, positive for an anticlockwise or
+    clockwise contour and zero for a contour with no area.
+    """
+    x0, y0 = P[:, 0], P[:, 1]
+    x1, y1 = x0[nxt], y0[nxt]
+    a = x0 * y1 - x1 * y0
+    if len(start) == 0:
+        return np.zeros((0, 1 if area else 10))
+    if area:
+        M = np.add.reduceat(a / 2, start)[:, np.newaxis]
+        M[np.abs(M) <= np.finfo(np.float32).eps] = 0
+        return np.abs(M)
+    xx = x0 * x0 + x0 * x1 + x1 * x1
+    yy = y0 * y0 + y0 * y1 + y1 * y1
+    terms = np.stack([
+        a / 2,
+        a * (x0 + x1) / 6,
+        a * (y0 + y1) / 6,
+        a * xx / 12,
+        a * (x0 * (2 * y0 + y1) + x1 * (y0 + 2 * y1)) / 24,
+        a * yy / 12,
+        a * (x0 + x1) * (x0 * x0 + x1 * x1) / 20,
+        a * (x0 * x0 * (3 * y0 + y1) + 2 * x0 * x1 * (y0 + y1)
+             + x1 * x1 * (y0 + 3 * y1)) / 60,
+        a * (y0 * y0 * (3 * x0 + x1) + 2 * y0 * y1 * (x0 + x1)
+             + y1 * y1 * (x0 + 3 * x1)) / 60,
+        a * (y0 + y1) * (y0 * y0 + y1 * y1) / 20,
+    ], axis=1)
+    M = np.add.reduceat(terms, start, axis=0)
+    sign = np.sign(M[:, 0])
+    sign[np.abs(M[:, 0]) <= np.finfo(np.float32).eps] = 0
+    return M * sign[:, np.newaxis]
+
+
+def _tree(hierarchy):
+    """
+    Children of each contour
+
+    :param hierarchy: hierarchy from ``cv.findContours``, rows are next,
+                      previous, first child and parent
+    :type hierarchy: numpy array (N,4)
+    :return: parent of each contour, offsets and child indices, the children
+             of contour ``i`` are ``child[offset[i]:offset[i+1]]``
+    :rtype: numpy array (N,), numpy array (N+1,), numpy array (M,)
+
+    The children are grouped by parent with one stable sort of the parent
+    column, a compressed sparse row layout.
+    """
+    parent = hierarchy[:, 3]
+    child = np.flatnonzero(parent >= 0)
+    child = child[np.argsort(parent[child], kind='stable')]
+    count = np.bincount(parent[parent >= 0], minlength=len(parent))
+    offset = np.concatenate(([0], np.cumsum(count)))
+    return parent, offset, child
+
 
-    _a = []  # major axis length # equivalent ellipse parameters
-    _b = []  # minor axis length
-    _orientation = []  # angle of major axis wrt the horizontal
-    _aspect = []  # b/a < 1.0
-    _circularity = []
+def _gather(offset, child, nodes):
+    """
+    Children of several contours
+
+    :param offset: offsets from ``_tree``
+    :type offset: numpy array (N+1,)
+    :param child: child indices from ``_tree``
+    :type child: numpy array (M,)
+    :param nodes: contour indices
+    :type nodes: numpy array (K,)
+    :return: the children of all the contours
+    :rtype: numpy array
+    """
+    n = offset[nodes + 1] - offset[nodes]
+    first = np.repeat(offset[nodes] - (np.cumsum(n) - n), n)
+    return child[first + np.arange(np.sum(n))]
 
-    _moments = []  # named tuple of m00, m01, m10, m02, m20, m11
+
+def _depth(parent):
+    """
+    Depth of contours in the hierarchy
+
+    :param parent: parent of each contour, -1 for none
+    :type parent: numpy array (N,)
+    :return: number of ancestors of each contour
+    :rtype: numpy array (N,)
+    """
+    depth = np.zeros(parent.shape, dtype=int)
+    p = parent.copy()
+    while True:
+        up = p >= 0
+        if not np.any(up):
+            break
+        depth[up] += 1
+        p[up] = parent[p[up]]
+    return depth
+
+
+# fields of Blob.to_records and their types
+_RECORD = (('id', np.int32), ('parent', np.int32), ('area', np.float64),
+           ('uc', np.float64), ('vc', np.float64), ('umin', np.int32),
+           ('umax', np.int32), ('vmin', np.int32), ('vmax', np.int32),
+           ('touch', np.bool_), ('perimeter', np.float64),
+           ('circularity', np.float64), ('a', np.float64),
+           ('b', np.float64), ('aspect', np.float64),
+           ('orientation', np.float64))
+
+
+class Blob:
+    """
+    A 2D feature blob class
+
+    The contours of the blobs are found when the object is created, every
+    other property is computed for all the blobs the first time it is
+    requested and then cached.  Properties that are computed together, for
+    example the four sides of the bounding box, are cached together.
+    Indexing or slicing selects blobs and their cached properties.
+    """
 
     # note that RegionFeature.m has edge, edgepoint - these are the contours
-    _contours = []
-    _image = []  # keep image saved for each Blobs object
-    # probably not necessary in the long run, but for now is useful
-    # to retain for debugging purposes. Not practical if blob
-    # accepts a large/long sequence of images
-    _hierarchy = []
+    _contours = []  # contour of each blob
+    _allcontours = []  # every contour found in the image
+    _hierarchy = []  # hierarchy row of each blob
+    _parent = []  # -1 if no parent, else index points to i'th parent contour
+    _index = []  # index of the contour of each blob
+    _tree = None  # children of each contour, see _tree
+    _shared = None  # per-image results shared by all subsets, eg. labels
+    _imshape = None  # shape of the image
+    _cache = None  # properties computed so far, name -> per-blob array
+
+    # _class = []  # TODO check what the class of pixel is?
+    # _label = []  # TODO label assigned to this region (based on ilabel.m)
+    # _edgepoint = []  # TODO (x,y) of a point on the perimeter
 
-    def __init__(self, image=None):
+    # the method that computes each property, and a rough cost, in order to
+    # apply the cheapest predicates first
+    _properties = {
+        'area': ('_computearea', 0),
+        'umin': ('_computeboundingbox', 0),
+        'umax': ('_computeboundingbox', 0),
+        'vmin': ('_computeboundingbox', 0),
+        'vmax': ('_computeboundingbox', 0),
+        'touch': ('_computeboundingbox', 0),
+        'bboxarea': ('_computeboundingbox', 0),
+        'parent': (None, 0),
+        'depth': (None, 0),
+        'moments': ('_computemoments', 1),
+        'uc': ('_computemoments', 1),
+        'vc': ('_computemoments', 1),
+        'perimeter': ('_computeperimeter', 1),
+        'circularity': ('_computecircularity', 2),
+        'a': ('_computeequivalentellipse', 2),
+        'b': ('_computeequivalentellipse', 2),
+        'orientation': ('_computeequivalentellipse', 2),
+        'aspect': ('_computeequivalentellipse', 2),
+        'humoments': ('_computehu', 2),
+    }
+
+    def __init__(self, image=None, **kwargs):
 
         if image is None:
             # initialise empty Blobs
             # Blobs()
-            self._area = None
-            self._uc = None  # Two element array, empty? Nones? []?
-            self._vc = None
-            self._perimeter = None
-
-            self._umin = None
-            self._umax = None
-            self._vmin = None
-            self._vmax = None
-            self._touch = None
-
-            self._a = None
-            self._b = None
-            self._orientation = None
-            self._aspect = None
-            self._circularity = None
-            self._moments = None
-
             self._contours = None
+            self._allcontours = None
             self._hierarchy = None
             self._parent = None
-            self._children = None
+            self._index = None
+            self._tree = None
+            self._shared = {}
+            self._imshape = None
+            self._cache = {}
             return
 
         # check if image is valid - it should be a binary image, or a
@@ -102,94 +251,161 @@ class Blob:
         contours, hierarchy = cv.findContours(image.image,
                                               mode=cv.RETR_TREE,
                                               method=cv.CHAIN_APPROX_NONE)
-        self._contours = contours
+        self._allcontours = list(contours)
+        self._contours = self._allcontours
 
         # TODO contourpoint, or edgepoint: take first pixel of contours
 
         # change hierarchy from a (1,M,4) to (M,4)
-        self._hierarchy = hierarchy[0,:,:]  # drop the first singleton dimension
-        self._parent = self._hierarchy[:, 2]
-        self._children = self._getchildren()
-
-        # get moments as a dictionary for each contour
-        mu = [cv.moments(self._contours[i])
-              for i in range(len(self._contours))]
-
-        # recompute moments wrt hierarchy
-        mf = self._hierarchicalmoments(mu)
-        self._moments = mf
-
-        # get mass centers/centroids:
-        mc = np.array(self._computecentroids())
-        self._uc = mc[:, 0]
-        self._vc = mc[:, 1]
+        if hierarchy is None:
+            self._hierarchy = np.zeros((0, 4), dtype=np.int32)
+        else:
+            # drop the first singleton dimension
+            self._hierarchy = hierarchy[0, :, :]
+        self._parent = self._hierarchy[:, 3]
+        self._index = np.arange(len(self._hierarchy))
+        self._tree = _tree(self._hierarchy)
+        self._shared = {}
+        self._imshape = image.shape[:2]
+        self._cache = {}
 
-        # get areas:
-        self._area = np.array(self._computearea())
         # TODO sort contours wrt area descreasing?
 
-        # get perimeter:
-        self._perimeter = np.array(self._computeperimeter())
-
-        # get circularity
-        self._circularity = np.array(self._computecircularity())
-
-        # get bounding box:
-        bbox = np.array(self._computeboundingbox())
-
-        # bbox in [u0, v0, length, width]
-        self._umax = bbox[:, 0] + bbox[:, 2]
-        self._umin = bbox[:, 0]
-        self._vmax = bbox[:, 1] + bbox[:, 3]
-        self._vmin = bbox[:, 1]
-
-        self._touch = np.r_[self._touchingborder(image.shape)]
-
-        # equivalent ellipse from image moments
-        a, b, orientation = self._computeequivalentellipse()
-        self._a = np.array(a)
-        self._b = np.array(b)
-        self._orientation = np.array(orientation)
-        self._aspect = self._b / self._a
+        if len(kwargs) > 0:
+            blobs, keep = self._filter(**kwargs)
+            self._subset(keep, self)
+            # keep the properties computed while filtering
+            self._cache.update(blobs._cache)
 
     def __len__(self):
-        if isinstance(self._uc, np.ndarray):
-            return len(self._area)
+        if isinstance(self._index, np.ndarray) and self._index.ndim > 0:
+            return len(self._index)
         else:
             return 1
 
     def __getitem__(self, ind):
-        if isinstance(self._uc, np.ndarray):
-            new = Blob()
-
-            new._area = self._area[ind]
-            new._uc = self._uc[ind]
-            new._vc = self._vc[ind]
-            new._perimeter = self._perimeter[ind]
-
-            new._umin = self._umin[ind]
-            new._umax = self._umax[ind]
-            new._vmin = self._vmin[ind]
-            new._vmax = self._vmax[ind]
-
-            new._a = self._a[ind]
-            new._b = self._b[ind]
-            new._aspect = self._aspect[ind]
-            new._orientation = self._orientation[ind]
-            new._circularity = self._circularity[ind]
-            new._touch = self._touch[ind]
-            new._parent = self._parent[ind]
-            if isinstance(ind, int):
-                ind = slice(ind)
-            new._children = self._children[ind]
-
-            return new
+        if np.ndim(self._index) > 0 or \
+                not isinstance(ind, (int, np.integer)):
+            # an array or slice of a single blob can select none
+            return self._subset(ind, Blob())
         else:
-            if ind > 0:
+            if ind not in (0, -1):
                 raise IndexError
 
             return self
 
+    def _subset(self, ind, new):
+        # set the state of new to the blobs ind of self, new can be self
+        index, parent = self._index, self._parent
+        hierarchy, cache = self._hierarchy, self._cache
+        if np.ndim(index) == 0:
+            # a single blob, as a sequence of one
+            index, parent = np.atleast_1d(index), np.atleast_1d(parent)
+            hierarchy = hierarchy[np.newaxis]
+            cache = {name: np.asarray(value)[np.newaxis]
+                     for name, value in cache.items()}
+        index = index[ind]
+        parent = parent[ind]
+        hierarchy = hierarchy[ind]
+        cache = {name: value[ind] for name, value in cache.items()}
+        if np.ndim(index) == 0:
+            contours = [self._allcontours[index]]
+        else:
+            contours = [self._allcontours[i] for i in index]
+
+        # the contours and tree are shared
+        new._allcontours = self._allcontours
+        new._tree = self._tree
+        new._shared = self._shared
+        new._imshape = self._imshape
+
+        new._index = index
+        new._parent = parent
+        new._hierarchy = hierarchy
+        new._cache = cache
+        new._contours = contours
+        return new
+
+    def filter(self, **kwargs):
+        """
+        Select blobs by their properties
+
+        :param kwargs: property name and predicate
+        :return: blobs that satisfy all the predicates
+        :rtype: Blob instance
+
+        - ``blobs.filter(name=(min, max))`` are the blobs whose property
+          ``name`` is in the range ``min`` to ``max`` inclusive.  Either
+          limit can be None.
+
+        - ``blobs.filter(name=value)`` are the blobs whose property ``name``
+          equals ``value``, for example ``touch=False``.
+
+        - ``blobs.filter(name=func)`` are the blobs for which ``func``,
+          applied to the array of property values, is True.
+
+        Several predicates can be given, the property names are ``area``,
+        ``umin``, ``umax``, ``vmin``, ``vmax``, ``touch``, ``bboxarea``,
+        ``parent``, ``depth``, ``uc``, ``vc``, ``perimeter``, ``circularity``,
+        ``a``, ``b``, ``orientation`` and ``aspect``.
+
+        Example:
+
+        .. runblock:: pycon
+
+            >>> from machinevisiontoolbox import Image
+            >>> im = Image('shark2.png')
+            >>> blobs = im.blobs()
+            >>> blobs.filter(area=(1000, None), touch=False)
+
+        .. note:: The predicates on properties that are cheap to compute,
+            the area from the contour alone and the bounding box, are applied
+            first.  The expensive properties are only computed for the blobs
+            that satisfy them, and are cached for the blobs returned.
+        """
+        return self._filter(**kwargs)[0]
+
+    def _filter(self, **kwargs):
+        # the blobs that satisfy the predicates, and their indices in self
+        for name in kwargs:
+            if name not in self._properties or \
+                    name in ('moments', 'humoments'):
+                raise ValueError(name, 'unknown blob property')
+
+        blobs = self
+        index = np.arange(len(self))
+        for name in sorted(kwargs, key=lambda n: self._properties[n][1]):
+            if len(blobs) == 0:
+                break
+            predicate = kwargs[name]
+            value = np.atleast_1d(getattr(blobs, name))
+            if callable(predicate):
+                select = predicate(value)
+            elif isinstance(predicate, (tuple, list)):
+                lo, hi = predicate
+                select = np.ones(value.shape, dtype=bool)
+                if lo is not None:
+                    select &= value >= lo
+                if hi is not None:
+                    select &= value <= hi
+            else:
+                select = value == predicate
+            select = np.flatnonzero(select)
+            blobs = blobs[select]
+            index = index[select]
+        return blobs, index
+
+    def _get(self, name):
+        # the value of a per-blob property, computed on first use
+        if name not in self._cache:
+            index = np.atleast_1d(self._index)
+            values = getattr(self, self._properties[name][0])(index)
+            for key, value in values.items():
+                if np.ndim(self._index) == 0:
+                    value = value[0]
+                self._cache[key] = value
+        return self._cache[name]
+
     def __repr__(self):
         # s = "" for i, blob in enumerate(self): s += f"{i}:
         # area={blob.area:.1f} @ ({blob.uc:.1f}, {blob.vc:.1f}),
@@ -222,103 +438,77 @@ class Blob:
 
         return str(table)
 
-    def _computeboundingbox(self, epsilon=3, closed=True):
-        cpoly = [cv.approxPolyDP(c,
-                                 epsilon=epsilon,
-                                 closed=closed)
-                 for i, c in enumerate(self._contours)]
-        bbox = [cv.boundingRect(cpoly[i]) for i in range(len(cpoly))]
-        return bbox
-
-    def _computeequivalentellipse(self):
-        nc = len(self._contours)
-        mf = self._moments
-        mc = np.stack((self._uc, self._vc), axis=1)
-        # w = [None] * nc
-        # v = [None] * nc
-        orientation = [None] * nc
-        a = [None] * nc
-        b = [None] * nc
-        for i in range(nc):
-            u20 = mf[i]['m20'] / mf[i]['m00'] - mc[i, 0]**2
-            u02 = mf[i]['m02'] / mf[i]['m00'] - mc[i, 1]**2
-            u11 = mf[i]['m11'] / mf[i]['m00'] - mc[i, 0]*mc[i, 1]
-
-            cov = np.array([[u20, u11], [u02, u11]])
-            w, v = np.linalg.eig(cov)  # w = eigenvalues, v = eigenvectors
-
-            a[i] = 2.0 * np.sqrt(np.max(np.diag(v)) / mf[i]['m00'])
-            b[i] = 2.0 * np.sqrt(np.min(np.diag(v)) / mf[i]['m00'])
-
-            ev = v[:, -1]
-            orientation[i] = np.arctan(ev[1] / ev[0])
-        return a, b, orientation
-
-    def _computecentroids(self):
-        mf = self._moments
-        mc = [(mf[i]['m10'] / (mf[i]['m00']), mf[i]['m01'] / (mf[i]['m00']))
-              for i in range(len(self._contours))]
-        return mc
-
-    def _computearea(self):
-        return [self._moments[i]['m00'] for i in range(len(self._contours))]
-
-    def _computecircularity(self):
-        # apply Kulpa's correction factor when computing circularity
-        # should have max 1 circularity for circle, < 1 for non-circles
-        # Peter's reference:
-        # Area and perimeter measurement of blobs in discrete binary pictures.
-        # Z.Kulpa. Comput. Graph. Image Process., 6:434-451, 1977.
-        # Another reference that Dorian found:
-        # Methods to Estimate Areas and Perimeters of Blob-like Objects: a
-        # Comparison. Proc. IAPR Workshop on Machine Vision Applications.,
-        # December 13-15, 1994, Kawasaki, Japan
-        # L. Yang, F. Albregtsen, T. Loennestad, P. Groettum
-        kulpa = np.pi / 8.0 * (1.0 + np.sqrt(2.0))
-        circularity = [((4.0 * np.pi * self._area[i]) /
-                        ((self._perimeter[i] * kulpa) ** 2))
-                       for i in range(len(self._contours))]
-        return circularity
-
-    def _computeperimeter(self):
-        nc = len(self._contours)
-        edgelist = [None] * nc
-        edgediff = [None] * nc
-        edgenorm = [None] * nc
-        perimeter = [None] * nc
-        for i in range(nc):
-            edgelist[i] = np.vstack((self._contours[i][0:],
-                                     np.expand_dims(self._contours[i][0],
-                                                    axis=0)))
-            edgediff[i] = np.diff(edgelist[i], axis=0)
-            edgenorm[i] = np.linalg.norm(edgediff[i], axis=2)
-            perimeter[i] = np.sum(edgenorm[i], axis=0)[0]
-        return perimeter
-
-    def _touchingborder(self, imshape):
-        t = [False]*len(self._contours)
-        # TODO replace with list comprehension?
-        for i in range(len(self._contours)):
-            if ((self._umin[i] == 0) or (self._umax[i] == imshape[0]) or
-                    (self._vmin[i] == 0) or (self._vmax[i] == imshape[1])):
-                t[i] = True
-        return t
+    def to_dict_of_arrays(self, fields=None):
+        """
+        Blob properties as a dictionary of arrays
+
+        :param fields: names of the properties, defaults to all
+        :type fields: list of str, optional
+        :return: property name and value for each blob
+        :rtype: dict of ndarray(N)
+
+        The names are those of ``_RECORD``, ``id`` is the index of the
+        blob's contour, the same as the indices given by ``parent`` and
+        ``children``.  Only the requested properties are computed.
 
-    def _hierarchicalmoments(self, mu):
+        :seealso: :meth:`to_records`
+        """
+        if fields is None:
+            fields = [name for name, _ in _RECORD]
+        names = dict(_RECORD)
+        out = {}
+        for name in fields:
+            if name not in names:
+                raise ValueError(name, 'unknown blob property')
+            if self._index is None:
+                value = np.zeros((0,))
+            elif name == 'id':
+                value = self._index
+            else:
+                value = getattr(self, name)
+            out[name] = np.atleast_1d(value).astype(names[name])
+        return out
+
+    def to_records(self, fields=None):
+        """
+        Blob properties as a structured array
+
+        :param fields: names of the properties, defaults to all
+        :type fields: list of str, optional
+        :return: properties of each blob
+        :rtype: structured ndarray(N)
+
+        Each property is computed for all the blobs at once and copied to a
+        field of the array, there is no work per blob.
+
+        Example:
+
+        .. runblock:: pycon
+
+            >>> from machinevisiontoolbox import Image
+            >>> im = Image('shark2.png')
+            >>> blobs = im.blobs()
+            >>> blobs.to_records(['id', 'area', 'uc', 'vc'])
+
+        :seealso: :meth:`to_dict_of_arrays`, :class:`RecordWriter`
+        """
+        columns = self.to_dict_of_arrays(fields)
+        n = 0 if self._index is None else len(self)
+        dtype = [(name, value.dtype) for name, value in columns.items()]
+        records = np.empty((n,), dtype=dtype)
+        for name, value in columns.items():
+            records[name] = value
+        return records
+
+    def _points(self, index):
+        # concatenated points of the contours
+        return _contour_points([self._allcontours[i] for i in index])
+
+    def _hierarchicalmoments(self, index, area=False):
         # for moments in a hierarchy, for any pq moment of a blob ignoring its
         # children you simply subtract the pq moment of each of its children.
         # That gives you the “proper” pq moment for the blob, which you then
         # use to compute area, centroid etc. for each contour
-        #   find all children (row i to hierarchy[0,i,0]-1, if same then no
-        #   children)
-        #   recompute all moments
-
-        # to deliver all the children of i'th contour:
-        # first index identifies the row that the next contour at the same
-        # hierarchy level starts
-        # therefore, to grab all children for given contour, grab all rows
-        # up to i-1 of the first row value
-        # can only have one parent, so just take the last (4th) column
 
         # hierarchy order: [Next, Previous, First_Child, Parent]
         # for i in range(len(contours)):
@@ -334,53 +524,112 @@ class Blob:
         #    8 [-1  5  9 -1]
         #    9 [-1 -1 -1  8]
 
-        mh = mu
-        for i in range(len(self._contours)):  # for each contour
-            inext = self._hierarchy[i, 0]
-            ichild = self._hierarchy[i, 2]
-            if not (ichild == -1):  # then children exist
-                ichild = [ichild]  # make first child a list
-                # find other children who are less than NEXT in the hierarchy
-                # and greater than -1,
-                otherkids = [k for k in range(i + 1, len(self._contours)) if
-                             ((k < inext) and (inext > 0))]
-                if not len(otherkids) == 0:
-                    ichild.extend(list(set(otherkids) - set(ichild)))
-
-                for j in range(ichild[0], ichild[-1]+1):  # for each child
-                    # all moments that need to be computed
-                    # subtract them from the parent moment
-                    # mh[i]['m00'] = mh[i]['m00'] - mu[j]['m00'] ...
-
-                    # do a dictionary comprehension:
-                    mh[i] = {key: mh[i][key] -
-                             mu[j].get(key, 0) for key in mh[i]}
-            # else:
-                # no change to mh, because contour i has no children
-
+        # only the direct children are subtracted, a grandchild is a blob
+        # inside a hole, scatter-add the children to their parents
+        _, offset, child = self._tree
+        children = _gather(offset, child, index)
+        owner = np.repeat(np.arange(len(index)),
+                          offset[index + 1] - offset[index])
+        mu = _contour_moments(*self._points(np.r_[index, children]), area)
+        mh = mu[:len(index)]
+        for k in range(mu.shape[1]):
+            mh[:, k] -= np.bincount(owner, mu[len(index):, k],
+                                    minlength=len(index))
         return mh
 
-    def _getchildren(self):
-        # gets list of children for each contour based on hierarchy
-        # follows similar for loop logic from _hierarchicalmoments, so
-        # TODO use _getchildren to cut redundant code in _hierarchicalmoments
-
-        children = [None]*len(self._contours)
-        for i in range(len(self._contours)):
-            inext = self._hierarchy[i, 0]
-            ichild = self._hierarchy[i, 2]
-            if not (ichild == -1):
-                # children exist
-                ichild = [ichild]
-                otherkids = [k for k in range(i + 1, len(self._contours))
-                             if ((k < inext) and (inext > 0))]
-                if not len(otherkids) == 0:
-                    ichild.extend(list(set(otherkids) - set(ichild)))
-                children[i] = ichild
-            else:
-                # else no children
-                children[i] = [-1]
-        return children
+    def _computearea(self, index):
+        # m00 alone is a fraction of the cost of all the moments
+        return {'area': self._hierarchicalmoments(index, area=True)[:, 0]}
+
+    def _computemoments(self, index):
+        m = self._hierarchicalmoments(index)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            uc = m[:, 1] / m[:, 0]
+            vc = m[:, 2] / m[:, 0]
+        return {'moments': m, 'area': m[:, 0], 'uc': uc, 'vc': vc}
+
+    def _computehu(self, index):
+        # Hu invariants from the normalized central moments up to order 3
+        m = self._get_all('moments')
+        m00, m10, m01, m20, m11, m02, m30, m21, m12, m03 = m.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            uc = m10 / m00
+            vc = m01 / m00
+            nu = np.zeros((len(m), 4, 4))
+            nu[:, 2, 0] = m20 - uc * m10
+            nu[:, 1, 1] = m11 - uc * m01
+            nu[:, 0, 2] = m02 - vc * m01
+            nu[:, 3, 0] = m30 - 3 * uc * m20 + 2 * uc ** 2 * m10
+            nu[:, 2, 1] = m21 - 2 * uc * m11 - vc * m20 + 2 * uc ** 2 * m01
+            nu[:, 1, 2] = m12 - 2 * vc * m11 - uc * m02 + 2 * vc ** 2 * m10
+            nu[:, 0, 3] = m03 - 3 * vc * m02 + 2 * vc ** 2 * m01
+            k = np.add.outer(np.arange(4), np.arange(4))
+            nu /= m00[:, np.newaxis, np.newaxis] ** (1 + k / 2)
+            return {'humoments': _hu(nu)}
+
+    def _computeboundingbox(self, index):
+        # extent of the points of each contour, umax and vmax are one more
+        # than the largest coordinate
+        P, start, _ = self._points(index)
+        if len(start) == 0:
+            umin = umax = vmin = vmax = np.zeros((0,), dtype=int)
+        else:
+            Pi = P.astype(int)
+            umin = np.minimum.reduceat(Pi[:, 0], start)
+            umax = np.maximum.reduceat(Pi[:, 0], start) + 1
+            vmin = np.minimum.reduceat(Pi[:, 1], start)
+            vmax = np.maximum.reduceat(Pi[:, 1], start) + 1
+        touch = (umin == 0) | (umax == self._imshape[1]) | \
+            (vmin == 0) | (vmax == self._imshape[0])
+        return {'umin': umin, 'umax': umax, 'vmin': vmin, 'vmax': vmax,
+                'touch': touch, 'bboxarea': (umax - umin) * (vmax - vmin)}
+
+    def _computeequivalentellipse(self, index):
+        # closed form eigenvalues of the inertia matrix of all blobs at once
+        m = self._get_all('moments')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            uc = m[:, 1] / m[:, 0]
+            vc = m[:, 2] / m[:, 0]
+            mu20 = m[:, 3] - m[:, 1] * uc
+            mu11 = m[:, 4] - m[:, 1] * vc
+            mu02 = m[:, 5] - m[:, 2] * vc
+            a, b, orientation = _ellipse(m[:, 0], mu20, mu11, mu02)
+            return {'a': a, 'b': b, 'orientation': orientation,
+                    'aspect': b / a}
+
+    def _computecircularity(self, index):
+        # apply Kulpa's correction factor when computing circularity
+        # should have max 1 circularity for circle, < 1 for non-circles
+        # Peter's reference:
+        # Area and perimeter measurement of blobs in discrete binary pictures.
+        # Z.Kulpa. Comput. Graph. Image Process., 6:434-451, 1977.
+        # Another reference that Dorian found:
+        # Methods to Estimate Areas and Perimeters of Blob-like Objects: a
+        # Comparison. Proc. IAPR Workshop on Machine Vision Applications.,
+        # December 13-15, 1994, Kawasaki, Japan
+        # L. Yang, F. Albregtsen, T. Loennestad, P. Groettum
+        kulpa = np.pi / 8.0 * (1.0 + np.sqrt(2.0))
+        area = self._get_all('area')
+        perimeter = self._get_all('perimeter')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {'circularity': (4.0 * np.pi * area) /
+                    ((perimeter * kulpa) ** 2)}
+
+    def _computeperimeter(self, index):
+        # length of the closed contour, the same as cv.arcLength
+        P, start, nxt = self._points(index)
+        if len(start) == 0:
+            return {'perimeter': np.zeros((0,))}
+        d = P[nxt] - P
+        return {'perimeter': np.add.reduceat(np.hypot(d[:, 0], d[:, 1]),
+                                             start)}
+
+    def _get_all(self, name):
+        # a property as an array, for computing other properties
+        value = self._get(name)
+        if np.ndim(self._index) == 0:
+            value = np.asarray(value)[np.newaxis]
+        return value
 
     def plot_box(self, **kwargs):
         """
@@ -436,130 +685,315 @@ class Blob:
         for i, blob in enumerate(self):
             plot_point(pos=blob.centroid, text=text, **kwargs)
 
+    def _labels(self):
+        # label image, the index of the contour of each pixel, -1 for the
+        # background.  The binary image is redrawn a level of the hierarchy
+        # at a time, blobs at even depth are foreground, at odd depth are
+        # holes whose boundary pixels are foreground.  The connected
+        # components of the foreground and background are then matched to
+        # contours by a pixel of each: the first point of a blob's contour,
+        # and the pixel to the right of the first point of a hole's contour.
+        # The result is shared by all the subsets of the blobs.
+        if 'labels' in self._shared:
+            return self._shared['labels']
+        parent, _, _ = self._tree
+        depth = _depth(parent)
+        contours = self._allcontours
+        mask = np.zeros(self._imshape, dtype=np.uint8)
+        for d in range(depth.max() + 1 if len(depth) > 0 else 0):
+            level = [contours[i] for i in np.flatnonzero(depth == d)]
+            if d % 2 == 0:
+                cv.fillPoly(mask, level, 1)
+            else:
+                cv.fillPoly(mask, level, 0)
+                cv.polylines(mask, level, True, 1)
+
+        nf, fg = cv.connectedComponents(mask, connectivity=8,
+                                        ltype=cv.CV_32S)
+        nb, bg = cv.connectedComponents(1 - mask, connectivity=4,
+                                        ltype=cv.CV_32S)
+        first = np.array([c[0, 0] for c in contours], dtype=int)
+        first = first.reshape((-1, 2))
+        hole = depth % 2 == 1
+        ifg = np.full((nf,), -1, dtype=np.int32)
+        ibg = np.full((nb,), -1, dtype=np.int32)
+        ifg[fg[first[~hole, 1], first[~hole, 0]]] = np.flatnonzero(~hole)
+        ibg[bg[first[hole, 1], first[hole, 0] + 1]] = np.flatnonzero(hole)
+        labels = np.where(mask > 0, ifg[fg], ibg[bg])
+        self._shared['labels'] = labels
+        return labels
+
+    def labelImage(self, image=None, drawing=None):
+        """
+        Label image of blobs
+
+        :param image: image the blobs were found in, defaults to None
+        :type image: Image, optional
+        :param drawing: label image to draw the blobs into, defaults to -1
+        :type drawing: ndarray(H,W), optional
+        :return: label image
+        :rtype: Image
+
+        Each pixel of a blob in this object is set to the index of the blob's
+        contour, as given by ``parent`` and ``children``, other pixels are -1
+        or unchanged in ``drawing``.  The pixels of a blob do not include its
+        holes.
+
+        .. note:: The image is labelled with all the blobs at once, from the
+            connected components of the image redrawn from the contours.
+
+        :seealso: :meth:`drawBlobs`
+        """
+        if drawing is None:
+            drawing = np.full(self._imshape, -1, dtype=np.int32)
+        labels = self._labels()
+        draw = np.zeros((len(self._allcontours) + 1,), dtype=bool)
+        draw[np.atleast_1d(self._index)] = True
+        np.copyto(drawing, labels, where=np.take(draw, labels))
+
+        if image is None:
+            from machinevisiontoolbox.Image import Image
+            return Image(drawing)
+        return image.__class__(drawing)
+
     def drawBlobs(self,
                   image,
                   drawing=None,
                   icont=None,
                   color=None,
                   contourthickness=cv.FILLED,
-                  textthickness=2):
-        """
-        Draw the blob contour
-
-        :param image: [description]
-        :type image: [type]
-        :param drawing: [description], defaults to None
-        :type drawing: [type], optional
-        :param icont: [description], defaults to None
-        :type icont: [type], optional
-        :param color: [description], defaults to None
-        :type color: [type], optional
-        :param contourthickness: [description], defaults to cv.FILLED
-        :type contourthickness: [type], optional
-        :param textthickness: [description], defaults to 2
+                  textthickness=2,
+                  box=None,
+                  centroid=None):
+        """
+        Draw the blobs
+
+        :param image: image the blobs were found in
+        :type image: Image
+        :param drawing: colour image to draw on, defaults to black
+        :type drawing: ndarray(H,W,3), optional
+        :param icont: index of the blobs to draw, defaults to all
+        :type icont: int or array_like(N), optional
+        :param color: colour of each blob, defaults to random colours
+        :type color: array_like(N,3), optional
+        :param contourthickness: thickness of the blob outline, defaults to
+            ``cv.FILLED`` which fills the blob
+        :type contourthickness: int, optional
+        :param textthickness: thickness of the text of the blob index at its
+            centroid, 0 for no text, defaults to 2
         :type textthickness: int, optional
-        :return: [description]
-        :rtype: [type]
+        :param box: colour of the bounding boxes, defaults to None for none
+        :type box: 3-tuple, optional
+        :param centroid: colour of a cross at the centroids, defaults to None
+            for none
+        :type centroid: 3-tuple, optional
+        :return: image with the blobs drawn
+        :rtype: Image
+
+        Each blob is drawn in half the brightness of its colour, the index is
+        drawn in its colour.
+
+        .. note::
+
+            - Filled blobs are painted all at once by a colour lookup table
+              indexed by the label image, see :meth:`labelImage`.
+            - The outlines are painted directly from the contour points, a
+              thicker outline is a dilation of the contour labels.
+            - The bounding boxes and centroid crosses are each drawn by one
+              ``cv.polylines`` call.
+            - The text is drawn a blob at a time by ``cv.putText``.
         """
-        # draw contours of blobs
-        # contours - the contour list
-        # icont - the index of the contour(s) to plot
-        # drawing - the image to draw the contours on
-        # colors - the colors for the icont contours to be plotted (3-tuple)
-        # return - updated drawing
-
-        # TODO split this up into drawBlobs and drawCentroids methods
-
-        # image = Image(image)
-        # image = self.__class__(image)  # assuming self is Image class
-        # @# assume image is Image class
-
-        if drawing is None:
-            drawing = np.zeros(
-                (image.shape[0], image.shape[1], 3), dtype=np.uint8)
-
+        n = len(self) if self._index is not None else 0
         if icont is None:
-            icont = np.arange(0, len(self._contours))
+            icont = np.arange(n)
         else:
             icont = np.array(icont, ndmin=1, copy=True)
+        index = np.atleast_1d(self._index)[icont] if n > 0 \
+            else np.zeros((0,), dtype=int)
 
         if color is None:
-            # make colors a list of 3-tuples of random colors
-            color = [None]*len(icont)
-
-            for i in range(len(icont)):
-                color[i] = (rng.randint(0, 256),
-                            rng.randint(0, 256),
-                            rng.randint(0, 256))
-                # contourcolors[i] = np.round(colors[i]/2)
-            # TODO make a color option, specified through text,
-            # as all of a certain color (default white)
-
-        # make contour colours slightly different but similar to the text color
-        # (slightly dimmer)?
-        cc = [np.uint8(np.array(color[i])/2) for i in range(len(icont))]
-        contourcolors = [(int(cc[i][0]), int(cc[i][1]), int(cc[i][2]))
-                         for i in range(len(icont))]
-
-        # TODO check contours, icont, colors, etc are valid
-        hierarchy = np.expand_dims(self._hierarchy, axis=0)
-        # done because we squeezed hierarchy from a (1,M,4) to an (M,4) earlier
-
-        for i in icont:
-            # TODO figure out how to draw alpha/transparencies?
-            cv.drawContours(drawing,
-                            self._contours,
-                            icont[i],
-                            contourcolors[i],
-                            thickness=contourthickness,
-                            lineType=cv.LINE_8,
-                            hierarchy=hierarchy)
-
-        for i in icont:
-            ic = icont[i]
-            cv.putText(drawing,
-                       str(ic),
-                       (int(self._uc[ic]), int(self._vc[ic])),
-                       fontFace=cv.FONT_HERSHEY_SIMPLEX,
-                       fontScale=1,
-                       color=color[i],
-                       thickness=textthickness)
+            # NOTE, might be better to use a matplotlib color cycler
+            color = np.random.default_rng(13543).integers(0, 256,
+                                                          (len(icont), 3))
+        color = np.array(color, dtype=int).reshape((-1, 3))
+
+        # colour of each contour, the last row is for label -1
+        lut = np.zeros((len(self._allcontours) + 1, 3), dtype=np.uint8)
+        lut[index] = color // 2
+        draw = np.zeros((len(self._allcontours) + 1,), dtype=bool)
+        draw[index] = True
+
+        if contourthickness < 0:
+            labels = self._labels()
+        else:
+            # the contour of each blob, thickened
+            P, start, _ = _contour_points([self._allcontours[i]
+                                           for i in index])
+            P = P.astype(int)
+            owner = np.repeat(index, np.diff(np.r_[start, len(P)]))
+            labels = np.full(self._imshape, -1, dtype=np.int32)
+            labels[P[:, 1], P[:, 0]] = owner
+            if contourthickness > 1:
+                k = 2 * (contourthickness // 2) + 1
+                # float32 holds the labels exactly, cv.dilate has no int32
+                labels = cv.dilate(labels.astype(np.float32),
+                                   cv.getStructuringElement(
+                                       cv.MORPH_ELLIPSE, (k, k)))
+                labels = labels.astype(np.int32)
+        if drawing is None:
+            drawing = np.take(lut, labels, axis=0)
+        else:
+            np.copyto(drawing, np.take(lut, labels, axis=0),
+                      where=np.take(draw, labels)[..., np.newaxis])
+
+        if box is not None and len(index) > 0:
+            umin, umax, vmin, vmax = [np.atleast_1d(getattr(self, name))[icont]
+                                      for name in ('umin', 'umax', 'vmin',
+                                                   'vmax')]
+            umax, vmax = umax - 1, vmax - 1
+            corners = np.stack([np.c_[umin, vmin], np.c_[umax, vmin],
+                                np.c_[umax, vmax], np.c_[umin, vmax]],
+                               axis=1).astype(np.int32)
+            cv.polylines(drawing, corners, True, tuple(int(c) for c in box))
+
+        if centroid is not None and len(index) > 0:
+            u = np.round(np.atleast_1d(self.uc)[icont]).astype(np.int32)
+            v = np.round(np.atleast_1d(self.vc)[icont]).astype(np.int32)
+            lines = np.concatenate([
+                np.stack([np.c_[u - 3, v], np.c_[u + 3, v]], axis=1),
+                np.stack([np.c_[u, v - 3], np.c_[u, v + 3]], axis=1)])
+            cv.polylines(drawing, lines, False,
+                         tuple(int(c) for c in centroid))
+
+        if textthickness > 0:
+            uc = np.atleast_1d(self.uc)
+            vc = np.atleast_1d(self.vc)
+            for i, ic in enumerate(icont):
+                if not np.isfinite(uc[ic]):
+                    continue  # a blob with no area
+                cv.putText(drawing,
+                           str(ic),
+                           (int(uc[ic]), int(vc[ic])),
+                           fontFace=cv.FONT_HERSHEY_SIMPLEX,
+                           fontScale=1,
+                           color=tuple(int(c) for c in color[i]),
+                           thickness=textthickness)
 
         return image.__class__(drawing)
 
-    def labelImage(self,
-                  image,
-                  drawing=None
-                  ):
+    @property
+    def area(self):
+        """
+        Area of the blob
 
-        if drawing is None:
-            drawing = np.zeros(
-                (image.shape[0], image.shape[1], 3), dtype=np.uint8)
+        :return: area in pixels
+        :rtype: int
+        """
+        return self._get('area')
 
-        # TODO check contours, icont, colors, etc are valid
-        hierarchy = np.expand_dims(self._hierarchy, axis=0)
-        # done because we squeezed hierarchy from a (1,M,4) to an (M,4) earlier
+    @property
+    def moments(self):
+        """
+        Moments of the blob
 
-        for i in range(len(self._contours)):
-            # TODO figure out how to draw alpha/transparencies?
-            cv.drawContours(drawing,
-                            self._contours,
-                            i,
-                            color=(i,i,i),
-                            thickness=-1,
-                            hierarchy=hierarchy)
+        :return: moments m00, m10, m01, m20, m11, m02, m30, m21, m12, m03
+        :rtype: ndarray(10) or ndarray(N,10)
 
-        return image.__class__(drawing[:,:,0])
+        The moments of the polygon through the centres of the boundary
+        pixels, less those of the holes, as computed by ``cv.moments``.
+        """
+        return self._get('moments')
 
     @property
-    def area(self):
+    def humoments(self):
         """
-        Area of the blob
+        Hu moment invariants of the blob
 
-        :return: area in pixels
-        :rtype: int
+        :return: the seven Hu invariants
+        :rtype: ndarray(7) or ndarray(N,7)
+
+        Computed from the moments of the blob, less those of its holes, the
+        same as ``cv.HuMoments`` of the contour of a blob with no holes.
+
+        :references:
+
+            - M-K. Hu, Visual pattern recognition by moment invariants. IRE
+              Trans. on Information Theory, IT-8:pp. 179-187, 1962.
+
+        :seealso: :meth:`moments`, :class:`ShapeIndex`
+        """
+        return self._get('humoments')
+
+    def fourierdescriptors(self, n=8):
+        """
+        Fourier descriptors of the blob contours
+
+        :param n: number of descriptors, defaults to 8
+        :type n: int, optional
+        :return: descriptors of each blob
+        :rtype: ndarray(n) or ndarray(N,n)
+
+        Each contour is resampled at equal intervals of arc length and the
+        descriptors are the magnitudes of the harmonics of its discrete
+        Fourier transform, in the order -1, 2, -2, 3, -3 ..., relative to the
+        first harmonic.  They do not depend on the position, size and
+        orientation of the blob, or the start point and direction of the
+        contour.
+
+        .. note:: All the contours are resampled at once and transformed by
+            one FFT.
+        """
+        samples = max(64, 2 * n + 4)
+        index = np.atleast_1d(self._index)
+        P, start, nxt = self._points(index)
+        if len(start) == 0:
+            return np.zeros((0, n))
+
+        # arc length at the end of each segment, and of each contour
+        d = np.hypot(*(P[nxt] - P).T)
+        end = np.cumsum(d)
+        count = np.diff(np.r_[start, len(P)])
+        s0 = end[start] - d[start]
+        length = np.add.reduceat(d, start)
+
+        # segment and position along it of equally spaced samples
+        t = s0[:, np.newaxis] + length[:, np.newaxis] * \
+            np.arange(samples) / samples
+        seg = np.searchsorted(end, t, side='right')
+        seg = np.clip(seg, start[:, np.newaxis],
+                      (start + count - 1)[:, np.newaxis])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            f = np.nan_to_num((t - (end[seg] - d[seg])) / d[seg])
+        Z = P[seg] + f[..., np.newaxis] * (P[nxt[seg]] - P[seg])
+        F = np.abs(np.fft.fft(Z[..., 0] + 1j * Z[..., 1], axis=1))
+
+        # make the first harmonic the larger, whatever the direction
+        flip = F[:, -1] > F[:, 1]
+        F[flip] = F[flip][:, -np.arange(samples) % samples]
+        k = np.arange(2, n // 2 + 3)
+        k = np.stack([1 - k, k], axis=1).ravel()[:n]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fd = np.nan_to_num(F[:, k % samples] / F[:, 1:2])
+        if np.ndim(self._index) == 0:
+            fd = fd[0]
+        return fd
+
+    def matchshape(self, index, k=1):
         """
-        return self._area
+        Nearest reference shapes
+
+        :param index: index of reference shapes
+        :type index: ShapeIndex
+        :param k: number of nearest shapes, defaults to 1
+        :type k: int, optional
+        :return: the nearest shapes to each blob
+        :rtype: named tuple
+
+        ``blobs.matchshape(index)`` is the same as ``index.query(blobs)``.
+
+        :seealso: :meth:`ShapeIndex.query`
+        """
+        return index.query(self, k=k)
 
     @property
     def uc(self):
@@ -585,11 +1019,11 @@ class Blob:
     #  features2d
     @property
     def u(self):
-        return self._uc
+        return self._get('uc')
 
     @property
     def v(self):
-        return self._vc
+        return self._get('vc')
 
     @property
     def a(self):
@@ -601,7 +1035,7 @@ class Blob:
 
         :seealso: func:`b`, :func:`aspect`
         """
-        return self._a
+        return self._get('a')
 
     @property
     def b(self):
@@ -613,7 +1047,7 @@ class Blob:
 
         :seealso: func:`a`, :func:`aspect`
         """
-        return self._b
+        return self._get('b')
 
     @property
     def aspect(self):
@@ -625,7 +1059,7 @@ class Blob:
 
         :seealso: func:`a`, :func:`b`
         """
-        return self._aspect
+        return self._get('aspect')
 
     @property
     def orientation(self):
@@ -635,7 +1069,7 @@ class Blob:
         :return: Orientation of equivalent ellipse (in radians)
         :rtype: float
         """
-        return self._orientation
+        return self._get('orientation')
 
     @property
     def bbox(self):
@@ -650,8 +1084,8 @@ class Blob:
         and top-right corners of the bounding box.
         """
         return np.array([
-            [self._umin, self._umax], 
-            [self._vmin, self._vmax],
+            [self.umin, self.umax],
+            [self.vmin, self.vmax],
         ])
 
     @property
@@ -662,7 +1096,7 @@ class Blob:
         :return: maximum u-coordinate of the blob
         :rtype: int
         """
-        return self._umin
+        return self._get('umin')
 
     @property
     def umax(self):
@@ -672,7 +1106,7 @@ class Blob:
         :return: maximum u-coordinate of the blob
         :rtype: int
         """
-        return self._umax
+        return self._get('umax')
 
     @property
     def vmax(self):
@@ -682,7 +1116,7 @@ class Blob:
         :return: maximum v-coordinate of the blob
         :rtype: int
         """
-        return self._vmax
+        return self._get('vmax')
 
     @property
     def vmin(self):
@@ -692,7 +1126,7 @@ class Blob:
         :return: maximum v-coordinate of the blob
         :rtype: int
         """
-        return self._vmin
+        return self._get('vmin')
 
     @property
     def bboxarea(self):
@@ -704,7 +1138,7 @@ class Blob:
 
         .. note:: The bounding box has vertical and horizontal edges.
         """
-        return [(b._umax - b._umin) * (b._vmax - b._vmin) for b in self]
+        return self._get('bboxarea')
 
     @property
     def centroid(self):
@@ -716,7 +1150,7 @@ class Blob:
 
         :seealso:  :func:`uc`, :func:`vc`
         """
-        return (self._uc, self.vc)
+        return (self.uc, self.vc)
         # TODO maybe ind for centroid: b.centroid[0]?
 
     @property
@@ -729,7 +1163,7 @@ class Blob:
 
 
         """
-        return self._perimeter
+        return self._get('perimeter')
 
     @property
     def touch(self):
@@ -739,7 +1173,7 @@ class Blob:
         :return: blob touches the edge of the image
         :rtype: bool
         """
-        return self._touch
+        return self._get('touch')
 
     @property
     def circularity(self):
@@ -763,7 +1197,7 @@ class Blob:
               December 13-15, 1994, Kawasaki, Japan
               L. Yang, F. Albregtsen, T. Loennestad, P. Groettum
         """
-        return self._circularity
+        return self._get('circularity')
 
     @property
     def parent(self):
@@ -784,8 +1218,69 @@ class Blob:
 
         :return: list of indices of this blob's children
         :rtype: list of int
+
+        For several blobs this is a list of lists.  A blob with no children
+        has an empty list.
+        """
+        _, offset, child = self._tree
+        if np.ndim(self._index) == 0:
+            return list(child[offset[self._index]:offset[self._index + 1]])
+        return [list(child[offset[i]:offset[i + 1]]) for i in self._index]
+
+    @property
+    def depth(self):
+        """
+        Depth of blob in the hierarchy
+
+        :return: number of ancestors of the blob
+        :rtype: int or ndarray(N)
+
+        A blob whose parent is the background has depth 0, a hole in it has
+        depth 1, a blob inside that hole has depth 2 and so on.
+        """
+        return _depth(self._tree[0])[self._index]
+
+    def descendants(self, ind):
+        """
+        Descendants of blobs
+
+        :param ind: index of blob, or blobs
+        :type ind: int or array_like(N)
+        :return: indices of all the blobs below the blobs in the hierarchy
+        :rtype: ndarray
+
+        The children of the blobs, their children and so on, in ascending
+        order.  Computed a level of the hierarchy at a time.
+        """
+        _, offset, child = self._tree
+        out = []
+        nodes = np.atleast_1d(ind)
+        while len(nodes) > 0:
+            nodes = _gather(offset, child, nodes)
+            out.append(nodes)
+        return np.unique(np.concatenate(out))
+
+    def leaves(self, ind=None):
+        """
+        Leaf blobs
+
+        :param ind: index of blob, or blobs, defaults to all blobs
+        :type ind: int or array_like(N)
+        :return: indices of the blobs with no children
+        :rtype: ndarray
+
+        - ``blobs.leaves()`` are the indices of all the blobs that have no
+          children, in ascending order.
+
+        - ``blobs.leaves(ind)`` as above but only those that are descendants
+          of the blobs ``ind``, or are ``ind`` itself.
         """
-        return self._children
+        _, offset, _ = self._tree
+        if ind is None:
+            nodes = np.arange(len(offset) - 1)
+        else:
+            nodes = np.union1d(np.atleast_1d(ind), self.descendants(ind))
+        return nodes[offset[nodes + 1] == offset[nodes]]
 
     def printBlobs(self):
         # TODO accept kwargs or args to show/filter relevant parameters
@@ -799,10 +1294,447 @@ class Blob:
                   touch={6:d}, \
                   parent={7}, \
                   children={8}',
-                             i, self._area[i], self._uc[i], self._vc[i],
-                             self._orientation[i], self._aspect[i],
-                             self._touch[i], self._parent[i],
-                             self._children[i]))
+                             i, self.area[i], self.uc[i], self.vc[i],
+                             self.orientation[i], self.aspect[i],
+                             self.touch[i], self._parent[i],
+                             self.children[i]))
+
+
+# blobs with an aspect ratio above this are round, their orientation is not
+# defined and is not gated by BlobTracker
+_ROUND_ASPECT = 0.9
+
+
+class BlobTracker:
+    """
+    Frame to frame blob tracker
+
+    :param radius: largest distance a blob centroid moves from its predicted
+        position between frames, in pixels
+    :type radius: float
+    :param area: largest relative change in area between frames
+    :type area: float, optional
+    :param aspect: largest change in aspect ratio between frames
+    :type aspect: float, optional
+    :param orientation: largest change in orientation between frames, in
+        radians
+    :type orientation: float, optional
+    :param maxage: number of frames a track is kept without a blob
+    :type maxage: int
+    :param history: number of frames of centroid history kept for each track
+    :type history: int
+
+    - ``BlobTracker()`` is a tracker that associates the blobs of each frame,
+      passed to ``update``, with those of the previous frames.  Each track
+      has a unique integer id.
+
+    - ``BlobTracker(radius, area=0.2)`` as above but a blob can only continue
+      a track if it is within ``radius`` of the predicted position of the
+      track and its area is within 20% of the area of the track's last blob.
+
+    The position of a track is predicted from the velocity between its last
+    two blobs.  Blob centroids are indexed by a k-d tree and the candidates
+    for each track are those within ``radius`` that pass the gates.  A track
+    and blob that are each other's only candidate are associated directly,
+    the rest are associated to minimise the total distance.
+
+    The orientation of a near circular blob is not defined, it is dominated
+    by noise, so the orientation gate is not applied if either the track's
+    last blob or the new blob has an aspect ratio greater than 0.9.
+
+    Example::
+
+        >>> tracker = BlobTracker(radius=10, area=0.2)
+        >>> for image in video:
+        >>>     ids = tracker.update(image.blobs())
+        >>> tracker.history(ids[0])
+
+    .. note::
+
+        - The state of the tracks and their history are kept in arrays that
+          are preallocated and grow by doubling, the history is a ring
+          buffer of the last ``history`` frames.
+        - Only the blob properties used by the gates, and the aspect ratio
+          for the orientation gate, are computed, see :class:`Blob`.
+
+    :seealso: :meth:`update`, :meth:`history`
+    """
+
+    def __init__(self, radius=20, area=None, aspect=None, orientation=None,
+                 maxage=0, history=32):
+        if radius <= 0:
+            raise ValueError(radius, 'radius must be positive')
+        if maxage < 0:
+            raise ValueError(maxage, 'maxage must be >= 0')
+        if history < 1:
+            raise ValueError(history, 'history must be >= 1')
+        self._radius = radius
+        self._gates = {name: value for name, value in
+                       [('area', area), ('aspect', aspect),
+                        ('orientation', orientation)] if value is not None}
+        # the orientation gate needs the aspect ratio of the blobs
+        self._names = list(self._gates)
+        if 'orientation' in self._gates and 'aspect' not in self._gates:
+            self._names.append('aspect')
+        self._maxage = maxage
+        self._length = history
+        self.reset()
+
+    def __repr__(self):
+        return f"BlobTracker(radius={self._radius}, frame={self._frame}, " \
+               f"tracks={len(self)})"
+
+    def __len__(self):
+        return int(np.count_nonzero(self._alive))
+
+    def reset(self):
+        """
+        Remove all the tracks
+
+        Track ids start again from zero.
+        """
+        self._frame = 0
+        self._nextid = 0
+        self._allocate(64)
+
+    def _allocate(self, n):
+        # state of each track slot, grown by doubling
+        old = getattr(self, '_alive', np.zeros((0,), dtype=bool))
+        k = len(old)
+        if k >= n:
+            return
+
+        def grow(x, fill):
+            y = np.full((n,) + x.shape[1:], fill, dtype=x.dtype)
+            y[:k] = x
+            return y
+
+        if k == 0:
+            self._alive = np.zeros((n,), dtype=bool)
+            self._id = np.full((n,), -1, dtype=np.int64)
+            self._u = np.zeros((n, 2))  # last centroid
+            self._du = np.zeros((n, 2))  # velocity per frame
+            self._age = np.zeros((n,), dtype=np.int64)  # frames unmatched
+            self._features = {name: np.zeros((n,)) for name in self._names}
+            self._history = np.full((n, self._length, 2), np.nan)
+        else:
+            self._alive = grow(self._alive, False)
+            self._id = grow(self._id, -1)
+            self._u = grow(self._u, 0)
+            self._du = grow(self._du, 0)
+            self._age = grow(self._age, 0)
+            self._features = {name: grow(value, 0)
+                              for name, value in self._features.items()}
+            self._history = grow(self._history, np.nan)
+
+    @property
+    def frame(self):
+        """
+        Number of frames
+
+        :return: number of calls to ``update`` since the tracker was created
+            or reset
+        :rtype: int
+        """
+        return self._frame
+
+    @property
+    def ids(self):
+        """
+        Track ids
+
+        :return: ids of the current tracks, in ascending order
+        :rtype: ndarray(N)
+        """
+        return np.sort(self._id[self._alive])
+
+    def history(self, id):
+        """
+        Centroid history of a track
+
+        :param id: track id
+        :type id: int
+        :return: centroid of the track in each of the recent frames, oldest
+            first
+        :rtype: ndarray(H,2)
+
+        The centroid is NaN for frames where the track had no blob, or
+        that precede the track.
+
+        :seealso: :meth:`update`
+        """
+        slot = np.flatnonzero(self._alive & (self._id == id))
+        if len(slot) == 0:
+            raise ValueError(id, 'no such track')
+        k = self._frame % self._length
+        return np.roll(self._history[slot[0]], -k, axis=0)
+
+    def update(self, blobs):
+        """
+        Associate blobs with tracks
+
+        :param blobs: blobs in the next frame
+        :type blobs: Blob instance
+        :return: track id of each blob
+        :rtype: ndarray(N)
+
+        Each blob continues a track, or starts a new one.  Tracks without a
+        blob for more than ``maxage`` frames are ended.
+
+        :seealso: :meth:`history`
+        """
+        n = 0 if blobs._index is None else len(blobs)
+        if n > 0:
+            P = np.column_stack((np.atleast_1d(blobs.uc),
+                                 np.atleast_1d(blobs.vc)))
+            features = {name: np.atleast_1d(getattr(blobs, name))
+                        for name in self._names}
+        else:
+            P = np.zeros((0, 2))
+            features = {name: np.zeros((0,)) for name in self._names}
+
+        slots = np.flatnonzero(self._alive)
+        track, blob = self._candidates(slots, P, features)
+        track, blob = self._assign(track, blob, P, slots)
+
+        # update the matched tracks
+        ids = np.full((n,), -1, dtype=np.int64)
+        matched = slots[track]
+        ids[blob] = self._id[matched]
+        step = self._age[matched, np.newaxis] + 1
+        self._du[matched] = (P[blob] - self._u[matched]) / step
+        self._u[matched] = P[blob]
+        self._age[matched] = 0
+        for name, value in features.items():
+            self._features[name][matched] = value[blob]
+
+        # age the unmatched tracks, and end the old ones
+        unmatched = np.setdiff1d(slots, matched, assume_unique=True)
+        self._age[unmatched] += 1
+        self._alive[unmatched[self._age[unmatched] > self._maxage]] = False
+
+        # start new tracks for the unmatched blobs
+        new = np.flatnonzero(ids < 0)
+        free = np.flatnonzero(~self._alive)
+        if len(free) < len(new):
+            self._allocate(2 * (len(self._alive) + len(new)))
+            free = np.flatnonzero(~self._alive)
+        free = free[:len(new)]
+        ids[new] = np.arange(self._nextid, self._nextid + len(new))
+        self._nextid += len(new)
+        self._alive[free] = True
+        self._id[free] = ids[new]
+        self._u[free] = P[new]
+        self._du[free] = 0
+        self._age[free] = 0
+        for name, value in features.items():
+            self._features[name][free] = value[new]
+        self._history[free] = np.nan
+
+        # record this frame in the ring buffer
+        k = self._frame % self._length
+        self._history[:, k] = np.nan
+        self._history[matched, k] = P[blob]
+        self._history[free, k] = P[new]
+        self._frame += 1
+
+        return ids
+
+    def _candidates(self, slots, P, features):
+        # pairs of track and blob within the radius and the gates
+        if len(slots) == 0 or len(P) == 0:
+            return np.zeros((0,), dtype=int), np.zeros((0,), dtype=int)
+        predicted = self._u[slots] + \
+            self._du[slots] * (self._age[slots, np.newaxis] + 1)
+        D = cKDTree(predicted).sparse_distance_matrix(
+            cKDTree(P), self._radius, output_type='coo_matrix')
+        track, blob = D.row, D.col
+        keep = np.ones(track.shape, dtype=bool)
+        for name, gate in self._gates.items():
+            old = self._features[name][slots[track]]
+            new = features[name][blob]
+            if name == 'area':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    keep &= np.abs(new - old) <= gate * old
+            elif name == 'orientation':
+                # the ellipse axis has no direction, and round blobs have no
+                # orientation
+                d = np.abs(new - old) % np.pi
+                aspect = np.maximum(self._features['aspect'][slots[track]],
+                                    features['aspect'][blob])
+                keep &= (np.minimum(d, np.pi - d) <= gate) | \
+                    (aspect > _ROUND_ASPECT)
+            else:
+                keep &= np.abs(new - old) <= gate
+        return track[keep], blob[keep]
+
+    def _assign(self, track, blob, P, slots):
+        # one to one association of the candidate pairs, the pairs that are
+        # a connected component of the bipartite graph on their own are
+        # associated directly, the others by minimising total distance
+        if len(track) == 0:
+            return track, blob
+        nt = len(slots)
+        graph = sparse.coo_matrix((np.ones(track.shape), (track, nt + blob)),
+                                  shape=(nt + len(P),) * 2)
+        _, component = connected_components(graph, directed=False)
+        c = component[track]
+        single = np.bincount(c)[c] == 1
+        tracks, blobs = [track[single]], [blob[single]]
+        if not np.all(single):
+            predicted = self._u[slots] + \
+                self._du[slots] * (self._age[slots, np.newaxis] + 1)
+            d = np.linalg.norm(predicted[track] - P[blob], axis=1)
+            conflict = np.flatnonzero(~single)
+            conflict = conflict[np.argsort(c[conflict], kind='stable')]
+            split = np.flatnonzero(np.diff(c[conflict])) + 1
+            for edges in np.split(conflict, split):
+                t, ti = np.unique(track[edges], return_inverse=True)
+                b, bi = np.unique(blob[edges], return_inverse=True)
+                cost = np.full((len(t), len(b)), 1e6 * self._radius)
+                cost[ti, bi] = d[edges]
+                r, k = linear_sum_assignment(cost)
+                ok = cost[r, k] <= self._radius
+                tracks.append(t[r[ok]])
+                blobs.append(b[k[ok]])
+        return np.concatenate(tracks), np.concatenate(blobs)
+
+
+_shapematch = namedtuple('shapematch', 'index label distance')
+
+
+class ShapeIndex:
+    r"""
+    Index of reference shapes
+
+    :param blobs: reference shapes, defaults to None
+    :type blobs: Blob instance, optional
+    :param labels: label of each reference shape, defaults to its index
+    :type labels: array_like(N), optional
+    :param fourier: number of Fourier descriptors, defaults to 0
+    :type fourier: int, optional
+    :param weight: weight of the Fourier descriptors, defaults to 1
+    :type weight: float, optional
+
+    - ``ShapeIndex(blobs, labels)`` is an index of the shapes of ``blobs``
+      that finds the reference shapes nearest to other blobs.
+
+    - ``ShapeIndex(blobs, labels, fourier=8)`` as above but the shape is
+      also described by 8 Fourier descriptors of the contour.
+
+    A shape is described by the feature vector of its seven Hu moment
+    invariants, each log scaled as :math:`\mbox{sign}(h) \log_{10}(1 +
+    |h|/10^{-10})` to bring them to similar ranges, followed by the Fourier
+    descriptors scaled by ``weight``.  The feature vectors of the reference
+    shapes are kept as one float32 matrix with a k-d tree, and the distance
+    between shapes is the Euclidean distance between their feature vectors.
+
+    Example::
+
+        >>> index = ShapeIndex(reference.blobs(), ['square', 'circle'])
+        >>> match = index.query(image.blobs())
+        >>> match.label
+
+    :seealso: :meth:`Blob.humoments`, :meth:`Blob.fourierdescriptors`,
+        :meth:`Blob.matchshape`
+    """
+
+    def __init__(self, blobs=None, labels=None, fourier=0, weight=1.0):
+        self._fourier = fourier
+        self._weight = weight
+        self._features = np.zeros((0, 7 + fourier), dtype=np.float32)
+        self._labels = np.zeros((0,), dtype=int)
+        self._kdtree = None
+        if blobs is not None:
+            self.add(blobs, labels)
+
+    def __len__(self):
+        return len(self._features)
+
+    def __repr__(self):
+        return f"ShapeIndex({len(self)} shapes, fourier={self._fourier})"
+
+    @property
+    def labels(self):
+        """
+        Labels of the reference shapes
+
+        :return: label of each reference shape
+        :rtype: ndarray(M)
+        """
+        return self._labels
+
+    def features(self, blobs):
+        """
+        Shape feature vectors
+
+        :param blobs: blobs
+        :type blobs: Blob instance
+        :return: feature vector of each blob
+        :rtype: ndarray(N,D) float32
+        """
+        hu = np.atleast_2d(blobs.humoments)
+        F = np.sign(hu) * np.log10(1 + np.abs(hu) / 1e-10)
+        if self._fourier > 0:
+            fd = np.atleast_2d(blobs.fourierdescriptors(self._fourier))
+            F = np.hstack([F, self._weight * fd])
+        return np.nan_to_num(F).astype(np.float32)
+
+    def add(self, blobs, labels=None):
+        """
+        Add reference shapes
+
+        :param blobs: reference shapes
+        :type blobs: Blob instance
+        :param labels: label of each shape, defaults to its index in the
+            index
+        :type labels: array_like(N), optional
+        """
+        F = self.features(blobs)
+        if labels is None:
+            labels = np.arange(len(self), len(self) + len(F))
+        labels = np.array(labels, ndmin=1)
+        if len(labels) != len(F):
+            raise ValueError(labels, 'must be a label for every shape')
+        self._features = np.vstack([self._features, F])
+        self._labels = np.concatenate([self._labels, labels]) \
+            if len(self._labels) > 0 else labels
+        self._kdtree = None
+
+    def query(self, blobs, k=1):
+        """
+        Nearest reference shapes
+
+        :param blobs: blobs
+        :type blobs: Blob instance
+        :param k: number of nearest shapes, defaults to 1
+        :type k: int, optional
+        :return: the nearest shapes to each blob
+        :rtype: named tuple
+
+        The result has elements:
+
+            - ``index`` the index of the nearest reference shapes
+            - ``label`` the labels of the nearest reference shapes
+            - ``distance`` the distance to the nearest reference shapes
+
+        each an array ``(N,)``, or ``(N,k)`` if ``k > 1``, nearest first.
+
+        .. note:: All the blobs are queried at once, the k-d tree is built
+            by the first query after references are added.
+        """
+        if not 1 <= k <= len(self):
+            raise ValueError(k, 'k must be between 1 and the number of shapes')
+        if self._kdtree is None:
+            self._kdtree = cKDTree(self._features)
+        F = self.features(blobs)
+        if len(F) == 0:
+            shape = (0,) if k == 1 else (0, k)
+            return _shapematch(np.zeros(shape, dtype=int),
+                               self._labels[np.zeros(shape, dtype=int)],
+                               np.zeros(shape))
+        distance, index = self._kdtree.query(F, k=k)
+        return _shapematch(index, self._labels[index], distance)
 
 
 class BlobFeaturesMixin:
@@ -822,6 +1754,10 @@ class BlobFeaturesMixin:
         all the blobs in the image.  It behaves like a list object so it can
         be indexed and sliced.
 
+        ``image.blobs(name=predicate, ...)`` as above but only the blobs whose
+        properties satisfy the predicates, see :meth:`Blob.filter`, for
+        example ``image.blobs(area=(100, 5000), touch=False)``.
+
         Example:
 
         .. runblock:: pycon
@@ -241,6 +241,45 @@ class SuperFeature2D:
         """
         return np.vstack([kp.pt for kp in self._kp]).T
 
+    def to_records(self, fields=None):
+        """
+        Features as a structured array
+
+        :param fields: names of the fields, defaults to all
+        :type fields: list of str, optional
+        :return: properties of each feature
+        :rtype: structured ndarray(N)
+
+        The fields are ``u``, ``v``, ``strength``, ``scale``,
+        ``orientation`` (in radians) and ``octave``.
+
+        :seealso: :class:`RecordWriter`
+        """
+        attrs = {'strength': 'response', 'scale': 'size',
+                 'orientation': 'angle', 'octave': 'octave'}
+        if fields is None:
+            fields = ['u', 'v', 'strength', 'scale', 'orientation', 'octave']
+        kp = self._kp
+        records = np.empty((len(kp),), dtype=[
+            (name, np.int32 if name == 'octave' else np.float64)
+            for name in fields])
+        if len(kp) > 0:
+            pt = cv.KeyPoint_convert(kp).reshape((-1, 2))
+        else:
+            pt = np.zeros((0, 2))
+        for name in fields:
+            if name in ('u', 'v'):
+                records[name] = pt[:, 'uv'.index(name)]
+            elif name in attrs:
+                records[name] = np.fromiter(
+                    (getattr(k, attrs[name]) for k in kp), dtype=np.float64,
+                    count=len(kp))
+            else:
+                raise ValueError(name, 'unknown feature property')
+        if 'orientation' in fields:
+            records['orientation'] = np.radians(records['orientation'])
+        return records
+
     def drawKeypoints(self,
                       image,
                       kp=None,
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Writers for tables of features
+"""
+
+import itertools
+import os
+import struct
+import zipfile
+import numpy as np
+
+
+def _npy_header(dtype, n, size=None):
+    # a version 1.0 .npy header for a 1D array, padded to size bytes so that
+    # it can be rewritten in place once the number of rows is known
+    d = {'descr': np.lib.format.dtype_to_descr(dtype),
+         'fortran_order': False, 'shape': (n,)}
+    header = repr(d).encode('latin1')
+    if size is None:
+        # room for the longest row count, aligned to 64 bytes
+        size = (10 + len(header) + 24 + 63) // 64 * 64
+    pad = size - 10 - len(header) - 1
+    if pad < 0:
+        raise ValueError(n, 'too many rows for the .npy header')
+    return np.lib.format.MAGIC_PREFIX + b'\x01\x00' + \
+        struct.pack('<H', size - 10) + header + b' ' * pad + b'\n'
+
+
+class RecordWriter:
+    """
+    Write tables of features to a file, a frame at a time
+
+    :param filename: name of file, with extension ``.npy``, ``.npz`` or
+        ``.csv``
+    :type filename: str
+    :param fields: names of the fields to write, defaults to all
+    :type fields: list of str, optional
+    :param dtype: type of the table, defaults to that of the first frame
+    :type dtype: numpy structured dtype, optional
+
+    - ``RecordWriter(filename)`` is a writer that appends the table of
+      features of each frame passed to ``write`` to the one file.
+
+    The format depends on the extension of the file:
+
+        - ``.npy`` a structured array with a ``frame`` field followed by the
+          fields of the table, read it with ``np.load``
+        - ``.npz`` a structured array for each frame, named ``frame_000000``
+          and so on, read it with ``np.load``
+        - ``.csv`` a header line of field names then a row per feature, with
+          a ``frame`` column first, read it with
+          ``np.genfromtxt(filename, delimiter=',', names=True)``
+
+    Example::
+
+        >>> with RecordWriter('blobs.npy') as writer:
+        >>>     for image in video:
+        >>>         writer.write(image.blobs())
+        >>> table = np.load('blobs.npy')
+
+    .. note::
+
+        - A table is anything with a ``to_records`` method, for example
+          :class:`Blob`, or a NumPy structured array.  Every frame must have
+          the same fields.
+        - The rows of each frame are written when it is passed to ``write``,
+          only the ``.npy`` header is rewritten by ``close`` to record the
+          total number of rows.
+        - Each frame number can be written only once, frames need not be
+          written in order.
+        - The fields are those of the first frame unless ``dtype`` is given.
+          If no frame is written the file holds an empty table, with the
+          fields of ``dtype`` or with only the ``frame`` field.
+
+    :seealso: :meth:`Blob.to_records`
+    """
+
+    def __init__(self, filename, fields=None, dtype=None):
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in ('.npy', '.npz', '.csv'):
+            raise ValueError(filename, 'file must be .npy, .npz or .csv')
+        self._filename = filename
+        self._format = ext[1:]
+        self._fields = fields
+        self._dtype = None
+        self._frame = 0
+        self._frames = set()
+        self._rows = 0
+        if self._format == 'npz':
+            self._file = zipfile.ZipFile(filename, 'w', allowZip64=True)
+        elif self._format == 'csv':
+            self._file = open(filename, 'w')
+        else:
+            self._file = open(filename, 'wb')
+        if dtype is not None:
+            self._dtype = np.dtype(dtype)
+            if self._dtype.names is None:
+                raise ValueError(dtype, 'dtype must be structured')
+            self._start()
+
+    def __repr__(self):
+        return f"RecordWriter({self._filename!r}, frames={self._frame}, " \
+               f"rows={self._rows})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def frame(self):
+        """
+        Number of frames
+
+        :return: number of frames written
+        :rtype: int
+        """
+        return self._frame
+
+    def write(self, table, frame=None):
+        """
+        Write the features of a frame
+
+        :param table: features of the frame
+        :type table: object with ``to_records`` method, or structured ndarray
+        :param frame: frame number, defaults to one more than the last
+        :type frame: int, optional
+        :raises ValueError: if the frame number has already been written
+        """
+        if self._file is None:
+            raise ValueError(self._filename, 'writer is closed')
+        if hasattr(table, 'to_records'):
+            records = table.to_records(self._fields)
+        else:
+            records = np.asarray(table)
+            if records.dtype.names is None:
+                raise ValueError(table, 'table must be a structured array')
+            if self._fields is not None:
+                records = records[list(self._fields)]
+        if frame is None:
+            frame = self._frame
+        if frame in self._frames:
+            raise ValueError(frame, 'frame has already been written')
+
+        if self._dtype is None:
+            self._dtype = records.dtype
+            self._start()
+        elif records.dtype.names != self._dtype.names:
+            raise ValueError(records.dtype.names,
+                             'fields differ from earlier frames')
+
+        if self._format == 'npz':
+            with self._file.open(f"frame_{frame:06d}.npy", 'w',
+                                 force_zip64=True) as f:
+                np.lib.format.write_array(f, records.astype(self._dtype))
+        else:
+            rows = np.empty(records.shape, dtype=self._rowdtype)
+            rows['frame'] = frame
+            for name in self._dtype.names:
+                rows[name] = records[name]
+            if self._format == 'npy':
+                self._file.write(rows.tobytes())
+            else:
+                # format the whole frame at once, 3x faster than np.savetxt
+                values = itertools.chain.from_iterable(rows.tolist())
+                self._file.write((self._fmt * len(rows)) % tuple(values))
+        self._frames.add(frame)
+        self._frame = frame + 1
+        self._rows += len(records)
+
+    def _start(self):
+        # the file header, now the fields are known
+        self._rowdtype = np.dtype([('frame', np.int64)] +
+                                  [(name, self._dtype[name])
+                                   for name in self._dtype.names])
+        if self._format == 'npy':
+            self._header = _npy_header(self._rowdtype, 0)
+            self._file.write(self._header)
+        elif self._format == 'csv':
+            self._fmt = ','.join(['%d' if self._rowdtype[name].kind in 'iub'
+                                  else '%.10g'
+                                  for name in self._rowdtype.names]) + '\n'
+            self._file.write(','.join(self._rowdtype.names) + '\n')
+
+    def close(self):
+        """
+        Close the file
+
+        For a ``.npy`` file the header is rewritten with the number of rows.
+        If no frame was written the file holds an empty table.
+        """
+        if self._file is None:
+            return
+        if self._dtype is None:
+            # no frames, an empty table with only the frame field
+            self._dtype = np.dtype([])
+            self._start()
+        if self._format == 'npy':
+            self._file.seek(0)
+            self._file.write(_npy_header(self._rowdtype, self._rows,
+                                         len(self._header)))
+        self._file.close()
+        self._file = None
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import numpy as np
+import numpy.testing as nt
+import unittest
+import cv2 as cv
+
+from machinevisiontoolbox.Image import Image
+from machinevisiontoolbox.BinaryImage import BinaryImage
+
+
+class TestBinaryImage(unittest.TestCase):
+
+    def test_convert(self):
+
+        rng = np.random.default_rng(0)
+        x = (rng.random((3, 20, 37)) > 0.5).astype(np.uint8)
+        b = BinaryImage(x)
+        self.assertEqual(len(b), 3)
+        self.assertEqual(b.shape, (20, 37))
+        self.assertEqual(b.nbytes, 3 * 20 * 5)
+        nt.assert_array_equal(b.uint8(), x)
+        nt.assert_array_equal(b.uint8(255), x * 255)
+        nt.assert_array_equal(b.bool(), x > 0)
+        nt.assert_array_equal(b[1].uint8(), x[1])
+        nt.assert_array_equal(b[-1].uint8(), x[2])
+        self.assertEqual(len(list(b)), 3)
+
+        b2 = BinaryImage.frompacked(b.packed, 37)
+        self.assertTrue(b2 == b)
+
+        # from Image and lists
+        im = Image(x[0] * 255)
+        nt.assert_array_equal(BinaryImage(im).uint8(), x[0])
+        nt.assert_array_equal(BinaryImage(list(x)).uint8(), x)
+        nt.assert_array_equal(BinaryImage(x[0]).image().image, x[0])
+
+    def test_bitwise(self):
+
+        rng = np.random.default_rng(1)
+        x = rng.random((2, 9, 13)) > 0.5
+        y = rng.random((2, 9, 13)) > 0.3
+        a, b = BinaryImage(x), BinaryImage(y)
+        nt.assert_array_equal((a & b).bool(), x & y)
+        nt.assert_array_equal((a | b).bool(), x | y)
+        nt.assert_array_equal((a ^ b).bool(), x ^ y)
+        nt.assert_array_equal((~a).bool(), ~x)
+        nt.assert_array_equal((~a).area, np.sum(~x, axis=(1, 2)))
+        nt.assert_array_equal(a.area, np.sum(x, axis=(1, 2)))
+        self.assertEqual(a[0].area, np.sum(x[0]))
+
+        with self.assertRaises(ValueError):
+            a & BinaryImage(x[:, :, :5])
+
+    def test_morph(self):
+
+        rng = np.random.default_rng(2)
+        for width in [1, 8, 13, 64, 70]:
+            x = (rng.random((2, 15, width)) > 0.6).astype(np.uint8)
+            b = BinaryImage(x)
+            for se in [1, 3, (1, 5), (4, 2), (5, 11), (2, 20)]:
+                h, w = (se, se) if isinstance(se, int) else se
+                k = np.ones((h, w), dtype=np.uint8)
+                for op, cvop in [('dilate', cv.dilate), ('erode', cv.erode)]:
+                    out = getattr(b, op)(se).uint8()
+                    for i in range(2):
+                        nt.assert_array_equal(
+                            out[i], cvop(x[i], k,
+                                         borderType=cv.BORDER_REPLICATE))
+
+        x = (rng.random((30, 40)) > 0.5).astype(np.uint8)
+        b = BinaryImage(x)
+        k = np.ones((3, 3), dtype=np.uint8)
+        nt.assert_array_equal(b.dilate(k, n=2).uint8(),
+                              cv.dilate(x, k, iterations=2,
+                                        borderType=cv.BORDER_REPLICATE))
+        nt.assert_array_equal(b.open(3).uint8(),
+                              Image(x).open(k).image)
+        nt.assert_array_equal(b.close(3).uint8(),
+                              Image(x).close(k).image)
+        with self.assertRaises(ValueError):
+            b.erode(np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]]))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
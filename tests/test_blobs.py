@@ -0,0 +1,484 @@
+#!/usr/bin/env python
+
+import numpy as np
+import numpy.testing as nt
+import unittest
+import os
+import tempfile
+import cv2 as cv
+
+from machinevisiontoolbox.Image import Image
+from machinevisiontoolbox.records import RecordWriter
+from machinevisiontoolbox.blobs import BlobTracker, ShapeIndex, _MOMENTS, _contour_points, \
+    _contour_moments
+
+
+def _image():
+    x = np.zeros((60, 80), dtype=np.uint8)
+    x[5:15, 10:40] = 255  # rectangle
+    cv.circle(x, (55, 35), 15, 255, -1)  # ring
+    cv.circle(x, (55, 35), 6, 0, -1)
+    x[50:60, 0:5] = 255  # touches the border
+    return x
+
+
+class TestBlob(unittest.TestCase):
+
+    def test_contour_moments(self):
+
+        x = _image()
+        contours, _ = cv.findContours(x, cv.RETR_TREE, cv.CHAIN_APPROX_NONE)
+        contours = list(contours) + [np.array([[[3, 4]]], dtype=np.int32)]
+        M = _contour_moments(*_contour_points(contours))
+        self.assertEqual(M.shape, (len(contours), 10))
+        for c, m in zip(contours, M):
+            mc = cv.moments(c)
+            for k, name in enumerate(_MOMENTS):
+                self.assertAlmostEqual(m[k], mc[name], delta=1e-9 * abs(
+                    mc[name]) + 1e-9)
+
+    def test_features(self):
+
+        x = _image()
+        blobs = Image(x).blobs()
+        contours, _ = cv.findContours(x, cv.RETR_TREE, cv.CHAIN_APPROX_NONE)
+        self.assertEqual(len(blobs), 4)
+
+        for i, c in enumerate(contours):
+            u, v, w, h = cv.boundingRect(c)
+            self.assertEqual(blobs.umin[i], u)
+            self.assertEqual(blobs.umax[i], u + w)
+            self.assertEqual(blobs.vmin[i], v)
+            self.assertEqual(blobs.vmax[i], v + h)
+            self.assertAlmostEqual(blobs.perimeter[i], cv.arcLength(c, True),
+                                   places=4)
+            self.assertEqual(blobs.touch[i],
+                             u == 0 or v == 0 or u + w == 80 or v + h == 60)
+
+        # the rectangle, 30x10 pixels, the contour is through the centres of
+        # the edge pixels
+        i = np.flatnonzero(blobs.umin == 10)[0]
+        self.assertEqual(blobs.area[i], 29 * 9)
+        self.assertAlmostEqual(blobs.uc[i], 24.5)
+        self.assertAlmostEqual(blobs.vc[i], 9.5)
+        self.assertAlmostEqual(blobs.orientation[i], 0)
+        self.assertAlmostEqual(blobs.a[i], 2 * np.sqrt(29 ** 2 / 12))
+        self.assertAlmostEqual(blobs.b[i], 2 * np.sqrt(9 ** 2 / 12))
+        self.assertAlmostEqual(blobs.aspect[i], 9 / 29)
+        self.assertFalse(blobs.touch[i])
+
+        # the ring is the outer contour less the hole
+        i = np.flatnonzero(blobs.umin == 40)[0]
+        j = np.flatnonzero(blobs.umin == 48)[0]
+        self.assertAlmostEqual(blobs.area[i],
+                               cv.contourArea(contours[i])
+                               - cv.contourArea(contours[j]))
+        self.assertAlmostEqual(blobs.uc[i], 55, places=1)
+        self.assertAlmostEqual(blobs.aspect[i], 1, places=2)
+        kulpa = np.pi / 8.0 * (1.0 + np.sqrt(2.0))
+        nt.assert_array_almost_equal(
+            blobs.circularity,
+            4 * np.pi * blobs.area / (blobs.perimeter * kulpa) ** 2)
+
+        i = np.flatnonzero(blobs.umin == 0)[0]
+        self.assertTrue(blobs.touch[i])
+
+    def test_index(self):
+
+        blobs = Image(_image()).blobs()
+        b = blobs[1]
+        self.assertEqual(b.area, blobs.area[1])
+        self.assertEqual(len(b), 1)
+        for b in [blobs[1:3], blobs[[1, 2]], blobs[np.r_[False, True, True, False]]]:
+            nt.assert_array_equal(b.area, blobs.area[1:3])
+            nt.assert_array_equal(b.moments, blobs.moments[1:3])
+            self.assertEqual(len(b.children), 2)
+        nt.assert_array_equal(blobs.bboxarea,
+                              [b.bboxarea for b in blobs])
+        self.assertEqual(len(list(blobs)), 4)
+
+        blobs = Image(np.zeros((10, 10), dtype=np.uint8)).blobs()
+        self.assertEqual(len(blobs), 0)
+
+    def test_lazy(self):
+
+        im = Image(_image())
+        blobs = im.blobs()
+        self.assertEqual(blobs._cache, {})
+        blobs.umin
+        self.assertEqual(set(blobs._cache),
+                         {'umin', 'umax', 'vmin', 'vmax', 'touch', 'bboxarea'})
+
+        # properties of a subset are the same whether computed before or
+        # after indexing
+        all = im.blobs()
+        nt.assert_array_equal(all.circularity[1:3], blobs[1:3].circularity)
+        nt.assert_array_equal(all.orientation[2], blobs[2].orientation)
+        nt.assert_array_equal(all.moments[1:3], blobs[1:3].moments)
+
+    def test_filter(self):
+
+        im = Image(_image())
+        all = im.blobs()
+
+        blobs = im.blobs(area=(200, None), touch=False)
+        keep = (all.area >= 200) & ~all.touch
+        self.assertEqual(len(blobs), np.sum(keep))
+        nt.assert_array_equal(blobs.area, all.area[keep])
+        nt.assert_array_equal(blobs.perimeter, all.perimeter[keep])
+        nt.assert_array_equal(blobs.children,
+                              [c for c, k in zip(all.children, keep) if k])
+        self.assertNotIn('perimeter', im.blobs(area=(1e6, None))._cache)
+
+        # properties computed while filtering in the constructor are kept
+        blobs = im.blobs(circularity=(0.5, None))
+        keep = all.circularity >= 0.5
+        self.assertIn('circularity', blobs._cache)
+        nt.assert_array_equal(blobs.circularity, all.circularity[keep])
+        nt.assert_array_equal(blobs.uc, all.uc[keep])
+        nt.assert_array_equal(blobs.parent, all.parent[keep])
+
+        blobs = all.filter(circularity=lambda c: c > 0.5, vmax=(None, 20))
+        keep = (all.circularity > 0.5) & (all.vmax <= 20)
+        nt.assert_array_equal(blobs.uc, all.uc[keep])
+
+        blobs = all.filter(parent=-1)
+        nt.assert_array_equal(blobs.parent, [-1, -1, -1])
+
+        # a single blob that fails a predicate is removed
+        self.assertEqual(len(all[0].filter(area=(1e9, None))), 0)
+        one = all[0].filter(area=(None, 1e9))
+        self.assertEqual(len(one), 1)
+        self.assertEqual(one.area, all.area[0])
+        self.assertEqual([len(b.filter(touch=True)) for b in all],
+                         list(all.touch.astype(int)))
+        with self.assertRaises(IndexError):
+            all[0][1]
+
+        with self.assertRaises(ValueError):
+            im.blobs(colour=1)
+
+    def test_records(self):
+
+        blobs = Image(_image()).blobs()
+        r = blobs.to_records()
+        self.assertEqual(len(r), len(blobs))
+        nt.assert_array_equal(r['id'], np.arange(len(blobs)))
+        for name in ['parent', 'area', 'uc', 'umax', 'touch', 'perimeter',
+                     'orientation']:
+            nt.assert_array_equal(r[name], getattr(blobs, name))
+
+        r = blobs[1:3].to_records(['area', 'uc'])
+        self.assertEqual(r.dtype.names, ('area', 'uc'))
+        nt.assert_array_equal(r['uc'], blobs.uc[1:3])
+        d = blobs[2].to_dict_of_arrays(['id', 'vc'])
+        nt.assert_array_equal(d['id'], [2])
+        nt.assert_array_equal(d['vc'], [blobs.vc[2]])
+
+        blobs = Image(np.zeros((10, 10), dtype=np.uint8)).blobs()
+        self.assertEqual(len(blobs.to_records()), 0)
+        with self.assertRaises(ValueError):
+            blobs.to_records(['colour'])
+
+    def test_writer(self):
+
+        frames = [Image(_image()).blobs(), Image(_image()[::-1]).blobs()]
+        fields = ['id', 'area', 'uc', 'touch']
+        with tempfile.TemporaryDirectory() as tmp:
+            for ext in ['npy', 'npz', 'csv']:
+                filename = os.path.join(tmp, 'blobs.' + ext)
+                with RecordWriter(filename, fields=fields) as writer:
+                    for blobs in frames:
+                        writer.write(blobs)
+                    self.assertEqual(writer.frame, 2)
+                    # a frame number can only be written once
+                    with self.assertRaises(ValueError):
+                        writer.write(frames[0], frame=1)
+                    writer.write(frames[0], frame=5)
+                    with self.assertRaises(ValueError):
+                        writer.write(frames[0], frame=5)
+
+                if ext == 'npz':
+                    with np.load(filename) as z:
+                        self.assertEqual(len(z.files), 3)
+                        tables = [z['frame_000000'], z['frame_000001']]
+                else:
+                    if ext == 'npy':
+                        r = np.load(filename)
+                    else:
+                        r = np.genfromtxt(filename, delimiter=',',
+                                          names=True)
+                    self.assertEqual(r.dtype.names[0], 'frame')
+                    tables = [r[r['frame'] == i] for i in range(2)]
+                for blobs, table in zip(frames, tables):
+                    nt.assert_array_equal(table['id'], np.arange(len(blobs)))
+                    nt.assert_array_almost_equal(table['uc'], blobs.uc)
+                    nt.assert_array_equal(table['touch'], blobs.touch)
+
+            with self.assertRaises(ValueError):
+                RecordWriter(os.path.join(tmp, 'blobs.txt'))
+
+            # no frames written, an empty table
+            filename = os.path.join(tmp, 'empty.npy')
+            RecordWriter(filename).close()
+            r = np.load(filename)
+            self.assertEqual(r.shape, (0,))
+            self.assertEqual(r.dtype.names, ('frame',))
+            dtype = frames[0].to_records(fields).dtype
+            with RecordWriter(filename, dtype=dtype):
+                pass
+            r = np.load(filename)
+            self.assertEqual(r.shape, (0,))
+            self.assertEqual(r.dtype.names, ('frame',) + tuple(fields))
+            with RecordWriter(filename, fields=fields, dtype=dtype) as w:
+                w.write(frames[0])
+            self.assertEqual(len(np.load(filename)), len(frames[0]))
+
+    def test_labelimage(self):
+
+        x = _image()
+        im = Image(x)
+        blobs = im.blobs()
+        L = blobs.labelImage(im).image
+        self.assertEqual(L.shape, x.shape)
+
+        # blobs partition the foreground, holes the enclosed background
+        _, fg = cv.connectedComponents(x, connectivity=8)
+        for i in range(len(blobs)):
+            if blobs.depth[i] == 0:
+                region = fg == fg[L == i][0]
+            else:
+                region = (x == 0) & (L == i)
+                self.assertEqual(np.sum(region), np.sum(L == i))
+            nt.assert_array_equal(L == i, region)
+        nt.assert_array_equal(L == -1, (x == 0) & (blobs.depth[L] != 1))
+
+        # only the selected blobs, keeping their contour indices
+        L = blobs[[0, 2]].labelImage().image
+        nt.assert_array_equal(np.unique(L), [-1, 0, 2])
+
+    def test_drawblobs(self):
+
+        x = _image()
+        im = Image(x)
+        blobs = im.blobs()
+        L = blobs.labelImage().image
+        color = [[200, 100, 50], [20, 40, 60], [2, 4, 6], [100, 100, 100]]
+
+        out = blobs.drawBlobs(im, color=color, textthickness=0).image
+        for i in range(len(blobs)):
+            self.assertTrue(np.all(out[L == i] == np.array(color[i]) // 2))
+        self.assertTrue(np.all(out[L == -1] == 0))
+
+        # outlines are the contour points
+        out = blobs[1].drawBlobs(im, color=[color[1]], textthickness=0,
+                                 contourthickness=1).image
+        c = blobs._allcontours[1].reshape((-1, 2))
+        drawn = np.zeros(x.shape, dtype=bool)
+        drawn[c[:, 1], c[:, 0]] = True
+        nt.assert_array_equal(out.any(axis=2), drawn)
+
+        # bounding boxes
+        out = blobs.drawBlobs(im, contourthickness=1, textthickness=0,
+                              box=(255, 255, 255)).image
+        for i in range(len(blobs)):
+            b = blobs[i]
+            self.assertTrue(np.all(out[b.vmin, b.umin:b.umax] == 255))
+            self.assertTrue(np.all(out[b.vmin:b.vmax, b.umax - 1] == 255))
+
+    def test_hierarchy(self):
+
+        # a ring with a dot in the hole, and a square beside it
+        x = np.zeros((60, 80), dtype=np.uint8)
+        cv.circle(x, (30, 30), 20, 255, -1)
+        cv.circle(x, (30, 30), 10, 0, -1)
+        cv.circle(x, (30, 30), 3, 255, -1)
+        x[10:20, 60:70] = 255
+        blobs = Image(x).blobs()
+        contours, hierarchy = cv.findContours(x, cv.RETR_TREE,
+                                              cv.CHAIN_APPROX_NONE)
+        hierarchy = hierarchy[0]
+        self.assertEqual(len(blobs), 4)
+
+        nt.assert_array_equal(blobs.parent, hierarchy[:, 3])
+        ring = np.flatnonzero(blobs.umin == 10)[0]
+        hole = np.flatnonzero(blobs.parent == ring)[0]
+        dot = np.flatnonzero(blobs.parent == hole)[0]
+        square = np.flatnonzero(blobs.umin == 60)[0]
+        self.assertEqual(blobs.children[ring], [hole])
+        self.assertEqual(blobs.children[hole], [dot])
+        self.assertEqual(blobs.children[dot], [])
+        self.assertEqual(blobs[ring].children, [hole])
+
+        # only the direct children are subtracted
+        area = [cv.contourArea(c) for c in contours]
+        self.assertAlmostEqual(blobs.area[ring], area[ring] - area[hole])
+        self.assertAlmostEqual(blobs.area[hole], area[hole] - area[dot])
+        self.assertAlmostEqual(blobs.area[dot], area[dot])
+
+        depth = np.zeros(4, dtype=int)
+        depth[[hole, dot]] = [1, 2]
+        nt.assert_array_equal(blobs.depth, depth)
+        nt.assert_array_equal(blobs[[hole, dot]].depth, [1, 2])
+        nt.assert_array_equal(blobs.descendants(ring), sorted([hole, dot]))
+        nt.assert_array_equal(blobs.descendants([hole, square]), [dot])
+        self.assertEqual(len(blobs.descendants(dot)), 0)
+        nt.assert_array_equal(blobs.leaves(), sorted([dot, square]))
+        nt.assert_array_equal(blobs.leaves(ring), [dot])
+        nt.assert_array_equal(blobs.leaves(square), [square])
+
+
+# ----------------------------------------------------------------------- #
+class TestBlobTracker(unittest.TestCase):
+
+    @staticmethod
+    def _frame(centres, r=5):
+        x = np.zeros((100, 200), dtype=np.uint8)
+        for c in centres:
+            cv.circle(x, c, r, 255, -1)
+        return Image(x).blobs()
+
+    def test_update(self):
+
+        tracker = BlobTracker(radius=10, area=0.3, maxage=1)
+        ids = tracker.update(self._frame([(20, 20), (60, 50), (150, 80)]))
+        nt.assert_array_equal(np.sort(ids), [0, 1, 2])
+
+        # the blobs move, one disappears for a frame
+        blobs = self._frame([(24, 20), (60, 54), (150, 80)])
+        nt.assert_array_equal(tracker.update(blobs), ids)
+        blobs = self._frame([(28, 20), (60, 58)])
+        nt.assert_array_equal(tracker.update(blobs), ids[1:])
+        self.assertEqual(len(tracker), 3)
+        blobs = self._frame([(32, 20), (60, 62), (150, 80)])
+        nt.assert_array_equal(tracker.update(blobs), ids)
+
+        h = tracker.history(ids[2])
+        nt.assert_array_almost_equal(h[-4:], [[20, 20], [24, 20], [28, 20],
+                                              [32, 20]])
+        self.assertTrue(np.all(np.isnan(h[:-4])))
+        self.assertTrue(np.all(np.isnan(tracker.history(ids[0])[-2])))
+
+        # a blob that grows too much starts a new track
+        blobs = self._frame([(40, 20)], r=8)
+        nt.assert_array_equal(tracker.update(blobs), [3])
+
+        # tracks end after maxage frames without a blob
+        empty = Image(np.zeros((10, 10), dtype=np.uint8)).blobs()
+        self.assertEqual(len(tracker.update(empty)), 0)
+        self.assertEqual(len(tracker), 1)
+        tracker.update(empty)
+        self.assertEqual(len(tracker), 0)
+        with self.assertRaises(ValueError):
+            tracker.history(0)
+
+    def test_assignment(self):
+
+        # each track is a candidate for both blobs, nearest is not optimal
+        tracker = BlobTracker(radius=15)
+        ids = tracker.update(self._frame([(20, 20), (34, 20)]))
+        u = tracker.update(self._frame([(26, 20), (40, 20)]))
+        nt.assert_array_equal(u, ids)
+
+        # many tracks, the ring buffer and state arrays grow
+        tracker = BlobTracker(radius=3, history=2)
+        centres = [(u, v) for u in range(10, 190, 12)
+                   for v in range(10, 100, 12)]
+        ids = tracker.update(self._frame(centres, r=2))
+        self.assertEqual(len(ids), len(centres))
+        for i in range(3):
+            centres = [(u + 1, v) for u, v in centres]
+            nt.assert_array_equal(tracker.update(self._frame(centres, r=2)),
+                                  ids)
+        self.assertEqual(tracker.history(ids[0]).shape, (2, 2))
+        self.assertEqual(tracker.frame, 4)
+
+    def test_orientation(self):
+
+        # round blobs have no orientation, the gate does not split tracks
+        tracker = BlobTracker(radius=3, orientation=0.5)
+        centres = [(u, v) for u in range(10, 190, 10)
+                   for v in range(10, 100, 10)]
+        ids = tracker.update(self._frame(centres, r=3))
+        for i in range(4):
+            centres = [(u + 1, v) for u, v in centres]
+            nt.assert_array_equal(tracker.update(self._frame(centres, r=3)),
+                                  ids)
+
+        # an elongated blob that turns too far starts a new track
+        def ellipse(angle):
+            x = np.zeros((100, 100), dtype=np.uint8)
+            cv.ellipse(x, (50, 50), (20, 6), angle, 0, 360, 255, -1)
+            return Image(x).blobs()
+
+        tracker = BlobTracker(radius=5, orientation=0.5)
+        ids = tracker.update(ellipse(0))
+        nt.assert_array_equal(tracker.update(ellipse(10)), ids)
+        nt.assert_array_equal(tracker.update(ellipse(60)), ids + 1)
+
+
+class TestShapeIndex(unittest.TestCase):
+
+    names = ['square', 'triangle', 'L', 'bar', 'circle']
+
+    @staticmethod
+    def _shapes(scale=1, angle=0):
+        # the shapes in a row, sorted left to right
+        polygons = [[[0, 0], [40, 0], [40, 40], [0, 40]],
+                    [[0, 0], [60, 10], [20, 50]],
+                    [[0, 0], [20, 0], [20, 40], [50, 40], [50, 60], [0, 60]],
+                    [[0, 0], [80, 0], [80, 15], [0, 15]]]
+        R = np.array([[np.cos(angle), -np.sin(angle)],
+                      [np.sin(angle), np.cos(angle)]])
+        x = np.zeros((300, 800), dtype=np.uint8)
+        for i, p in enumerate(polygons):
+            p = np.array(p, dtype=float)
+            p = (p - p.mean(axis=0)) @ R.T * scale + [80 + 150 * i, 150]
+            cv.fillPoly(x, [p.round().astype(np.int32)], 255)
+        cv.circle(x, (680, 150), int(25 * scale), 255, -1)
+        blobs = Image(x).blobs()
+        return blobs[np.argsort(blobs.uc)]
+
+    def test_humoments(self):
+
+        blobs = self._shapes()
+        for i in range(len(blobs)):
+            nt.assert_array_almost_equal(
+                blobs.humoments[i],
+                cv.HuMoments(cv.moments(blobs[i]._contours[0])).ravel())
+        self.assertEqual(blobs[1].humoments.shape, (7,))
+
+    def test_fourierdescriptors(self):
+
+        fd = self._shapes().fourierdescriptors(6)
+        self.assertEqual(fd.shape, (5, 6))
+        fd2 = self._shapes(scale=1.5, angle=np.pi / 2).fourierdescriptors(6)
+        nt.assert_allclose(fd, fd2, atol=0.03)
+        self.assertTrue(np.all(fd[4] < 0.01))  # circle
+
+    def test_query(self):
+
+        for fourier in [0, 8]:
+            index = ShapeIndex(self._shapes(), self.names, fourier=fourier)
+            self.assertEqual(len(index), 5)
+
+            blobs = self._shapes(scale=1.4, angle=np.pi / 2)
+            match = index.query(blobs)
+            nt.assert_array_equal(match.label, self.names)
+            nt.assert_array_equal(match.index, np.arange(5))
+            match = blobs.matchshape(index, k=2)
+            self.assertEqual(match.distance.shape, (5, 2))
+            self.assertTrue(np.all(match.distance[:, 0] <=
+                                   match.distance[:, 1]))
+
+        index.add(self._shapes()[:2])
+        nt.assert_array_equal(index.labels[5:], ['5', '6'])
+        with self.assertRaises(ValueError):
+            index.query(blobs, k=10)
+        with self.assertRaises(ValueError):
+            index.add(blobs, ['square'])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -67,19 +67,322 @@ class TestImageProcessingKernel(unittest.TestCase):
                         [22,    40,    36,    53,    44]])
         nt.assert_array_almost_equal(im.window(se, np.sum).image, out)
 
+    def test_window_reductions(self):
+        import scipy.ndimage as nd
+        import machinevisiontoolbox.ImageProcessingKernel as ipk
+
+        def entropy(v):
+            _, c = np.unique(v, return_counts=True)
+            p = c / len(v)
+            return -np.sum(p * np.log2(p))
+
+        reductions = [('min', np.min), ('max', np.max), ('range', np.ptp),
+                      ('mean', np.mean), ('std', np.std),
+                      ('median', np.median), ('entropy', entropy),
+                      (np.var, np.var), (lambda v: v[0] - v[-1],
+                                         lambda v: v[0] - v[-1])]
+
+        rng = np.random.default_rng(0)
+        edgeopt = {'border': 'nearest', 'none': 'constant', 'wrap': 'wrap'}
+
+        # a small chunk size exercises the block processing
+        chunk = ipk._WINDOW_CHUNK
+        ipk._WINDOW_CHUNK = 500
+        try:
+            for se in [np.array([[0, 1, 1], [1, 1, 1], [1, 1, 0]]),
+                       np.ones((2, 4))]:
+                for dtype in [np.uint8, np.float64]:
+                    x = (rng.random((13, 17)) * 10).astype(dtype)
+                    for opt, mode in edgeopt.items():
+                        for func, ref in reductions:
+                            out = Image(x).window(se, func, opt)
+                            self.assertEqual(out.dtype, dtype)
+                            nt.assert_array_almost_equal(
+                                out.image,
+                                nd.generic_filter(x, ref, footprint=se,
+                                                  mode=mode))
+                        out = Image(x).window(se, 'percentile', opt, q=30)
+                        nt.assert_array_almost_equal(
+                            out.image,
+                            nd.generic_filter(x, np.percentile, footprint=se,
+                                              mode=mode,
+                                              extra_keywords={'q': 30}))
+        finally:
+            ipk._WINDOW_CHUNK = chunk
+
+        # the window is the non-zero elements of se, not weighted by them
+        x = (rng.random((13, 17)) * 10).astype(np.uint8)
+        cross = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]])
+        for se in [2 * cross, 0.5 * cross]:
+            for func, ref in reductions:
+                nt.assert_array_almost_equal(
+                    Image(x).window(se, func).image,
+                    nd.generic_filter(x, ref, footprint=se, mode='nearest'))
+
+        # extra arguments to a NumPy function are passed to it
+        for func in [np.std, np.var]:
+            nt.assert_array_almost_equal(
+                Image(x.astype(np.float64)).window(cross, func, ddof=1).image,
+                nd.generic_filter(x.astype(np.float64), func, footprint=cross,
+                                  mode='nearest',
+                                  extra_keywords={'ddof': 1}))
+        nt.assert_array_almost_equal(
+            Image(x).window(cross, np.mean, dtype=np.float64).image,
+            Image(x).window(cross, np.mean).image)
+
+        # only the selected elements of a sparse se are gathered
+        import tracemalloc
+
+        ring = np.zeros((21, 21))
+        ring[[0, -1], :] = 1
+        ring[:, [0, -1]] = 1
+        xp = np.zeros((220, 220))
+        ipk._WINDOW_CHUNK = 1 << 20
+        tracemalloc.start()
+        try:
+            for r0, r1, block in ipk._window_blocks(xp, ring):
+                self.assertEqual(block.shape, (r1 - r0, 200, 80))
+                del block
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            ipk._WINDOW_CHUNK = chunk
+        self.assertLess(peak, 2 * (1 << 20))
+
+        # planes of a color image are processed independently
+        c = rng.random((13, 17, 3))
+        out = Image(c).window(np.ones((3, 3)), 'max')
+        for i in range(3):
+            nt.assert_array_almost_equal(
+                out.image[:, :, i],
+                nd.maximum_filter(c[:, :, i], size=3, mode='nearest'))
+
+        with self.assertRaises(ValueError):
+            Image(c).window(np.ones((3, 3)), 'mode')
+
+        # errors raised by a reduction along an axis are not hidden by a
+        # per pixel call
+        calls = []
+
+        def f(v, axis=None):
+            calls.append(v.shape)
+            if np.any(v > 5):
+                raise ValueError('value too large')
+            return np.sum(v, axis=axis)
+
+        x = np.zeros((20, 30))
+        x[10:, :] = 9
+        with self.assertRaises(ValueError):
+            Image(x).window(np.ones((3, 3)), f)
+        self.assertTrue(all(len(shape) == 3 for shape in calls))
+
+    def test_smooth(self):
+        from scipy import signal
+
+        rng = np.random.default_rng(0)
+        a = rng.random((20, 25)).astype(np.float32)
+        K = Image.kgauss(1.5)
+
+        # separable path matches full 2D convolution for all options
+        boundary = {'fill': 'fill', 'wrap': 'wrap', 'reflect': 'symm'}
+        for optmode in ['same', 'full', 'valid']:
+            for optboundary in ['fill', 'wrap', 'reflect']:
+                out = signal.convolve2d(a, K, mode=optmode,
+                                        boundary=boundary[optboundary])
+                ims = Image(a).smooth(1.5, optmode=optmode,
+                                      optboundary=optboundary)
+                nt.assert_array_almost_equal(ims.image, out, decimal=5)
+
+        # all planes of a color image
+        c = rng.random((20, 25, 3)).astype(np.float32)
+        ims = Image(c).smooth(1.5)
+        for i in range(3):
+            out = signal.convolve2d(c[:, :, i], K, mode='same')
+            nt.assert_array_almost_equal(ims.image[:, :, i], out, decimal=5)
+
+        # integer type is preserved
+        u = Image((a * 1000).astype(np.uint16))
+        self.assertEqual(u.smooth(1).dtype, np.uint16)
+
+        # recursive path for large sigma approximates the FIR result
+        a = rng.random((150, 160)).astype(np.float32)
+        iir = Image(a).smooth(25, optboundary='reflect')
+        fir = Image(a).smooth(25, hw=75, optboundary='reflect')
+        nt.assert_array_almost_equal(iir.image, fir.image, decimal=2)
+
+    def test_convolve(self):
+        from scipy import signal
+
+        rng = np.random.default_rng(0)
+        a = rng.random((20, 25))
+
+        # every strategy matches scipy for all options
+        boundary = {'fill': 'fill', 'wrap': 'wrap', 'reflect': 'symm'}
+        for K in [Image.kgauss(1.5), Image.ksobel(), rng.random((4, 7))]:
+            for optmode in ['same', 'full', 'valid']:
+                for optboundary in ['fill', 'wrap', 'reflect']:
+                    out = signal.convolve2d(a, K, mode=optmode,
+                                            boundary=boundary[optboundary])
+                    for strategy in [None, 'direct', 'separable', 'fft']:
+                        if strategy == 'separable' and K.shape == (4, 7):
+                            continue
+                        C = Image(a).convolve(K, optmode, optboundary,
+                                              strategy=strategy)
+                        nt.assert_array_almost_equal(C.image, out)
+
+        # a rank one kernel can be separated, a general kernel cannot
+        im = Image(rng.random((200, 200)))
+        self.assertEqual(im.convolvestrategy(Image.kgauss(3)), 'separable')
+        self.assertEqual(im.convolvestrategy(Image.klaplace()), 'direct')
+        with self.assertRaises(ValueError):
+            Image(a).convolve(Image.klaplace(), strategy='separable')
+
+        # multi-plane kernel and multi-plane image
+        K = rng.random((5, 5, 3))
+        C = Image(a).convolve(K)
+        self.assertEqual(C.shape, (20, 25, 3))
+        c = rng.random((20, 25, 3))
+        Cc = Image(c).convolve(K[:, :, 0])
+        for i in range(3):
+            nt.assert_array_almost_equal(
+                C.image[:, :, i], signal.convolve2d(a, K[:, :, i], 'same',
+                                                    'wrap'))
+            nt.assert_array_almost_equal(
+                Cc.image[:, :, i], signal.convolve2d(c[:, :, i], K[:, :, 0],
+                                                     'same', 'wrap'))
+        with self.assertRaises(ValueError):
+            Image(c).convolve(K)
+
+        # result type follows the image and kernel types
+        u = Image((a * 100).astype(np.uint8))
+        self.assertEqual(u.convolve(K[:, :, 0]).dtype, np.float64)
+        self.assertEqual(u.convolve(np.ones((3, 3), np.uint8)).dtype,
+                         np.uint8)
+        f = Image(a.astype(np.float32))
+        self.assertEqual(f.convolve(K[:, :, 0].astype(np.float32)).dtype,
+                         np.float32)
+
+    def test_kernels(self):
+
+        # volume and symmetry
+        K = Image.kgauss(2)
+        self.assertEqual(K.shape, (13, 13))
+        self.assertAlmostEqual(np.sum(K), 1)
+        nt.assert_array_almost_equal(K, K.T)
+        self.assertAlmostEqual(np.sum(Image.kdog(1)), 0)
+
+        # derivative of Gaussian is odd in x and even in y
+        x, y = np.meshgrid(np.arange(-3, 4), np.arange(-3, 4))
+        dg = -x / (2 * np.pi) * np.exp(-(x ** 2 + y ** 2) / 2)
+        nt.assert_array_almost_equal(Image.kdgauss(1), dg)
+
+        nt.assert_array_equal(Image.kcircle(1), np.array([[0, 1, 0],
+                                                          [1, 1, 1],
+                                                          [0, 1, 0]]))
+        ring = Image.kcircle([1, 2])
+        self.assertEqual(ring.shape, (5, 5))
+        self.assertEqual(ring[2, 2], 0)
+        self.assertEqual(ring[0, 2], 1)
+        self.assertEqual(Image.kcircle(1, hw=3).shape, (7, 7))
+
+        # kernels are cached, shared and read only
+        self.assertIs(Image.kgauss(2), K)
+        self.assertIsNot(Image.kgauss(2, dtype=np.float32), K)
+        self.assertEqual(Image.klog(1, dtype=np.float32).dtype, np.float32)
+        with self.assertRaises(ValueError):
+            K[0, 0] = 1
+
+        # separable kernels know their factors
+        from machinevisiontoolbox.ImageProcessingKernel import _kernel_factors
+        for K in [Image.kgauss(1.5), Image.kdgauss(2)]:
+            u, v = _kernel_factors(K)
+            nt.assert_array_almost_equal(np.outer(u, v), K)
+        self.assertIsNone(_kernel_factors(Image.klog(1)))
+
+    def test_canny(self):
+
+        a = np.zeros((60, 80), dtype=np.uint8)
+        a[20:40, 30:60] = 200
+        im = Image(a)
+
+        # single pixel wide edges around the rectangle
+        E = im.canny()
+        self.assertEqual(E.dtype, np.uint8)
+        self.assertEqual(np.sum(E.image > 0), 96)
+        r, c = np.nonzero(E.image)
+        self.assertTrue(np.all((r >= 19) & (r <= 40) & (c >= 29) & (c <= 60)))
+        self.assertFalse(np.any(E.image[22:38, 32:58]))
+        self.assertEqual(np.sum(im.float().canny().image > 0), 96)
+
+        # gradients are signed
+        out = im.canny(gradient=True)
+        nt.assert_array_equal(out.edges.image, E.image)
+        self.assertEqual(out.magnitude.dtype, np.float32)
+        self.assertAlmostEqual(out.orientation.image[30, 30], 0)
+        self.assertAlmostEqual(out.orientation.image[30, 59], np.pi, places=5)
+        self.assertAlmostEqual(out.orientation.image[20, 45], np.pi / 2,
+                               places=5)
+        self.assertEqual(out.magnitude.image[5, 5], 0)
+
+        # sequence
+        seq = Image([a, np.zeros_like(a)])
+        E = seq.canny()
+        self.assertEqual(len(E), 2)
+        self.assertEqual(np.sum(E[0].image > 0), 96)
+        self.assertEqual(np.sum(E[1].image > 0), 0)
+
+        # a step with gradient below the thresholds has no edges
+        b = np.full((60, 60), 100, dtype=np.uint8)
+        b[:, 30:] = 103
+        self.assertEqual(np.sum(Image(b).canny().image > 0), 0)
+        b[:, 30:] = 250
+        self.assertEqual(np.sum(Image(b).canny().image > 0), 60)
+
+    def test_gradients(self):
+        from scipy import signal
+
+        rng = np.random.default_rng(0)
+        a = rng.random((30, 40)).astype(np.float32)
+        G = Image(a).gradients(1.5)
+        self.assertEqual(G.cached, ())
+
+        # equal to convolution with the derivative of Gaussian kernel
+        K = Image.kdgauss(1.5)
+        Ix = signal.convolve2d(a, K, mode='same', boundary='symm')
+        Iy = signal.convolve2d(a, K.T, mode='same', boundary='symm')
+        nt.assert_array_almost_equal(G.Ix.image, Ix, decimal=5)
+        nt.assert_array_almost_equal(G.Iy.image, Iy, decimal=5)
+        nt.assert_array_almost_equal(G.magnitude.image, np.hypot(Ix, Iy),
+                                     decimal=5)
+        nt.assert_array_almost_equal(G.orientation.image,
+                                     np.arctan2(Iy, Ix), decimal=4)
+        for c in ['Ix', 'Iy', 'magnitude', 'orientation']:
+            self.assertEqual(getattr(G, c).dtype, np.float32)
+
+        # components are cached and freed independently
+        self.assertEqual(G.cached, ('Ix', 'Iy', 'magnitude', 'orientation'))
+        self.assertEqual(G.nbytes, 4 * a.nbytes)
+        G.free('Ix', 'Iy')
+        self.assertEqual(G.cached, ('magnitude', 'orientation'))
+        nt.assert_array_almost_equal(G.Ix.image, Ix, decimal=5)
+        G.free()
+        self.assertEqual(G.nbytes, 0)
+        with self.assertRaises(ValueError):
+            G.free('Iz')
+
+        # reused by canny
+        b = np.zeros((60, 80), dtype=np.uint8)
+        b[20:40, 30:60] = 200
+        G = Image(b).gradients()
+        E = Image(b).canny(G)
+        self.assertEqual(G.cached, ('Ix', 'Iy'))
+        nt.assert_array_equal(E.image, Image(b).canny().image)
+
     # TODO
-    # kgauss
     # klaplace
     # ksobel
-    # kdog
-    # klog
-    # kdgauss
-    # kcircle
-    # smooth
     # similarity
     # pyramid
-    # convolve
-    # canny
 
 
 # ----------------------------------------------------------------------- #
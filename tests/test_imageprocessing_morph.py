@@ -200,6 +200,260 @@ class TestImageProcessingMorph(unittest.TestCase):
                         [0, 0, 0, 0, 0, 0, 0, 0]])
         nt.assert_array_almost_equal(im.endpoint().image, out)
 
+    def test_hitormiss_lut(self):
+        import cv2 as cv
+
+        # the lookup table gives the same result as the erosions, which are
+        # used when the pattern is padded to 5x5 with don't cares
+        rng = np.random.default_rng(0)
+        x = (rng.random((30, 41)) > 0.4).astype(np.uint8)
+        for i in range(10):
+            se = rng.choice([0, 1, np.nan], size=(3, 3))
+            se5 = np.pad(se, 1, constant_values=np.nan)
+            nt.assert_array_equal(Image(x).hitormiss(se).image,
+                                  Image(x).hitormiss(se5).image)
+        s1 = np.array([[0, 0, 0], [0, 1, 1], [0, 0, 0]])
+        s2 = np.array([[0, 0, 0], [1, 0, 0], [0, 0, 0]])
+        nt.assert_array_equal(Image(x).hitormiss(s1, s2).image,
+                              Image(x).hitormiss(np.pad(s1, 1),
+                                                 np.pad(s2, 1)).image)
+
+        # thinning only revisits the boundary, compare with whole image steps
+        # on thick shapes that touch the border
+        x = np.zeros((60, 80), dtype=np.uint8)
+        for c, r in [((10, 10), 12), ((50, 30), 18), ((75, 55), 9)]:
+            cv.circle(x, c, r, 1, -1)
+        sa = np.array([[0, 0, 0], [np.nan, 1, np.nan], [1, 1, 1]])
+        sb = np.array([[np.nan, 0, 0], [1, 1, 0], [np.nan, 1, np.nan]])
+        y = Image(x)
+        while True:
+            prev = y
+            for i in range(4):
+                for se in [np.rot90(sa, i), np.rot90(sb, i)]:
+                    y = Image(y.image ^ y.hitormiss(se).image)
+            if np.all(prev.image == y.image):
+                break
+        nt.assert_array_equal(Image(x).thin().image, y.image)
+
+    def test_distance_transform(self):
+        import cv2 as cv
+        import machinevisiontoolbox.ImageProcessingMorph as ipm
+
+        # compare with the distance to every zero pixel
+        rng = np.random.default_rng(0)
+        x = (rng.random((20, 25)) > 0.1).astype(np.uint8)
+        v, u = np.mgrid[:20, :25]
+        dv = v[..., np.newaxis] - v[x == 0]
+        du = u[..., np.newaxis] - u[x == 0]
+        for metric, d in [('euclidean', np.sqrt(du ** 2 + dv ** 2)),
+                          ('cityblock', np.abs(du) + np.abs(dv)),
+                          ('chessboard', np.maximum(np.abs(du),
+                                                    np.abs(dv)))]:
+            dt = Image(x).distance_transform(metric)
+            self.assertEqual(dt.dtype, np.float32)
+            nt.assert_array_almost_equal(dt.image, d.min(axis=2), decimal=5)
+
+            dt = Image(x).distance_transform(metric, return_indices=True)
+            nt.assert_array_almost_equal(dt.distance.image, d.min(axis=2),
+                                         decimal=5)
+            # the indices are of a zero pixel at that distance
+            self.assertTrue(np.all(x[dt.v.image, dt.u.image] == 0))
+            k = np.searchsorted(np.flatnonzero(x == 0),
+                                dt.v.image * 25 + dt.u.image)
+            nt.assert_array_almost_equal(d[v, u, k], d.min(axis=2),
+                                         decimal=5)
+
+        # sequence, and a frame without zero pixels
+        dt = Image([x, np.ones_like(x)]).distance_transform()
+        self.assertEqual(len(dt), 2)
+        self.assertTrue(np.all(np.isinf(list(dt)[1].image)))
+        with self.assertRaises(ValueError):
+            Image(x).distance_transform('manhattan')
+
+        # erosion and dilation of a two-valued image by a disk threshold the
+        # distance transform
+        radius = ipm._DISK_RADIUS.copy()
+        try:
+            for k in ipm._DISK_RADIUS:
+                ipm._DISK_RADIUS[k] = 1
+            for dtype in [np.uint8, np.float32]:
+                x = ((rng.random((40, 50)) > 0.95) * 200).astype(dtype)
+                for r in [1, 2.5, 4, 7.3]:
+                    se = Image.kcircle(r)
+                    se8 = se.astype(np.uint8)
+                    nt.assert_array_equal(
+                        Image(200 - x).erode(se).image,
+                        cv.erode(200 - x, se8,
+                                 borderType=cv.BORDER_REPLICATE))
+                    nt.assert_array_equal(
+                        Image(x).dilate(se).image,
+                        cv.dilate(x, se8, borderType=cv.BORDER_REPLICATE))
+        finally:
+            ipm._DISK_RADIUS.update(radius)
+        self.assertEqual(ipm._disk(Image.kcircle(2.5)), 5)
+        self.assertIsNone(ipm._disk(np.array([[0, 1, 0], [1, 1, 1],
+                                              [0, 1, 1]])))
+
+    def test_reconstruct(self):
+        import cv2 as cv
+        import machinevisiontoolbox.ImageProcessingMorph as ipm
+
+        def iterate(f, m, se, method):
+            # geodesic dilations or erosions until convergence
+            while True:
+                if method == 'dilation':
+                    g = np.minimum(Image(f).dilate(se).image, m)
+                else:
+                    g = np.maximum(Image(f).erode(se).image, m)
+                if np.all(g == f):
+                    return f
+                f = g
+
+        rng = np.random.default_rng(0)
+        cross = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]])
+        sparse = ipm._RECONSTRUCT_SPARSE
+        try:
+            for dtype in [np.uint8, np.float32]:
+                m = cv.GaussianBlur(rng.random((40, 60)), (0, 0), 2) * 100
+                m = m.astype(dtype)
+                b = (m > m.mean()).astype(dtype)
+                seed = rng.random(m.shape) > 0.97
+                for conn, se in [(4, cross), (8, np.ones((3, 3)))]:
+                    # sweeps only, and the queue only
+                    for ipm._RECONSTRUCT_SPARSE in [1 / 64, 10]:
+                        f = m * seed
+                        nt.assert_array_equal(
+                            Image(m).reconstruct(f, conn=conn).image,
+                            iterate(np.minimum(f, m), m, se, 'dilation'))
+                        f = np.where(seed, m, m.max())
+                        nt.assert_array_equal(
+                            Image(m).reconstruct(f, 'erosion', conn).image,
+                            iterate(np.maximum(f, m), m, se, 'erosion'))
+                        f = b * seed
+                        nt.assert_array_equal(
+                            Image(b).reconstruct(f, conn=conn).image,
+                            iterate(f, b, se, 'dilation'))
+        finally:
+            ipm._RECONSTRUCT_SPARSE = sparse
+
+        x = np.array([[0, 0, 0, 0, 0, 0],
+                      [0, 1, 1, 1, 0, 0],
+                      [0, 1, 0, 1, 0, 1],
+                      [0, 1, 1, 1, 0, 1],
+                      [0, 0, 0, 0, 0, 0]], dtype=np.uint8)
+        out = x.copy()
+        out[2, 2] = 1
+        nt.assert_array_equal(Image(x).fill_holes().image, out)
+        out = x.copy()
+        out[:, 5] = 0
+        nt.assert_array_equal(Image(x).clear_border().image, out)
+
+        x = np.array([[1, 1, 1, 1, 1, 1],
+                      [1, 5, 5, 1, 1, 1],
+                      [1, 5, 5, 1, 8, 1],
+                      [1, 1, 1, 1, 1, 1],
+                      [3, 1, 1, 1, 1, 2]], dtype=np.uint8)
+        out = np.zeros(x.shape, dtype=bool)
+        out[1:3, 1:3] = True
+        out[2, 4] = out[4, 0] = out[4, 5] = True
+        for dtype in [np.uint8, np.float64]:
+            nt.assert_array_equal(
+                Image(x.astype(dtype)).regional_max().image, out)
+        # maxima lower than 3 are suppressed, others lowered by 3
+        out = np.maximum(x, 4) - 3
+        nt.assert_array_equal(Image(x).hmax(3).image, out)
+
+    def test_granulometry(self):
+        import cv2 as cv
+
+        # the same as an opening or closing for each radius
+        rng = np.random.default_rng(0)
+        g = cv.GaussianBlur(rng.random((50, 70)), (0, 0), 2)
+        for x in [(g * 200).astype(np.uint8), (g > 0.5).astype(np.uint8),
+                  (g > 0.5).astype(np.float32),
+                  np.where(g > 0.5, 250, 10).astype(np.uint8),
+                  np.full(g.shape, 3, dtype=np.uint8)]:
+            im = Image(x)
+            for se, radii in [('disk', [5, 0, 1, 3.5, 30]),
+                              ('square', [7, 0, 1, 2])]:
+                top = list(im.tophat(radii, se))
+                bot = list(im.bothat(radii, se))
+                gr = im.granulometry(radii, se)
+                nt.assert_array_equal(gr.radii, sorted(radii))
+                volume = x.sum()
+                for k, r in enumerate(sorted(radii)):
+                    if se == 'disk':
+                        S = Image.kcircle(r)
+                    else:
+                        S = np.ones((2 * r + 1, 2 * r + 1))
+                    opened = im.open(S).image
+                    nt.assert_array_equal(top[k].image, x - opened)
+                    nt.assert_array_equal(bot[k].image,
+                                          im.close(S).image - x)
+                    self.assertAlmostEqual(gr.volume[k], opened.sum())
+                    self.assertAlmostEqual(gr.spectrum[k],
+                                           volume - opened.sum())
+                    volume = opened.sum()
+
+        im = Image([x, x])
+        gr = im.granulometry([1, 2, 3])
+        self.assertEqual(gr.volume.shape, (2, 3))
+        self.assertEqual(len(im.tophat([1, 2, 3])), 6)
+        self.assertEqual(len(im.tophat(2)), 2)
+        with self.assertRaises(ValueError):
+            im.tophat(1.5, 'square')
+        with self.assertRaises(ValueError):
+            im.granulometry([1, 2], 'hexagon')
+
+    def test_erode_dilate_decomposed(self):
+        import cv2 as cv
+        import machinevisiontoolbox.ImageProcessingMorph as ipm
+
+        # line decomposition and van Herk/Gil-Werman give the same result as
+        # OpenCV with the whole structuring element
+        area, length = ipm._DECOMPOSE_AREA, ipm._VHGW_LENGTH.copy()
+        rng = np.random.default_rng(0)
+        ses = [Image.kcircle(r) for r in [1, 3, 7.5]] + \
+            [np.ones((6, 4)), np.ones((1, 40)),
+             np.array([[0, 1, 1], [1, 1, 1], [1, 1, 0]])]
+        border = {'replicate': cv.BORDER_REPLICATE,
+                  'none': cv.BORDER_ISOLATED}
+        try:
+            ipm._DECOMPOSE_AREA = 1
+            for vhgw in [False, True]:
+                if vhgw:
+                    for k in ipm._VHGW_LENGTH:
+                        ipm._VHGW_LENGTH[k] = 2
+                for dtype in [np.uint8, np.float64]:
+                    x = (rng.random((30, 41)) * 200).astype(dtype)
+                    for se in ses:
+                        se8 = se.astype(np.uint8)
+                        for opt in ['replicate', 'none']:
+                            for n in [1, 2]:
+                                nt.assert_array_equal(
+                                    Image(x).erode(se, n, opt).image,
+                                    cv.erode(x, se8, iterations=n,
+                                             borderType=border[opt]))
+                                nt.assert_array_equal(
+                                    Image(x).dilate(se, n, opt).image,
+                                    cv.dilate(x, se8, iterations=n,
+                                              borderType=border[opt]))
+        finally:
+            ipm._DECOMPOSE_AREA = area
+            ipm._VHGW_LENGTH.update(length)
+
+        # only convex elements that contain the anchor are decomposed
+        self.assertEqual(len(ipm._decompose(Image.kcircle(3))), 3)
+        self.assertEqual(len(ipm._decompose(np.ones((5, 7)))), 1)
+        self.assertIsNone(ipm._decompose(np.array([[1, 0, 1]])))
+
+        x = (rng.random((30, 41)) * 200).astype(np.uint8)
+        se = Image.kcircle(6)
+        nt.assert_array_equal(
+            Image(x).morph(se, 'diff').image,
+            cv.morphologyEx(x, cv.MORPH_GRADIENT, se.astype(np.uint8),
+                            borderType=cv.BORDER_REPLICATE))
+
     def test_rank(self):
         im = np.array([[1, 2, 3],
                        [3, 4, 5],
@@ -212,6 +466,32 @@ class TestImageProcessingMorph(unittest.TestCase):
         imr = im.rank(se)
         nt.assert_array_almost_equal(imr.image, out)
 
+    def test_rank_methods(self):
+        import scipy.ndimage as nd
+
+        # medianBlur, threshold decomposition and ndimage give the same
+        # result as ndimage.rank_filter for every border option
+        rng = np.random.default_rng(0)
+        ses = [np.ones((3, 3)), np.ones((7, 7)), np.ones((3, 5)),
+               np.ones((4, 2)), np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]])]
+        for dtype, scale in [(np.uint8, 255), (np.uint8, 4),
+                             (np.uint16, 60000), (np.uint16, 30),
+                             (np.float32, 1)]:
+            x = (rng.random((20, 25)) * scale).astype(dtype)
+            for se in ses:
+                n = int(np.sum(se))
+                for rank in [0, 1, n // 2, -1]:
+                    for opt, mode in [('replicate', 'nearest'),
+                                      ('wrap', 'wrap')]:
+                        out = Image(x).rank(se, rank, opt)
+                        self.assertEqual(out.dtype, dtype)
+                        nt.assert_array_equal(
+                            out.image,
+                            nd.rank_filter(x, rank, footprint=se, mode=mode))
+
+        with self.assertRaises(ValueError):
+            Image(x).rank(np.ones((3, 3)), 9)
+
     def test_humoments(self):
 
         im = np.array([[0, 0, 0, 0, 0, 0, 0],
@@ -236,12 +516,246 @@ class TestImageProcessingMorph(unittest.TestCase):
         # np.assert
     # tc.assertEqual(humoments(im), out, 'absTol', 1e-8);
 
+    def test_label(self):
+
+        x = np.zeros((7, 9), dtype=np.uint8)
+        x[1:3, 1:4] = 1
+        x[4:6, 5:8] = 2
+        x[3, 4] = 1
+        x[6, 0] = 1
+        im = Image(x)
+
+        n, labels = im.label()
+        self.assertEqual(n, [3])
+        n, labels = im.label(conn=4)
+        self.assertEqual(n, [5])
+
+        for alg in ['default', 'wu', 'sauf', 'grana', 'bbdt', 'bolelli',
+                    'spaghetti']:
+            for conn in [4, 8]:
+                n, labels, stats = im.label(conn, stats=True, algorithm=alg)
+                L = labels.image
+                s = stats[0]
+                # the same regions, possibly numbered differently
+                L0 = im.label(conn)[1].image
+                pairs = np.unique(np.stack((L.ravel(), L0.ravel())), axis=1)
+                self.assertEqual(pairs.shape[1], n[0])
+                self.assertEqual(len(np.unique(pairs[0])), n[0])
+                self.assertEqual(len(np.unique(pairs[1])), n[0])
+                self.assertEqual(len(s.area), n[0])
+                for k in range(n[0]):
+                    v, u = np.nonzero(L == k)
+                    self.assertEqual(s.area[k], len(u))
+                    self.assertEqual(s.umin[k], u.min())
+                    self.assertEqual(s.umax[k], u.max() + 1)
+                    self.assertEqual(s.vmin[k], v.min())
+                    self.assertEqual(s.vmax[k], v.max() + 1)
+                    self.assertAlmostEqual(s.uc[k], u.mean())
+                    self.assertAlmostEqual(s.vc[k], v.mean())
+
+        n, labels = im.label(outtype='uint16')
+        self.assertEqual(labels.image.dtype, np.uint16)
+
+        with self.assertRaises(ValueError):
+            im.label(algorithm='fast')
+        with self.assertRaises(TypeError):
+            im.label(outtype='float')
+
+    def test_labelstream(self):
+        import cv2 as cv
+        from machinevisiontoolbox import LabelStream
+
+        rng = np.random.default_rng(0)
+        x = cv.GaussianBlur(rng.random((200, 150)), (0, 0), 2) > 0.5
+        x = x.astype(np.uint8)
+        for conn in [4, 8]:
+            n, labels, stats = Image(x).label(conn, stats=True)
+            L = labels.image
+            s = stats[0]
+
+            stream = LabelStream(conn)
+            out = []
+            for h in rng.integers(1, 15, 10):
+                out.append(stream.push(x[stream.rows:stream.rows + h]))
+            out.append(stream.push(x[stream.rows]))
+            out.append(stream.push(x[stream.rows:]))
+            out.append(stream.close())
+            self.assertEqual(stream.rows, 0)
+            c = [np.concatenate(f) for f in zip(*out)]
+            c = out[0]._make(c)
+            self.assertEqual(len(c.area), n[0] - 1)
+
+            # match the components by their bounding box and area
+            i = np.lexsort((c.area, c.vmax, c.umax, c.umin, c.vmin))
+            c = c._make([f[i] for f in c])
+            k = 1 + np.lexsort((s.area[1:], s.vmax[1:], s.umax[1:],
+                                s.umin[1:], s.vmin[1:]))
+            for name in ['area', 'umin', 'umax', 'vmin', 'vmax', 'uc',
+                         'vc']:
+                nt.assert_array_almost_equal(getattr(c, name),
+                                             getattr(s, name)[k])
+            for i in range(len(c.area)):
+                v, u = np.nonzero(L == k[i])
+                u = u - u.mean()
+                v = v - v.mean()
+                self.assertAlmostEqual(c.mu20[i], np.sum(u * u))
+                self.assertAlmostEqual(c.mu11[i], np.sum(u * v))
+                self.assertAlmostEqual(c.mu02[i], np.sum(v * v))
+
+        # a component is returned once it can no longer grow
+        stream = LabelStream()
+        c = stream.push(np.array([[1, 0, 0, 1], [1, 0, 0, 0]]))
+        self.assertEqual(len(c.area), 1)
+        self.assertEqual(c.area[0], 1)
+        c = stream.push(np.array([[0, 0, 0, 0]]))
+        nt.assert_array_equal(c.area, [2])
+        self.assertEqual(len(stream.close().area), 0)
+
+        with self.assertRaises(ValueError):
+            LabelStream(6)
+        with self.assertRaises(ValueError):
+            stream.push(np.zeros((2, 4)))
+            stream.push(np.zeros((2, 5)))
+
+    def test_allmoments(self):
+        import cv2 as cv
+
+        rng = np.random.default_rng(0)
+        for x in [(rng.random((40, 60)) * 255).astype(np.uint8),
+                  rng.random((31, 17)).astype(np.float32)]:
+            im = Image(x)
+            M = im.allmoments()
+            c = cv.moments(x)
+            self.assertEqual(M.m.shape, (4, 4))
+            for p in range(4):
+                for q in range(4 - p):
+                    self.assertAlmostEqual(M.m[p, q] / c[f'm{p}{q}'], 1)
+                    self.assertAlmostEqual(im.mpq(p, q)[0] / c[f'm{p}{q}'], 1)
+                    if p + q >= 2:
+                        self.assertAlmostEqual(M.mu[p, q] / c[f'mu{p}{q}'],
+                                               1)
+                        self.assertAlmostEqual(M.nu[p, q] / c[f'nu{p}{q}'],
+                                               1)
+                        self.assertAlmostEqual(
+                            im.upq(p, q)[0] / c[f'mu{p}{q}'], 1)
+                        self.assertAlmostEqual(
+                            im.npq(p, q)[0] / c[f'nu{p}{q}'], 1)
+            nt.assert_array_almost_equal(M.mu[[0, 1, 0], [0, 0, 1]],
+                                         [c['m00'], 0, 0])
+            nt.assert_allclose(M.hu, cv.HuMoments(c).ravel(), rtol=1e-9)
+
+            # higher orders and a sequence
+            u, v = np.meshgrid(np.arange(x.shape[1], dtype=float),
+                               np.arange(x.shape[0], dtype=float))
+            M = Image([x, x[::-1, ::-1]]).allmoments(5)
+            self.assertEqual(M.m.shape, (2, 6, 6))
+            self.assertAlmostEqual(M.m[0, 4, 5] / np.sum(x * u**4 * v**5), 1)
+            uc = M.m[0, 1, 0] / M.m[0, 0, 0]
+            vc = M.m[0, 0, 1] / M.m[0, 0, 0]
+            self.assertAlmostEqual(
+                M.mu[0, 5, 2] / np.sum(x * (u - uc)**5 * (v - vc)**2), 1)
+            k = np.arange(6)
+            nt.assert_allclose(M.mu[1] * (-1.0) ** (k[:, np.newaxis] + k),
+                               M.mu[0], atol=1e-6 * M.mu[0].max())
+
+        M = Image(x).allmoments(2)
+        self.assertIsNone(M.hu)
+        with self.assertRaises(ValueError):
+            Image(x).allmoments(-1)
+        with self.assertRaises(ValueError):
+            Image(x).npq(1, 0)
+
+    def test_regionprops(self):
+        import cv2 as cv
+
+        rng = np.random.default_rng(0)
+        b = cv.GaussianBlur(rng.random((60, 80)), (0, 0), 2) > 0.5
+        n, labels = Image(b.astype(np.uint8)).label()
+        L = labels.image
+        L[L == 3] = 0  # a label with no pixels
+        x = (rng.random(L.shape) * 255).astype(np.uint8)
+        u, v = np.meshgrid(np.arange(80.0), np.arange(60.0))
+
+        for r in [Image(x).regionprops(labels), Image(x).regionprops(L, 3)]:
+            self.assertEqual(len(r.area), n[0])
+            self.assertEqual(r.area[3], 0)
+            nt.assert_array_equal(r.m[3], 0)
+            for name in ['uc', 'vc', 'mu', 'a', 'b', 'orientation', 'mean',
+                         'std', 'min', 'max']:
+                self.assertTrue(np.all(np.isnan(getattr(r, name)[3])), name)
+            for k in [0, 1, 2, 4, n[0] - 1]:
+                region = L == k
+                area = np.sum(region)
+                self.assertEqual(r.area[k], area)
+                uc = u[region].mean()
+                vc = v[region].mean()
+                self.assertAlmostEqual(r.uc[k], uc)
+                self.assertAlmostEqual(r.vc[k], vc)
+                c = cv.moments(region.astype(np.uint8), True)
+                P = r.m.shape[1]
+                for p in range(P):
+                    for q in range(P - p):
+                        self.assertAlmostEqual(
+                            r.m[k, p, q] / np.sum(u[region] ** p
+                                                  * v[region] ** q), 1)
+                        if p + q >= 2:
+                            self.assertAlmostEqual(
+                                r.mu[k, p, q] / c[f'mu{p}{q}'], 1)
+
+                # equivalent ellipse
+                J = np.array([[c['mu20'], c['mu11']],
+                              [c['mu11'], c['mu02']]]) / area
+                e, V = np.linalg.eigh(J)
+                self.assertAlmostEqual(r.a[k], 2 * np.sqrt(e[1]))
+                self.assertAlmostEqual(r.b[k], 2 * np.sqrt(e[0]))
+                self.assertAlmostEqual(np.tan(r.orientation[k]),
+                                       V[1, 1] / V[0, 1])
+
+                self.assertAlmostEqual(r.mean[k], x[region].mean())
+                self.assertAlmostEqual(r.std[k], x[region].std())
+                self.assertEqual(r.min[k], x[region].min())
+                self.assertEqual(r.max[k], x[region].max())
+
+        # labels 1 to 4 are missing
+        G = np.zeros((6, 8), dtype=np.int32)
+        G[1:3, 2:6] = 5
+        r = Image(np.ones(G.shape)).regionprops(G)
+        nt.assert_array_equal(r.area, [40, 0, 0, 0, 0, 8])
+        nt.assert_array_equal(r.m[1:5], 0)
+        self.assertTrue(np.all(np.isnan(r.mu[1:5])))
+        self.assertTrue(np.all(np.isnan(r.uc[1:5])))
+        self.assertFalse(np.any(np.isnan(r.mu[5])))
+        self.assertEqual(r.uc[5], 3.5)
+
+        # moments with p+q > order are zero, not mixed lower order terms
+        R = np.zeros((20, 20), dtype=np.int32)
+        R[3:9, 4:15] = 1
+        r = Image(np.ones(R.shape)).regionprops(R)
+        self.assertEqual(r.m[1, 0, 0], 66)
+        self.assertEqual(r.m[1, 1, 1], 99 * 33)
+        for p, q in [(1, 2), (2, 1), (2, 2)]:
+            self.assertEqual(r.m[1, p, q], 0)
+            self.assertEqual(r.mu[1, p, q], 0)
+        r = Image(np.ones(R.shape)).regionprops(R, 1)
+        self.assertEqual(r.m[1, 1, 1], 0)
+        self.assertEqual(r.mu[1, 1, 1], 0)
+        r = Image(np.ones(R.shape)).regionprops(R, 3)
+        self.assertAlmostEqual(r.m[1, 1, 2], np.sum(np.arange(4, 15))
+                               * np.sum(np.arange(3, 9) ** 2))
+        self.assertAlmostEqual(r.mu[1, 1, 2], 0)
+        self.assertEqual(r.m[1, 2, 2], 0)
+
+        r = Image([x, x]).regionprops(Image([L, L]))
+        self.assertEqual(len(r), 2)
+        nt.assert_array_equal(r[0].area, r[1].area)
+        self.assertEqual(Image(x).regionprops(L, 1).m.shape, (n[0], 2, 2))
+        with self.assertRaises(ValueError):
+            Image(x).regionprops(L[1:])
+        with self.assertRaises(ValueError):
+            Image(x).regionprops(L - 1)
+
     # TODO
     # getse?
-    # label
-    # mpq
-    # upq
-    # npq
     # moments
 
 
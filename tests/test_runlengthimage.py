@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+import numpy as np
+import numpy.testing as nt
+import unittest
+import cv2 as cv
+
+from machinevisiontoolbox.Image import Image
+from machinevisiontoolbox.RunLengthImage import RunLengthImage
+
+
+class TestRunLengthImage(unittest.TestCase):
+
+    def test_convert(self):
+
+        x = np.array([[0, 1, 1, 0, 1],
+                      [1, 1, 1, 1, 1],
+                      [0, 0, 0, 0, 0],
+                      [1, 0, 0, 0, 0]], dtype=np.uint8)
+        r = RunLengthImage(x)
+        self.assertEqual(len(r), 4)
+        self.assertEqual(r.shape, (4, 5))
+        self.assertEqual(r.area, np.sum(x))
+        row, start, end = r.runs
+        nt.assert_array_equal(row, [0, 0, 1, 3])
+        nt.assert_array_equal(start, [1, 4, 0, 0])
+        nt.assert_array_equal(end, [3, 5, 5, 1])
+        nt.assert_array_equal(r.uint8(), x)
+        nt.assert_array_equal(r.uint8(255), x * 255)
+        nt.assert_array_equal(r.image().image, x)
+        nt.assert_array_equal(RunLengthImage(Image(x * 255)).uint8(), x)
+
+        # overlapping and touching runs are merged
+        r2 = RunLengthImage.fromruns([1, 0, 1, 3, 0], [2, 1, 0, 0, 4],
+                                     [5, 3, 3, 1, 5], (4, 5))
+        self.assertTrue(r2 == r)
+        with self.assertRaises(ValueError):
+            RunLengthImage.fromruns([0], [2], [6], (4, 5))
+
+        rng = np.random.default_rng(0)
+        x = rng.random((30, 40)) > 0.7
+        y = rng.random((30, 40)) > 0.4
+        a, b = RunLengthImage(x), RunLengthImage(y)
+        nt.assert_array_equal(a.uint8(), x)
+        nt.assert_array_equal((a & b).uint8(), x & y)
+        nt.assert_array_equal((a | b).uint8(), x | y)
+
+    def test_label(self):
+
+        rng = np.random.default_rng(1)
+        for p in [0.3, 0.5, 0.7]:
+            x = (rng.random((40, 57)) > p).astype(np.uint8)
+            r = RunLengthImage(x)
+            for conn in [4, 8]:
+                n, labels = r.label(conn)
+                ncv, lcv = cv.connectedComponents(x, connectivity=conn)
+                self.assertEqual(n, ncv - 1)
+                out = r.paint(labels + 1, dtype=np.int32)
+                # the same components, numbered in a different order
+                pairs = np.unique(np.stack([out.ravel(), lcv.ravel()]),
+                                  axis=1)
+                self.assertEqual(pairs.shape[1], ncv)
+                # numbered in raster order of the first pixel
+                _, first = np.unique(out.ravel(), return_index=True)
+                self.assertTrue(np.all(np.diff(first[1:]) > 0))
+
+        n, labels = RunLengthImage(np.zeros((5, 5))).label()
+        self.assertEqual(n, 0)
+        self.assertEqual(len(labels), 0)
+        with self.assertRaises(ValueError):
+            r.label(6)
+
+    def test_moments(self):
+
+        rng = np.random.default_rng(2)
+        x = (rng.random((40, 57)) > 0.6).astype(np.uint8)
+        r = RunLengthImage(x)
+        m = r.allmoments()
+        mi = Image(x).allmoments()
+        nt.assert_array_almost_equal(m.m, mi.m)
+        nt.assert_array_almost_equal(m.mu, mi.mu)
+        nt.assert_array_almost_equal(m.nu, mi.nu)
+        nt.assert_array_almost_equal(m.hu, mi.hu)
+        self.assertIsNone(r.allmoments(2).hu)
+        with self.assertRaises(ValueError):
+            r.allmoments(4)
+
+        # per component
+        n, labels = r.label()
+        m = r.allmoments(labels=labels)
+        out = r.paint(labels + 1, dtype=np.int32)
+        self.assertEqual(m.m.shape, (n, 4, 4))
+        for i in [0, n // 2, n - 1]:
+            mi = Image((out == i + 1).astype(np.uint8)).allmoments()
+            nt.assert_array_almost_equal(m.m[i], mi.m)
+            nt.assert_array_almost_equal(m.mu[i], mi.mu)
+
+    def test_morph(self):
+
+        rng = np.random.default_rng(3)
+        for width in [1, 8, 13, 70]:
+            x = (rng.random((15, width)) > 0.6).astype(np.uint8)
+            r = RunLengthImage(x)
+            for se in [1, 3, (1, 5), (4, 2), (5, 11), (2, 20), (20, 3)]:
+                h, w = (se, se) if isinstance(se, int) else se
+                k = np.ones((h, w), dtype=np.uint8)
+                for op, cvop in [('dilate', cv.dilate), ('erode', cv.erode)]:
+                    nt.assert_array_equal(
+                        getattr(r, op)(se).uint8(),
+                        cvop(x, k, borderType=cv.BORDER_REPLICATE))
+
+        x = (rng.random((30, 40)) > 0.5).astype(np.uint8)
+        r = RunLengthImage(x)
+        k = np.ones((3, 3), dtype=np.uint8)
+        nt.assert_array_equal(r.dilate(k, n=2).uint8(),
+                              cv.dilate(x, k, iterations=2,
+                                        borderType=cv.BORDER_REPLICATE))
+        nt.assert_array_equal(r.open(3).uint8(), Image(x).open(k).image)
+        nt.assert_array_equal(r.close(3).uint8(), Image(x).close(k).image)
+        with self.assertRaises(ValueError):
+            r.erode(np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]]))
+
+
+if __name__ == '__main__':
+
+    unittest.main()